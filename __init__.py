@@ -27,9 +27,12 @@ def register():
     from .source import blender_property_extensions, new_classes_to_register
     from .source.extras import set_linear_vertex_color
     from .source.model.material import shader_nodes
+    from .source.model.mesh import export_mesh_cache
 
     new_classes_to_register.register()
 
+    export_mesh_cache.register()
+
     blender_property_extensions.register()
     
     bpy.types.VIEW3D_MT_paint_vertex.append(set_linear_vertex_color.menu_func)
@@ -48,6 +51,12 @@ def unregister():
 
     from .source.extras import set_linear_vertex_color
     from .source import new_classes_to_register
+    from .source.model.mesh import export_mesh_cache
+    from .source.swing import shape_updates
+
+    export_mesh_cache.unregister()
+
+    shape_updates.unregister()
 
     nodeitems_utils.unregister_node_categories('CUSTOM_ULTIMATE_NODES')
 
@@ -35,6 +35,9 @@ def register():
     Mesh.sub_swing_data_linked_mesh = PointerProperty(
         type=sub_swing_data.SUB_PG_sub_swing_data_linked_mesh
     )
+    Object.sub_swing_data_linked_mesh = PointerProperty(
+        type=sub_swing_data.SUB_PG_sub_swing_data_linked_mesh
+    )
     Collection.sub_swing_collection_props = PointerProperty(
         type=sub_swing_data.SUB_PG_sub_swing_master_collection_props
     )
@@ -168,6 +171,11 @@ class SubSceneProperties(PropertyGroup):
         default=""
     )
 
-
-
-
+    swing_shape_segments: IntProperty(
+        name='Swing Shape Resolution',
+        description='Segments around each swing sphere and capsule. Lower values are faster to display in large swing setups',
+        default=16,
+        min=4,
+        max=64,
+        update=sub_swing_data.swing_shape_segments_update,
+    )
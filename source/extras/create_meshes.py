@@ -1,23 +1,94 @@
 import bpy
-import bmesh
 import math
 import numpy
 from math import sqrt, cos, sin, pi, radians
 from mathutils import Vector, Matrix, Quaternion
+from typing import NamedTuple
 from bpy.types import Context, Operator, Object, Bone, Mesh
 from bpy.props import FloatProperty, StringProperty
 
-def verts_from_circle(radius, samples, y):
+# Segments around each ring of the swing shapes, used if there is no scene to read the setting from.
+DEFAULT_SHAPE_SEGMENTS = 16
+
+class ShapeMeshData(NamedTuple):
+    positions: numpy.ndarray # (vertex count, 3) float32
+    polygon_sizes: numpy.ndarray # int32
+    loop_vertex_indices: numpy.ndarray # int32
+
+def get_shape_segments() -> int:
+    scene = bpy.context.scene
+    if scene is None:
+        return DEFAULT_SHAPE_SEGMENTS
+    return scene.sub_scene_properties.swing_shape_segments
+
+def get_circle_positions(segments: int, radius: float=1.0, y: float=0.0) -> numpy.ndarray:
     # x**2 + z**2 = radius**2
     # need to make the object using 'Y' up since bones in blender use 'Y' as primary axis
-    verts: list[tuple[float, float, float]] = []
-    theta = 2.0 * pi / samples
-    for i in range(1, samples+1):
-        x = radius * cos(theta * i)
-        z = radius * sin(theta * i)
-        verts.append((x,y,z))
-    return verts
-    
+    theta = 2.0 * pi * numpy.arange(1, segments+1) / segments
+    positions = numpy.empty((segments, 3), dtype=numpy.float32)
+    positions[:,0] = radius * numpy.cos(theta)
+    positions[:,1] = y
+    positions[:,2] = radius * numpy.sin(theta)
+    return positions
+
+def get_tube_loops(segments: int, ring_count: int, first_vertex: int=0) -> numpy.ndarray:
+    """
+    Returns the quads connecting each ring of segments vertices to the next ring as a (quad count, 4) array.
+    """
+    i = numpy.arange(segments)
+    j = (i + 1) % segments
+    ring_starts = first_vertex + segments * numpy.arange(ring_count - 1)[:,None]
+    quads = numpy.stack([ring_starts + i, ring_starts + segments + i, ring_starts + segments + j, ring_starts + j], axis=-1)
+    return quads.reshape(-1, 4).astype(numpy.int32)
+
+def get_fan_loops(segments: int, first_vertex: int, center_vertex: int, flip: bool) -> numpy.ndarray:
+    i = numpy.arange(segments)
+    j = (i + 1) % segments
+    center = numpy.full(segments, center_vertex)
+    fans = numpy.stack([center, first_vertex + j, first_vertex + i] if flip else [center, first_vertex + i, first_vertex + j], axis=-1)
+    return fans.astype(numpy.int32)
+
+def get_shape_mesh_data(positions: numpy.ndarray, polygons: list[numpy.ndarray]) -> ShapeMeshData:
+    # Each array in polygons has the vertex indices of polygons with the same number of sides.
+    polygon_sizes = numpy.concatenate([numpy.full(len(p), p.shape[1], dtype=numpy.int32) for p in polygons])
+    loop_vertex_indices = numpy.concatenate([p.ravel() for p in polygons]).astype(numpy.int32)
+    return ShapeMeshData(numpy.ascontiguousarray(positions, dtype=numpy.float32), polygon_sizes, loop_vertex_indices)
+
+def get_sphere_mesh_data(segments: int) -> ShapeMeshData:
+    # Twice as many segments around as from pole to pole, like a UV sphere.
+    around = segments * 2
+    latitudes = numpy.linspace(-pi/2, pi/2, segments+1)[1:-1]
+    ring_count = len(latitudes)
+    rings = numpy.tile(get_circle_positions(around), (ring_count, 1)).reshape(ring_count, around, 3)
+    rings[:,:,[0,2]] *= numpy.cos(latitudes)[:,None,None]
+    rings[:,:,1] = numpy.sin(latitudes)[:,None]
+    poles = numpy.array([[0.0, -1.0, 0.0], [0.0, 1.0, 0.0]], dtype=numpy.float32)
+    positions = numpy.concatenate([rings.reshape(-1, 3), poles])
+
+    bottom_pole = ring_count * around
+    top_pole = bottom_pole + 1
+    polygons = [
+        get_tube_loops(around, ring_count),
+        numpy.concatenate([
+            get_fan_loops(around, 0, bottom_pole, flip=False),
+            get_fan_loops(around, (ring_count-1) * around, top_pole, flip=True),
+        ]),
+    ]
+    return get_shape_mesh_data(positions, polygons)
+
+def get_tube_mesh_data(start_ring: numpy.ndarray, end_ring: numpy.ndarray) -> ShapeMeshData:
+    segments = len(start_ring)
+    return get_shape_mesh_data(numpy.concatenate([start_ring, end_ring]), [get_tube_loops(segments, 2)])
+
+def get_cylinder_mesh_data(segments: int) -> ShapeMeshData:
+    # Radius 1 rings at Y=0 and Y=1, since bones in blender use 'Y' as the primary axis.
+    return get_tube_mesh_data(get_circle_positions(segments, y=0.0), get_circle_positions(segments, y=1.0))
+
+def get_plane_mesh_data(segments: int) -> ShapeMeshData:
+    # The plane faces +Y, so it can be rotated to the plane normal.
+    positions = numpy.array([[-4.0, 0.0, -4.0], [-4.0, 0.0, 4.0], [4.0, 0.0, 4.0], [4.0, 0.0, -4.0]], dtype=numpy.float32)
+    return get_shape_mesh_data(positions, [numpy.array([[0, 1, 2, 3]], dtype=numpy.int32)])
+
 """def make_capsule(object:bpy.types.Object, start_radius, end_radius, length, start_offset=Vector([0.0,0.0,0.0]), end_offset=Vector([0.0,0.0,0.0])):
     # TODO: Figure out offset
     start_verts = verts_from_circle(start_radius, 32, 0.0)
@@ -37,105 +108,188 @@ def verts_from_circle(radius, samples, y):
     
     object.data.from_pydata(verts, edges, faces)"""
 
-def get_quat_to_point_source_to_target(source_bone: Bone, target_bone: Bone) -> Quaternion:
-    distance_vec: Vector = target_bone.matrix_local.translation - source_bone.matrix_local.translation
-    up_vec = Vector([0,1,0])
-    cross = up_vec.cross(distance_vec)
-    dot = up_vec.dot(distance_vec)
-    w = up_vec.length * distance_vec.length + dot
-    distance_vec_as_rotation_quat = Quaternion([w] + list(cross))
-    distance_vec_as_rotation_quat.normalize()
-    return distance_vec_as_rotation_quat
+def write_mesh_data(mesh: Mesh, mesh_data: ShapeMeshData):
+    """
+    Replaces the mesh geometry by filling preallocated vertices, loops and polygons.
+    """
+    mesh.clear_geometry()
+    mesh.vertices.add(len(mesh_data.positions))
+    mesh.loops.add(len(mesh_data.loop_vertex_indices))
+    mesh.polygons.add(len(mesh_data.polygon_sizes))
+    mesh.vertices.foreach_set('co', mesh_data.positions.ravel())
+    mesh.loops.foreach_set('vertex_index', mesh_data.loop_vertex_indices)
+    loop_starts = numpy.zeros(len(mesh_data.polygon_sizes), dtype=numpy.int32)
+    numpy.cumsum(mesh_data.polygon_sizes[:-1], out=loop_starts[1:])
+    mesh.polygons.foreach_set('loop_start', loop_starts)
+    mesh.update(calc_edges=True)
+
+def write_shape_mesh(obj: Object, mesh_data: ShapeMeshData, vertex_group_names: list[str], vertex_group_indices: numpy.ndarray):
+    """
+    Writes the shape to the object's mesh with each vertex fully weighted to vertex_group_names[vertex_group_indices[i]].
+    If the topology and vertex groups are unchanged, only the vertex positions are updated in place.
+    """
+    mesh: Mesh = obj.data
+    same_topology = len(mesh.vertices) == len(mesh_data.positions) and len(mesh.loops) == len(mesh_data.loop_vertex_indices) \
+        and len(mesh.polygons) == len(mesh_data.polygon_sizes)
+    if same_topology and [vertex_group.name for vertex_group in obj.vertex_groups] == vertex_group_names:
+        mesh.vertices.foreach_set('co', mesh_data.positions.ravel())
+        mesh.update()
+        return
+
+    write_mesh_data(mesh, mesh_data)
+    obj.vertex_groups.clear()
+    for group_index, vertex_group_name in enumerate(vertex_group_names):
+        vertex_group = obj.vertex_groups.new(name=vertex_group_name)
+        vertex_group.add(numpy.flatnonzero(vertex_group_indices == group_index).tolist(), 1.0, 'REPLACE')
+
+# Marks the meshes shared by every instance of a swing shape, the value is the kind of shape.
+UNIT_MESH_KEY = 'smush_blender_swing_unit_mesh'
+
+def is_unit_mesh(mesh: Mesh) -> bool:
+    return mesh.get(UNIT_MESH_KEY) is not None
+
+# The segments the unit mesh was built with, so it can be rebuilt when the resolution changes.
+UNIT_MESH_SEGMENTS_KEY = 'smush_blender_swing_unit_mesh_segments'
+
+unit_mesh_builders = {
+    'SPHERE': get_sphere_mesh_data,
+    'CYLINDER': get_cylinder_mesh_data,
+    'PLANE': get_plane_mesh_data,
+}
+
+def get_unit_mesh(kind: str) -> Mesh:
+    """
+    Returns the mesh shared by every swing shape of this kind, creating or rebuilding it if needed.
+    """
+    name = f'Swing Unit {kind.capitalize()}'
+    mesh = bpy.data.meshes.get(name)
+    if mesh is None or mesh.library is not None or mesh.get(UNIT_MESH_KEY) != kind:
+        mesh = next((m for m in bpy.data.meshes if m.library is None and m.get(UNIT_MESH_KEY) == kind), None)
+    if mesh is None:
+        mesh = bpy.data.meshes.new(name)
+        mesh[UNIT_MESH_KEY] = kind
+    segments = get_shape_segments()
+    if mesh.get(UNIT_MESH_SEGMENTS_KEY) != segments:
+        write_mesh_data(mesh, unit_mesh_builders[kind](segments))
+        mesh[UNIT_MESH_SEGMENTS_KEY] = segments
+    return mesh
+
+def update_unit_meshes():
+    # Only rebuilds the meshes that already exist.
+    for mesh in [m for m in bpy.data.meshes if m.library is None and m.get(UNIT_MESH_KEY) in unit_mesh_builders]:
+        get_unit_mesh(mesh[UNIT_MESH_KEY])
+
+def get_bone_parent_inverse(bone: Bone) -> Matrix:
+    # Bone parenting is relative to the tail of the bone.
+    return (bone.matrix_local @ Matrix.Translation((0.0, bone.length, 0.0))).inverted()
+
+def bind_shape_to_armature(obj: Object):
+    """
+    Meshes store the vertex group names, so instanced shapes can't be weighted to their own bones.
+    Instanced shapes follow a single bone with bone parenting, and shapes with their own mesh use an armature modifier.
+    """
+    arma_obj: Object = obj.parent
+    if arma_obj is None or arma_obj.type != 'ARMATURE':
+        return
+    armature_modifier = obj.modifiers.get("Armature")
+    if is_unit_mesh(obj.data):
+        if armature_modifier is not None:
+            obj.modifiers.remove(armature_modifier)
+        obj.parent_type = 'BONE'
+        # Assigning the parent resets the parent inverse, so it's set again for the bone.
+        bone = arma_obj.data.bones.get(obj.parent_bone)
+        if bone is not None:
+            obj.matrix_parent_inverse = get_bone_parent_inverse(bone)
+    else:
+        obj.parent_type = 'OBJECT'
+        obj.matrix_parent_inverse = Matrix.Identity(4)
+        if armature_modifier is None:
+            armature_modifier = obj.modifiers.new("Armature", "ARMATURE")
+        armature_modifier.object = arma_obj
+
+def remove_mesh_if_unused(mesh: Mesh):
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
+def set_shape_instance(obj: Object, kind: str, bone: Bone, matrix: Matrix):
+    """
+    Shows the shared unit mesh transformed by the matrix in armature space.
+    """
+    previous_mesh: Mesh = obj.data
+    unit_mesh = get_unit_mesh(kind)
+    if previous_mesh != unit_mesh:
+        obj.data = unit_mesh
+        remove_mesh_if_unused(previous_mesh)
+    obj.parent_bone = bone.name
+    obj.matrix_parent_inverse = get_bone_parent_inverse(bone)
+    obj.matrix_basis = matrix
+    bind_shape_to_armature(obj)
+
+def use_custom_shape_mesh(obj: Object):
+    """
+    Gives the object its own mesh for shapes that can't be instanced.
+    """
+    if is_unit_mesh(obj.data):
+        obj.data = bpy.data.meshes.new(obj.name)
+    obj.parent_bone = ''
+    obj.matrix_basis = Matrix.Identity(4)
+    bind_shape_to_armature(obj)
+
+def remove_shape_object(obj: Object):
+    mesh: Mesh = obj.data
+    bpy.data.objects.remove(obj)
+    remove_mesh_if_unused(mesh)
+
+def get_cylinder_matrix(start: Vector, end: Vector, radius: float) -> Matrix:
+    direction = end - start
+    rotation = Vector([0,1,0]).rotation_difference(direction)
+    return Matrix.Translation(start) @ rotation.to_matrix().to_4x4() @ Matrix.Diagonal((radius, direction.length, radius, 1.0))
 
 def make_capsule_mesh(obj: Object, start_radius, end_radius, start_offset, end_offset, start_bone: Bone, end_bone: Bone, skin_to_start_only=False):
     # Handle vertex groups
     if start_bone == end_bone:
         skin_to_start_only = True
-    obj.vertex_groups.clear()
-    obj.vertex_groups.new(name=start_bone.name)
-    if not skin_to_start_only:
-        obj.vertex_groups.new(name=end_bone.name)
-    
-    # Init bmesh
-    bm = bmesh.new()
-    deform_layer = bm.verts.layers.deform.verify()
-
-    # Handle starting side
-    start_verts = bmesh.ops.create_circle(bm, segments=16, radius=start_radius)
-    # Rotate start verts so they face the end_bone so capsule can connect properly
-    align_with_end_bone_quat = get_quat_to_point_source_to_target(start_bone, end_bone)
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(radians(90),4,'X'), verts=start_verts['verts'])
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(align_with_end_bone_quat.angle, 4, align_with_end_bone_quat.axis), verts=start_verts['verts'])
-    bmesh.ops.translate(bm, vec=start_bone.matrix_local.translation, verts=start_verts['verts'])
-    bmesh.ops.translate(bm, vec=start_offset, space=start_bone.matrix_local.inverted(), verts=start_verts['verts'])
-    for v in start_verts['verts']:
-        g = v[deform_layer]
-        g[0] = 1.0
-
-    # Handle ending side
-    end_verts = bmesh.ops.create_circle(bm, segments=16, radius=end_radius)
-    # Rotate end verts so they face the start_bone so capsule can connect properly
-    align_with_start_bone_quat = get_quat_to_point_source_to_target(end_bone, start_bone)
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(radians(90),4,'X'), verts=end_verts['verts'])
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(align_with_start_bone_quat.angle, 4, align_with_start_bone_quat.axis), verts=end_verts['verts'])
-    bmesh.ops.translate(bm, vec=end_bone.matrix_local.translation, verts=end_verts['verts'])
-    bmesh.ops.translate(bm, vec=end_offset, space=end_bone.matrix_local.inverted(), verts=end_verts['verts'])
-
-    for v in end_verts['verts']:
-        g = v[deform_layer]
-        if skin_to_start_only:
-            g[0] = 1.0
-        else:
-            g[1] = 1.0
-    bmesh.ops.bridge_loops(bm, edges=bm.edges[:])
-    bm.to_mesh(obj.data)
-    bm.free()
 
-def make_connection_mesh(obj: Object, radius: float, start_bone: Bone, end_bone: Bone):
-    # Handle vertex groups
-    obj.vertex_groups.clear()
-    obj.vertex_groups.new(name=start_bone.name)
-    obj.vertex_groups.new(name=end_bone.name)
+    # Capsules can only be instanced if they have a single radius and move rigidly with the start bone.
+    # The head of a child bone doesn't move relative to its parent, so this includes most swing bone capsules.
+    start = start_bone.matrix_local @ Vector(start_offset)
+    end = end_bone.matrix_local @ Vector(end_offset)
+    is_rigid = skin_to_start_only or (end_bone.parent == start_bone and Vector(end_offset).length == 0.0)
+    if start_radius == end_radius and is_rigid and (end - start).length > 0.0:
+        set_shape_instance(obj, 'CYLINDER', start_bone, get_cylinder_matrix(start, end, start_radius))
+        return
+
+    use_custom_shape_mesh(obj)
+    vertex_group_names = [start_bone.name] if skin_to_start_only else [start_bone.name, end_bone.name]
+    write_tube_mesh(obj, start, end, start_radius, end_radius, vertex_group_names, end_group_index=0 if skin_to_start_only else 1)
+
+def write_tube_mesh(obj: Object, start: Vector, end: Vector, start_radius: float, end_radius: float, vertex_group_names: list[str], end_group_index: int):
+    # Both rings are rotated to face along the tube, so the quads between them don't twist.
+    segments = get_shape_segments()
+    direction = end - start
+    rotation = Vector([0,1,0]).rotation_difference(direction) if direction.length > 0.0 else Quaternion()
+    rotation_matrix = numpy.array(rotation.to_matrix(), dtype=numpy.float32)
+    start_ring = get_circle_positions(segments, start_radius) @ rotation_matrix.T + numpy.array(start, dtype=numpy.float32)
+    end_ring = get_circle_positions(segments, end_radius) @ rotation_matrix.T + numpy.array(end, dtype=numpy.float32)
+
+    vertex_group_indices = numpy.repeat(numpy.array([0, end_group_index]), segments)
+    write_shape_mesh(obj, get_tube_mesh_data(start_ring, end_ring), vertex_group_names, vertex_group_indices)
 
+def make_connection_mesh(obj: Object, radius: float, start_bone: Bone, end_bone: Bone):
     # Connections seem to go from the end of the bone
     # By this point, the bone chains should be properly aligned
     start_bone_child = start_bone.children[0]
     end_bone_child = end_bone.children[0]
 
-    # Init bmesh
-    bm = bmesh.new()
-    deform_layer = bm.verts.layers.deform.verify()
-
-    # Handle starting side
-    start_verts = bmesh.ops.create_circle(bm, segments=16, radius=radius)
-    # Rotate start verts so they face the end_bone so capsule can connect properly
-    align_with_end_bone_quat = get_quat_to_point_source_to_target(start_bone_child, end_bone_child)
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(radians(90),4,'X'), verts=start_verts['verts'])
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(align_with_end_bone_quat.angle, 4, align_with_end_bone_quat.axis), verts=start_verts['verts'])
-    bmesh.ops.translate(bm, vec=start_bone_child.matrix_local.translation, verts=start_verts['verts'])
-    
-    # Handle ending side
-    end_verts = bmesh.ops.create_circle(bm, segments=16, radius=radius)
-    # Rotate end verts so they face the start_bone so capsule can connect properly
-    align_with_start_bone_quat = get_quat_to_point_source_to_target(end_bone_child, start_bone_child)
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(radians(90),4,'X'), verts=end_verts['verts'])
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(align_with_start_bone_quat.angle, 4, align_with_start_bone_quat.axis), verts=end_verts['verts'])
-    bmesh.ops.translate(bm, vec=end_bone_child.matrix_local.translation, verts=end_verts['verts'])
-    
-    # Assign weights
-    for v in start_verts['verts']:
-        g = v[deform_layer]
-        g[0] = 1.0
-    for v in end_verts['verts']:
-        g = v[deform_layer]
-        g[1] = 1.0
-
-    # Connect Ends
-    bmesh.ops.bridge_loops(bm, edges=bm.edges[:])
-
-    # Finalize
-    bm.to_mesh(obj.data)
-    bm.free()
+    write_tube_mesh(
+        obj,
+        start_bone_child.matrix_local.translation,
+        end_bone_child.matrix_local.translation,
+        radius,
+        radius,
+        [start_bone.name, end_bone.name],
+        end_group_index=1,
+    )
 
 def make_connection_obj(connection_name, radius, start_bone, end_bone):
     mesh: bpy.types.Mesh = bpy.data.meshes.new(connection_name)
@@ -144,73 +298,18 @@ def make_connection_obj(connection_name, radius, start_bone, end_bone):
     return obj
 
 def make_capsule_object(name, start_radius, end_radius, start_offset, end_offset, start_bone, end_bone, skin_to_start_only=False):
-    mesh: bpy.types.Mesh = bpy.data.meshes.new(name)
-    obj: bpy.types.Object = bpy.data.objects.new(mesh.name, mesh)
-    obj.vertex_groups.new(name=end_bone.name)
+    obj: bpy.types.Object = bpy.data.objects.new(name, get_unit_mesh('CYLINDER'))
     make_capsule_mesh(obj, start_radius, end_radius, start_offset, end_offset, start_bone, end_bone, skin_to_start_only)
     return obj
 
 def make_sphere_2(obj: bpy.types.Object, radius, offset, bone: bpy.types.Bone):
-    mesh = obj.data
-    obj.vertex_groups.clear()
-    obj.vertex_groups.new(name=bone.name)
-    bm = bmesh.new()
-    bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=radius)
-    bm.transform(Matrix.Translation(offset))
-    bm.transform(bone.matrix_local)
-    deform_layer = bm.verts.layers.deform.verify()
-    for v in bm.verts:
-        g = v[deform_layer]
-        g[0] = 1.0
-    bm.to_mesh(mesh)
-    bm.free()
+    set_shape_instance(obj, 'SPHERE', bone, bone.matrix_local @ Matrix.Translation(offset) @ Matrix.Scale(radius, 4))
 
 def make_sphere_object_2(name:str, radius: float, offset: tuple[float, float, float], bone: bpy.types.Bone):
-    mesh: bpy.types.Mesh = bpy.data.meshes.new(name)
-    obj: bpy.types.Object = bpy.data.objects.new(mesh.name, mesh)
+    obj: bpy.types.Object = bpy.data.objects.new(name, get_unit_mesh('SPHERE'))
     make_sphere_2(obj, radius, offset, bone)
     return obj
 
-def make_sphere(object:bpy.types.Object, radius, offset):
-    start_theta = radians(270)
-    theta_step = pi / 16
-    verts = [(0, -radius, 0)] # Bottom Pole
-    for iteration in range(1,16): # Dont make the top or bottom or sphere
-        theta = start_theta + theta_step * iteration
-        circle_radius = radius * cos(theta)
-        circle_y_offset = radius * sin(theta)
-        verts += verts_from_circle(circle_radius, 32, circle_y_offset)
-    verts += [(0, radius, 0)] # Top Pole
-    for index, v in enumerate(verts):
-        x,y,z = v
-        x += offset[0]
-        y += offset[1]
-        z += offset[2]
-        verts[index] = (x,y,z)
-    edges = []
-    for circle_index in range (0,15):
-        edges+= [(1 + (circle_index*32) + vi, 1 + (circle_index*32) + vi + 1) for vi in range(0,31)]
-        edges+= [(1 + (circle_index*32), 1 + (circle_index*32) + 31)]
-    faces = []
-    for circle_index in range (0,14):
-        faces+= [(1 + (circle_index*32) + vi, 1 + (circle_index*32) + vi + 32,
-                  1 + (circle_index*32) + vi + 33, 1 + (circle_index*32) + vi + 1)
-                  for vi in range(0,31)]
-        faces+= [(1 + (circle_index*32) + 0, 1 + (circle_index*32) + 31, 
-                  1 + (circle_index*32) + 32 + 31, 1 + (circle_index*32) + 32, )]
-    faces += [(0, 1 + vi, 1 + vi + 1) for vi in range (0,31)] # Faces for bottom fan
-    faces += [(0, 32, 1)]
-    final = len(verts) - 1
-    faces += [(final, final - 32 + vi + 1, final - 32 + vi) for vi in range(0,31)] # Faces for top fan
-    faces += [(final, final - 32, final - 1)]    
-    object.data.from_pydata(verts, edges, faces)
-
-def make_sphere_object(name, radius, offset=[0,0,0]):
-    mesh: bpy.types.Mesh = bpy.data.meshes.new(name)
-    obj: bpy.types.Object = bpy.data.objects.new(mesh.name, mesh)
-    make_sphere(obj, radius, offset)
-    return obj
-
 """def make_ellipsoid_object(name, radius=1.0, offset=Vector([0.0,0.0,0.0]), rotation=Vector([0.0,0.0,0.0]), scale=Vector([1.0,1.0,1.0])):
     mesh: bpy.types.Mesh = bpy.data.meshes.new(name)
     obj: bpy.types.Object = bpy.data.objects.new(mesh.name, mesh)
@@ -233,44 +332,23 @@ def make_sphere_object(name, radius, offset=[0,0,0]):
         vert.co = ((co.x+offset.x, co.y+offset.y, co.z+offset.z))
     return obj"""
 
-def make_ellipsoid_mesh(obj, offset, rotation, scale, bone):
-    mesh = obj.data
-    obj.vertex_groups.clear()
-    obj.vertex_groups.new(name=bone.name)
-    bm = bmesh.new()
-    bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=1.0)
+def get_ellipsoid_matrix(offset, rotation, scale) -> Matrix:
+    # Transforms a unit sphere to the ellipsoid in the space of its bone.
     tm = Matrix.Translation(offset)
     rq = Quaternion([radians(angle) for angle in rotation])
     rm = Matrix.Rotation(rq.angle, 4, rq.axis)
     sm = Matrix.Diagonal((scale[0], scale[1], scale[2], 1.0))
-    mat = Matrix(tm @ rm @ sm) 
-    bm.transform(mat)
-    bm.transform(bone.matrix_local)
-    deform_layer = bm.verts.layers.deform.verify()
-    for v in bm.verts:
-        g = v[deform_layer]
-        g[0] = 1.0
-    bm.to_mesh(mesh)
-    bm.free()
+    return Matrix(tm @ rm @ sm)
+
+def make_ellipsoid_mesh(obj, offset, rotation, scale, bone):
+    set_shape_instance(obj, 'SPHERE', bone, bone.matrix_local @ get_ellipsoid_matrix(offset, rotation, scale))
 
 def make_ellipsoid_object(name, offset, rotation, scale, bone):
-    mesh: bpy.types.Mesh = bpy.data.meshes.new(name)
-    obj: bpy.types.Object = bpy.data.objects.new(mesh.name, mesh)
+    obj: bpy.types.Object = bpy.data.objects.new(name, get_unit_mesh('SPHERE'))
     make_ellipsoid_mesh(obj, offset, rotation, scale, bone)
     return obj
 
 def make_plane_mesh(obj: Object, bone: Bone, nx: float, ny: float, nz: float, d: float):
-    # Handle vertex groups
-    obj.vertex_groups.clear()
-    obj.vertex_groups.new(name=bone.name)
-
-    # Init bmesh
-    bm = bmesh.new()
-    deform_layer = bm.verts.layers.deform.verify()
-
-    # Create Plane
-    geom = bmesh.ops.create_grid(bm, x_segments=2, y_segments=2, size=4)
-    
     # Calculate needed rotation
     up_vec = Vector([0,1,0])
     goal_normal = Vector([nx, ny, nz])
@@ -280,25 +358,13 @@ def make_plane_mesh(obj: Object, bone: Bone, nx: float, ny: float, nz: float, d:
     w = up_vec.length * goal_normal.length + dot
     rotation = Quaternion([w] + list(cross))
     rotation.normalize()
-    
-    # The plane normal is from the bone's space
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(radians(90),4,'X'), verts=geom['verts'])
-    bmesh.ops.rotate(bm, matrix=Matrix.Rotation(rotation.angle, 4, rotation.axis), verts=geom['verts'])
-    bmesh.ops.transform(bm, matrix=bone.matrix_local, verts=geom['verts'])
-    bmesh.ops.translate(bm, vec=d*goal_normal, space=bone.matrix_local.inverted(), verts=geom['verts'])
-    
-    # Assign weights
-    for v in geom['verts']:
-        g = v[deform_layer]
-        g[0] = 1.0
 
-    # Finalize
-    bm.to_mesh(obj.data)
-    bm.free()
+    # The plane normal and distance are from the bone's space
+    mat = Matrix.Translation(d*goal_normal) @ Matrix.Rotation(rotation.angle, 4, rotation.axis)
+    set_shape_instance(obj, 'PLANE', bone, bone.matrix_local @ mat)
 
 def make_plane_object(name: str, bone: Bone, nx: float, ny: float, nz: float, d: float):
-    mesh: bpy.types.Mesh = bpy.data.meshes.new(name)
-    obj: bpy.types.Object = bpy.data.objects.new(mesh.name, mesh)
+    obj: bpy.types.Object = bpy.data.objects.new(name, get_unit_mesh('PLANE'))
 
     make_plane_mesh(obj, bone, nx, ny, nz, d)
     return obj
@@ -2,4 +2,5 @@ from . import material
 from . import mesh
 from . import skel
 from . import export_model
-from . import import_model
\ No newline at end of file
+from . import import_model
+from . import model_file_writer
\ No newline at end of file
@@ -8,15 +8,16 @@ import bmesh
 import re
 import traceback
 import cProfile
+from contextlib import contextmanager
 import pstats
 
 from pathlib import Path
 from bpy_extras.io_utils import ImportHelper
 from bpy.props import StringProperty, BoolProperty, EnumProperty
-from bpy.types import Operator, Panel, EditBone, Object, Context, EditBone, Mesh, MeshVertex, ShapeKey
+from bpy.types import Operator, Panel, EditBone, Object, Context, Bone, Mesh, ShapeKey
 from mathutils import Vector, Matrix
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, NamedTuple
 if TYPE_CHECKING:
     from .skel.helper_bone_data import SubHelperBoneData, AimConstraint, OrientConstraint
     from ..blender_property_extensions import SubSceneProperties
@@ -24,6 +25,12 @@ if TYPE_CHECKING:
 from ...dependencies import ssbh_data_py
 from ...dependencies import pyprc
 from .material import material_inputs
+from .mesh.split_skinned_meshes import split_large_skinned_meshes
+from .model_file_writer import ModelFileWriter
+from .mesh.optimize_vertex_cache import optimize_mesh_data
+from .mesh.normals_and_tangents import calculate_vertex_normals, calculate_vertex_tangents
+from .mesh import export_mesh_cache
+from .mesh.export_mesh_cache import CachedExportMesh
 
 
 class SUB_PT_export_model(Panel):
@@ -57,7 +64,17 @@ class SUB_PT_export_model(Panel):
             layout.row().operator('sub.model_exporter', icon='EXPORT', text='Export Model Files Anyways...')
             return
         
-        new_bones, missing_bones = get_standard_bone_changes(ssp.model_export_arma, ssp.vanilla_nusktb)
+        # Comparing against the vanilla skel is too slow to do on every redraw, so only show the cached result.
+        standard_bone_changes = get_cached_standard_bone_changes(ssp.model_export_arma, ssp.vanilla_nusktb)
+        if standard_bone_changes is None:
+            layout.row().label(text='The armature or vanilla .nusktb changed since the last check.', icon='INFO')
+            layout.row().operator('sub.standard_bone_changes_refresh', icon='FILE_REFRESH', text='Check for Standard Bone Changes')
+            layout.row().label(text='Selected reference .nusktb: ' + ssp.vanilla_nusktb)
+            layout.row().operator('sub.vanilla_nusktb_selector', icon='FILE', text='Re-Select Vanilla Nusktb')
+            layout.row().operator('sub.model_exporter', icon='EXPORT', text='Export Model Files to a Folder')
+            return
+
+        new_bones, missing_bones = standard_bone_changes
         if any(len(s) > 0 for s in (new_bones, missing_bones)):
             layout.row().label(text='Change in "Standard Bones" detected!')
             if len(new_bones) > 0:
@@ -95,8 +112,28 @@ class SUB_PT_export_model(Panel):
                 layout.row().operator('sub.vanilla_update_prc_selector', icon='FILE', text='Re-Select Vanilla update.prc')
         layout.row().label(text='Selected reference .nusktb: ' + ssp.vanilla_nusktb)
         layout.row().operator('sub.vanilla_nusktb_selector', icon='FILE', text='Re-Select Vanilla Nusktb')
+        layout.row().operator('sub.standard_bone_changes_refresh', icon='FILE_REFRESH', text='Re-Check Standard Bone Changes')
 
         layout.row().operator('sub.model_exporter', icon='EXPORT', text='Export Model Files to a Folder')
+
+class SUB_OP_standard_bone_changes_refresh(Operator):
+    bl_idname = 'sub.standard_bone_changes_refresh'
+    bl_label = 'Check Standard Bone Changes'
+    bl_description = 'Compares the armature with the vanilla .nusktb to find new or missing standard bones'
+
+    @classmethod
+    def poll(cls, context):
+        ssp: SubSceneProperties = context.scene.sub_scene_properties
+        return ssp.model_export_arma is not None and ssp.vanilla_nusktb != ''
+
+    def execute(self, context):
+        ssp: SubSceneProperties = context.scene.sub_scene_properties
+        try:
+            refresh_standard_bone_changes(ssp.model_export_arma, ssp.vanilla_nusktb)
+        except RuntimeError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        return {'FINISHED'}
     
 class SUB_OP_vanilla_update_prc_selector(Operator, ImportHelper):
     bl_idname = 'sub.vanilla_update_prc_selector'
@@ -119,7 +156,13 @@ class SUB_OP_vanilla_nusktb_selector(Operator, ImportHelper):
         options={'HIDDEN'}
     )
     def execute(self, context):
-        context.scene.sub_scene_properties.vanilla_nusktb = self.filepath
+        ssp: SubSceneProperties = context.scene.sub_scene_properties
+        ssp.vanilla_nusktb = self.filepath
+        if ssp.model_export_arma is not None:
+            try:
+                refresh_standard_bone_changes(ssp.model_export_arma, ssp.vanilla_nusktb)
+            except RuntimeError as e:
+                self.report({'ERROR'}, str(e))
         return {'FINISHED'}      
 
 class SUB_OP_model_exporter(Operator):
@@ -190,6 +233,17 @@ class SUB_OP_model_exporter(Operator):
         default='DISABLED',
     )
 
+    optimize_mesh_render_order: EnumProperty(
+        name="Render Order",
+        description="Reorders triangles and vertices so meshes render faster in game. The ACMR before and after is included in the export report",
+        items=(
+            ('DISABLED', "Don't optimize render order", "Triangles and vertices are exported in the order Blender has them."),
+            ('VERTEX_CACHE', "Optimize for the vertex cache", "Reorders triangles for the post-transform vertex cache and vertices for fetch locality."),
+            ('VERTEX_CACHE_AND_OVERDRAW', "Optimize for the vertex cache and overdraw", "Also sorts groups of triangles so outward facing triangles are drawn first."),
+        ),
+        default='DISABLED',
+    )
+
     armature_position: EnumProperty(
         name='Armature Pos.',
         description="Select 'Rest' to use the Rest (T-Pose, A-Pose, etc...) Position.",
@@ -219,6 +273,12 @@ class SUB_OP_model_exporter(Operator):
         default='IGNORE_SHAPEKEYS',
     )
 
+    use_mesh_cache: BoolProperty(
+        name='Reuse Unchanged Meshes',
+        description='Reuses the processed meshes from the previous export for meshes that have not changed since then. Disable this if an exported mesh is missing recent edits',
+        default=True,
+    )
+
     ignore_underscore_meshes: EnumProperty(
         name='Ignore Meshes',
         description="You can choose to not export some meshes on the model",
@@ -249,11 +309,20 @@ class SUB_OP_model_exporter(Operator):
     
     def execute(self, context):
         start = time.perf_counter()
-        with cProfile.Profile() as pr:
-            export_model(self, context, self.directory, self.include_numdlb, self.include_numshb, self.include_numshexb,
-                    self.include_nusktb, self.include_numatb, self.include_nuhlpb, self.include_nutexb, self.linked_nusktb_settings,
-                    self.optimize_mesh_weights_to_parent_bone, self.armature_position, self.apply_modifiers,
-                    self.split_shape_keys, self.ignore_underscore_meshes)
+        # Evaluate pending edits first, so the depsgraph update handler still marks the edited meshes as dirty.
+        context.view_layer.update()
+        # Changes made by the exporter itself shouldn't invalidate the cached meshes.
+        export_mesh_cache.ignore_updates = True
+        try:
+            with cProfile.Profile() as pr:
+                export_model(self, context, self.directory, self.include_numdlb, self.include_numshb, self.include_numshexb,
+                        self.include_nusktb, self.include_numatb, self.include_nuhlpb, self.include_nutexb, self.linked_nusktb_settings,
+                        self.optimize_mesh_weights_to_parent_bone, self.armature_position, self.apply_modifiers,
+                        self.split_shape_keys, self.ignore_underscore_meshes, self.optimize_mesh_render_order, self.use_mesh_cache)
+        finally:
+            # Evaluate the restored pose position and visibility while the updates are still ignored.
+            context.view_layer.update()
+            export_mesh_cache.ignore_updates = False
         if self.use_debug_timer:
             stats = pstats.Stats(pr)
             stats.sort_stats(pstats.SortKey.TIME)
@@ -349,7 +418,7 @@ def weights_to_parent_bones(ssbh_mesh_data: ssbh_data_py.mesh_data.MeshData, ssb
 
 def export_model(operator: bpy.types.Operator, context, directory, include_numdlb, include_numshb, include_numshexb, include_nusktb,
                 include_numatb, include_nuhlpb, include_nutexb, linked_nusktb_settings, optimize_mesh_weights:str, armature_position: str,
-                apply_modifiers: str, split_shape_keys: str, ignore_underscore_meshes:str):
+                apply_modifiers: str, split_shape_keys: str, ignore_underscore_meshes:str, optimize_mesh_render_order: str, use_mesh_cache: bool):
     # Prepare the scene for export and find the meshes to export.
     arma: bpy.types.Object = context.scene.sub_scene_properties.model_export_arma
     context.view_layer.objects.active = arma
@@ -373,149 +442,142 @@ def export_model(operator: bpy.types.Operator, context, directory, include_numdl
         selected_object.select_set(False)
 
     folder = Path(directory)
-    # Create and save files individually to make this step more robust.
-    # Users can avoid errors in generating a file by disabling export for that file.
-    if include_numshb or include_numshexb or include_numatb or include_numdlb:
-        # Only Mesh Objects, Skip Empty Objects
-        if ignore_underscore_meshes == 'IGNORE_STARTING_UNDERSCORE':
-            unprocessed_meshes: list[Object] = [child for child in arma.children if child.type == 'MESH' and len(child.data.vertices) > 0 and not child.name.startswith("_")] 
-        else:
-            unprocessed_meshes: list[Object] = [child for child in arma.children if child.type == 'MESH' and len(child.data.vertices) > 0] 
+    # Files are saved together at the end, skipping any files that didn't change.
+    file_writer = ModelFileWriter()
+    # Files that were already built are still written if a later step raises an exception.
+    try:
+        # Create and save files individually to make this step more robust.
+        # Users can avoid errors in generating a file by disabling export for that file.
+        if include_numshb or include_numshexb or include_numatb or include_numdlb:
+            # Only Mesh Objects, Skip Empty Objects
+            if ignore_underscore_meshes == 'IGNORE_STARTING_UNDERSCORE':
+                unprocessed_meshes: list[Object] = [child for child in arma.children if child.type == 'MESH' and len(child.data.vertices) > 0 and not child.name.startswith("_")] 
+            else:
+                unprocessed_meshes: list[Object] = [child for child in arma.children if child.type == 'MESH' and len(child.data.vertices) > 0] 
         
-        # Remove swing meshes
-        unprocessed_meshes = [mesh for mesh in unprocessed_meshes if mesh.data.sub_swing_data_linked_mesh.is_swing_mesh == False]
+            # Remove swing meshes
+            unprocessed_meshes = [mesh for mesh in unprocessed_meshes if mesh.sub_swing_data_linked_mesh.is_swing_mesh == False and mesh.data.sub_swing_data_linked_mesh.is_swing_mesh == False]
         
-        # TODO: Is it possible to keep the correct order for non imported meshes?
-        # TODO: Should users just re-order meshes in ssbh_editor instead?
-        unprocessed_meshes.sort(key=lambda mesh: mesh.get("numshb order", 10000))
-
-        if len(unprocessed_meshes) == 0:
-            message = f'No meshes are parented to the armature {arma.name}. Exported .NUMDLB, .NUMSHB, .NUMATB, and .NUMSHEXB files will have no entries.'
-            operator.report({'WARNING'}, message)
-
-        # Smash Ultimate groups mesh objects with the same name like 'c00BodyShape'.
-        # Blender appends numbers like '.001' to prevent duplicates, so we need to remove those before grouping.
-        # Use a dictionary since we can't assume meshes with the same name are contiguous.
-        group_name_to_unprocessed_meshes: dict[str, set[bpy.types.Object]] = {trim_name(mesh.name) : set() for mesh in unprocessed_meshes}
-        for mesh in unprocessed_meshes:
-            group_name_to_unprocessed_meshes[trim_name(mesh.name)].add(mesh)
+            # TODO: Is it possible to keep the correct order for non imported meshes?
+            # TODO: Should users just re-order meshes in ssbh_editor instead?
+            unprocessed_meshes.sort(key=lambda mesh: mesh.get("numshb order", 10000))
+
+            if len(unprocessed_meshes) == 0:
+                message = f'No meshes are parented to the armature {arma.name}. Exported .NUMDLB, .NUMSHB, .NUMATB, and .NUMSHEXB files will have no entries.'
+                operator.report({'WARNING'}, message)
+
+            # Smash Ultimate groups mesh objects with the same name like 'c00BodyShape'.
+            # Blender appends numbers like '.001' to prevent duplicates, so we need to remove those before grouping.
+            # Use a dictionary since we can't assume meshes with the same name are contiguous.
+            group_name_to_unprocessed_meshes: dict[str, set[bpy.types.Object]] = {trim_name(mesh.name) : set() for mesh in unprocessed_meshes}
+            for mesh in unprocessed_meshes:
+                group_name_to_unprocessed_meshes[trim_name(mesh.name)].add(mesh)
         
-        ssbh_mesh_data = None
-        ssbh_modl_data = None
-        ssbh_matl_data = None
-        group_name_to_unprocessed_meshes_to_export_meshes, new_shape_key_meshes = get_processed_meshes(operator, context, group_name_to_unprocessed_meshes, apply_modifiers, split_shape_keys, armature_position)
-        try:
-            if include_numshb:
-                try:
-                    ssbh_mesh_data = make_ssbh_mesh_data(operator, context, group_name_to_unprocessed_meshes_to_export_meshes)
-                except Exception as e:
-                    operator.report({'ERROR'}, f'Failed to make ssbh mesh data, but will try to make the rest. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+            ssbh_mesh_data = None
+            ssbh_modl_data = None
+            ssbh_matl_data = None
+            group_name_to_unprocessed_meshes_to_export_meshes, export_mesh_objects, unprocessed_mesh_to_fingerprint = get_processed_meshes(
+                operator, context, group_name_to_unprocessed_meshes, apply_modifiers, split_shape_keys, armature_position, use_mesh_cache)
+            try:
+                if include_numshb:
+                    try:
+                        ssbh_mesh_data = make_ssbh_mesh_data(operator, context, group_name_to_unprocessed_meshes_to_export_meshes, unprocessed_mesh_to_fingerprint)
+                    except Exception as e:
+                        operator.report({'ERROR'}, f'Failed to make ssbh mesh data, but will try to make the rest. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
 
-            if include_numdlb:
-                try:
-                    ssbh_modl_data = make_ssbh_modl_data(operator, context, group_name_to_unprocessed_meshes_to_export_meshes)
-                except Exception as e:
-                    operator.report({'ERROR'}, f'Failed to make modl_data (.NUMDLB), but will try to make the rest. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
-            
-            if include_numatb:
-                just_export_meshes = set()
-                for unprocessed_meshes_to_export_meshes in group_name_to_unprocessed_meshes_to_export_meshes.values():
-                    for export_meshes in unprocessed_meshes_to_export_meshes.values():
-                        for export_mesh in export_meshes:
-                            just_export_meshes.add(export_mesh)
-                
-                ssbh_matl_data = create_matl(operator, just_export_meshes)
-                if ssbh_matl_data is not None:
-                    trim_matl_texture_names(operator, ssbh_matl_data)
-                if ssbh_modl_data is not None and ssbh_matl_data is not None:
-                    trim_material_labels(operator, ssbh_modl_data, ssbh_matl_data)
-                if include_nutexb:
+                if include_numdlb:
                     try:
-                        materials = get_mesh_materials(operator, just_export_meshes)
-                        from .material.texture.export_nutexb import export_nutexb_from_blender_materials
-                        export_nutexb_from_blender_materials(operator, materials, folder)
+                        ssbh_modl_data = make_ssbh_modl_data(operator, context, group_name_to_unprocessed_meshes_to_export_meshes)
                     except Exception as e:
-                        operator.report({'ERROR'}, f'Texture exporting stopped early, error = {e} ; Traceback=\n{traceback.format_exc()}')
-            if include_numshexb:
+                        operator.report({'ERROR'}, f'Failed to make modl_data (.NUMDLB), but will try to make the rest. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+
                 if ssbh_mesh_data is not None:
                     try:
-                        create_and_save_meshex(operator, folder, ssbh_mesh_data)
+                        split_large_skinned_meshes(operator, ssbh_mesh_data, ssbh_modl_data)
                     except Exception as e:
-                        operator.report({'ERROR'}, f'Failed to make mesh ex data (.NUMSHEXB), but will try to make the rest. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
-        finally:
-            for group_name, unprocessed_meshes_to_export_meshes in group_name_to_unprocessed_meshes_to_export_meshes.items():
-                for unprocessed_mesh, export_meshes in unprocessed_meshes_to_export_meshes.items():
-                    for export_mesh in export_meshes:
-                        bpy.data.meshes.remove(export_mesh.data)
-            for new_shape_key_mesh in new_shape_key_meshes:
-                bpy.data.meshes.remove(new_shape_key_mesh.data)
-
-    if include_nusktb:
-        ssbh_skel_data, prc = create_skel_and_prc(operator, context, linked_nusktb_settings, folder)
-
-    if include_numshb and include_nusktb:
-        if ssbh_mesh_data is not None and ssbh_skel_data is not None:
-            if optimize_mesh_weights == 'ENABLED':
-                weights_to_parent_bones(ssbh_mesh_data, ssbh_skel_data)
-
-    if include_numshb:
-        if ssbh_mesh_data is not None:
-            path = str(folder.joinpath('model.numshb'))
-            try:
-                ssbh_mesh_data.save(path)
-            except Exception as e:
-                operator.report({'ERROR'}, f'Failed to save {path}: {e}')
+                        operator.report({'ERROR'}, f'Failed to split meshes over the skinned vertex limit. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
 
-    if include_nusktb:
-        if ssbh_skel_data is not None:
-            path = str(folder.joinpath('model.nusktb'))
-            try:
-                ssbh_skel_data.save(path)
-            except Exception as e:
-                operator.report({'ERROR'}, f'Failed to save .nusktb, Error="{e}" ; Traceback=\n{traceback.format_exc()}')
-        prc_path = str(folder.joinpath('update.prc'))
-        if prc is not None:
-            try:
-                prc.save(prc_path)
-            except Exception as e:
-                operator.report({'ERROR'}, f'Failed to save update.prc, Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+                if ssbh_mesh_data is not None and optimize_mesh_render_order != 'DISABLED':
+                    try:
+                        optimize_mesh_data(operator, ssbh_mesh_data, optimize_mesh_render_order == 'VERTEX_CACHE_AND_OVERDRAW')
+                    except Exception as e:
+                        operator.report({'ERROR'}, f'Failed to optimize the mesh render order. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+            
+                if include_numatb:
+                    just_export_meshes = set()
+                    for unprocessed_meshes_to_export_meshes in group_name_to_unprocessed_meshes_to_export_meshes.values():
+                        for export_meshes in unprocessed_meshes_to_export_meshes.values():
+                            for export_mesh in export_meshes:
+                                just_export_meshes.add(get_blender_export_mesh(export_mesh))
+                
+                    ssbh_matl_data = create_matl(operator, just_export_meshes)
+                    if ssbh_matl_data is not None:
+                        trim_matl_texture_names(operator, ssbh_matl_data)
+                    if ssbh_modl_data is not None and ssbh_matl_data is not None:
+                        trim_material_labels(operator, ssbh_modl_data, ssbh_matl_data)
+                    if include_nutexb:
+                        try:
+                            materials = get_mesh_materials(operator, just_export_meshes)
+                            from .material.texture.export_nutexb import export_nutexb_from_blender_materials
+                            export_nutexb_from_blender_materials(operator, materials, folder)
+                        except Exception as e:
+                            operator.report({'ERROR'}, f'Texture exporting stopped early, error = {e} ; Traceback=\n{traceback.format_exc()}')
+                if include_numshexb:
+                    if ssbh_mesh_data is not None:
+                        try:
+                            ssbh_meshex_data = ssbh_data_py.meshex_data.MeshExData.from_mesh_objects(ssbh_mesh_data.objects)
+                            file_writer.add(folder.joinpath('model.numshexb'), ssbh_meshex_data.save, '.numshexb')
+                        except Exception as e:
+                            operator.report({'ERROR'}, f'Failed to make mesh ex data (.NUMSHEXB), but will try to make the rest. Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+            finally:
+                for export_mesh_object in export_mesh_objects:
+                    bpy.data.meshes.remove(export_mesh_object.data)
 
-    if include_nuhlpb:
-        try:
-            create_and_save_nuhlpb(folder.joinpath('model.nuhlpb'), arma)
-        except Exception as e:
-            operator.report({'ERROR'}, f'Failed to create .nuhlpb, Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+        if include_nusktb:
+            ssbh_skel_data, prc = create_skel_and_prc(operator, context, linked_nusktb_settings, folder)
 
-    if include_numdlb:
-        if ssbh_modl_data is not None:
-            path = str(folder.joinpath('model.numdlb'))
-            try:
-                ssbh_modl_data.save(path)
-            except Exception as e:
-                operator.report({'ERROR'}, f'Failed to save {path}: {e}')
+        if include_numshb and include_nusktb:
+            if ssbh_mesh_data is not None and ssbh_skel_data is not None:
+                if optimize_mesh_weights == 'ENABLED':
+                    weights_to_parent_bones(ssbh_mesh_data, ssbh_skel_data)
+
+        if include_numshb:
+            if ssbh_mesh_data is not None:
+                file_writer.add(folder.joinpath('model.numshb'), ssbh_mesh_data.save, '.numshb')
 
-    if include_numatb:
-        if ssbh_matl_data is not None:
-            path = str(folder.joinpath('model.numatb'))
+        if include_nusktb:
+            if ssbh_skel_data is not None:
+                file_writer.add(folder.joinpath('model.nusktb'), ssbh_skel_data.save, '.nusktb')
+            if prc is not None:
+                file_writer.add(folder.joinpath('update.prc'), prc.save, 'update.prc')
+
+        if include_nuhlpb:
             try:
-                ssbh_matl_data.save(path)
+                ssbh_hlpb_data = create_nuhlpb(arma)
+                file_writer.add(folder.joinpath('model.nuhlpb'), ssbh_hlpb_data.save, '.nuhlpb')
             except Exception as e:
-                operator.report({'ERROR'}, f'Failed to save .numatb, Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+                operator.report({'ERROR'}, f'Failed to create .nuhlpb, Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+
+        if include_numdlb:
+            if ssbh_modl_data is not None:
+                file_writer.add(folder.joinpath('model.numdlb'), ssbh_modl_data.save, '.numdlb')
+
+        if include_numatb:
+            if ssbh_matl_data is not None:
+                file_writer.add(folder.joinpath('model.numatb'), ssbh_matl_data.save, '.numatb')
     
-    # Create adjb, if needed
-    if include_numdlb and include_numshb and include_numatb:
-        if all(data is not None for data in (ssbh_matl_data, ssbh_modl_data, ssbh_mesh_data)):
-            renormal_meshes: list[tuple[str, int]] = [(entry.mesh_object_name, entry.mesh_object_subindex) for entry in ssbh_modl_data.entries if entry.material_label.startswith("RENORMAL")]
-            if len(renormal_meshes) > 0:
-                ssbh_adj_data = ssbh_data_py.adj_data.AdjData()
-                for mesh_object_index, mesh_object in enumerate(ssbh_mesh_data.objects):
-                    if (mesh_object.name, mesh_object.subindex) in renormal_meshes:
-                        ssbh_adj_data.entries.append(ssbh_data_py.adj_data.AdjEntryData.from_mesh_object(mesh_object_index, mesh_object))
-                path = str(folder.joinpath('model.adjb'))
-                try:
-                    ssbh_adj_data.save(path)
-                except Exception as e:
-                    operator.report({'ERROR'}, f'Failed to save .adjb, Error="{e}" ; Traceback=\n{traceback.format_exc()}')
+        # Create adjb, if needed
+        if include_numdlb and include_numshb and include_numatb:
+            if all(data is not None for data in (ssbh_matl_data, ssbh_modl_data, ssbh_mesh_data)):
+                renormal_meshes: list[tuple[str, int]] = [(entry.mesh_object_name, entry.mesh_object_subindex) for entry in ssbh_modl_data.entries if entry.material_label.startswith("RENORMAL")]
+                if len(renormal_meshes) > 0:
+                    ssbh_adj_data = ssbh_data_py.adj_data.AdjData()
+                    for mesh_object_index, mesh_object in enumerate(ssbh_mesh_data.objects):
+                        if (mesh_object.name, mesh_object.subindex) in renormal_meshes:
+                            ssbh_adj_data.entries.append(ssbh_data_py.adj_data.AdjEntryData.from_mesh_object(mesh_object_index, mesh_object))
+                    file_writer.add(folder.joinpath('model.adjb'), ssbh_adj_data.save, '.adjb')
+    finally:
+        file_writer.write(operator)
                     
     if arma.animation_data is not None:
         from ..anim.import_anim import setup_visibility_drivers
@@ -528,13 +590,13 @@ def create_skel_and_prc(operator, context, linked_nusktb_settings, folder) -> tu
         ssbh_skel_data, prc = make_skel(operator, context, linked_nusktb_settings)
     except RuntimeError as e:
         operator.report({'ERROR'},  f'Failed to make skel for export, Error="{e}" ; Traceback=\n{traceback.format_exc()}')
-        return
+        return None, None
 
     # The uniform buffer for bone transformations in the skinning shader has a fixed size.
     # Limit exports to 511 bones to prevent rendering issues and crashes in game.
     if len(ssbh_skel_data.bones) > 511:
         operator.report({'ERROR'}, f'{len(ssbh_skel_data.bones)} bones exceeds the maximum supported count of 511.')
-        return
+        return None, None
 
     """path = str(folder.joinpath('model.nusktb'))
     try:
@@ -552,27 +614,18 @@ def create_skel_and_prc(operator, context, linked_nusktb_settings, folder) -> tu
     return (ssbh_skel_data, prc)
 
 
-def create_and_save_meshex(operator, folder, ssbh_mesh_data):
-    meshex = ssbh_data_py.meshex_data.MeshExData.from_mesh_objects(ssbh_mesh_data.objects)
-
-    path = str(folder.joinpath('model.numshexb'))
-    try:
-        meshex.save(path)
-    except Exception as e:
-        operator.report({'ERROR'}, f'Failed to save {path}: {e}')
-
-
 def get_mesh_materials(operator, export_meshes) -> set[bpy.types.Material]:
     #  Gather Material Info
     materials = set()
     for mesh in export_meshes:
-        if len(mesh.data.materials) > 0:
-            if mesh.data.materials[0] is not None:
-                if len(mesh.data.materials) > 1:
+        mesh_materials = get_export_mesh_materials(mesh)
+        if len(mesh_materials) > 0:
+            if mesh_materials[0] is not None:
+                if len(mesh_materials) > 1:
                     message = f'The mesh {mesh.name} has more than one material slot. Only the first material will be exported.'
                     operator.report({'WARNING'}, message)
 
-                materials.add(mesh.data.materials[0])
+                materials.add(mesh_materials[0])
             else:
                 message = f'The mesh {mesh.name} has no material created for the first material slot.' 
                 message += ' Cannot create model.numatb. Create a material or disable .NUMATB export.'
@@ -610,11 +663,12 @@ def create_and_save_matl(operator, folder, export_meshes):
 
 
 def get_material_label_from_mesh(operator, mesh):
-    if len(mesh.material_slots) == 0:
+    mesh_materials = get_export_mesh_materials(mesh)
+    if len(mesh_materials) == 0:
         message = f'No material assigned for {mesh.name}. Cannot create model.numdlb. Assign a material or disable .NUMDLB export.'
         raise RuntimeError(message)
 
-    material = mesh.material_slots[0].material
+    material = mesh_materials[0]
 
     if material is None:
         message = f'The mesh {mesh.name} has no material created for the first material slot.' 
@@ -928,58 +982,144 @@ def per_loop_to_per_vertex(per_loop, vertex_indices, dim):
     per_vertex[vertex_indices] = per_loop.reshape((-1, cols))
     return per_vertex
 
-def split_mesh_shape_keys_to_new_meshes(operator: Operator, context: Context, mesh_object: Object) -> set[Object]:
+class ShapeKeyExportMesh(NamedTuple):
+    """
+    A `_VIS` shape key exported as its own mesh.
+    Only the positions, normals, and tangents differ from the processed export mesh of the base shape.
+    """
+    export_mesh: Object | CachedExportMesh
+    shape_key_name: str
+    # The shape key positions evaluated through the modifiers, or None to add the shape key offsets to the base positions.
+    evaluated_positions: 'EvaluatedShapeKeyPositions | None' = None
+
+class EvaluatedShapeKeyPositions:
+    """
+    The exported position of each original vertex with the shape key and modifiers applied.
+    This is a class instead of an array so ShapeKeyExportMesh stays hashable.
+    """
+    def __init__(self, positions: np.ndarray):
+        self.positions = positions
+
+def get_blender_export_mesh(export_mesh: Object | CachedExportMesh | ShapeKeyExportMesh) -> Object | CachedExportMesh:
+    if isinstance(export_mesh, ShapeKeyExportMesh):
+        return export_mesh.export_mesh
+    return export_mesh
+
+def get_export_mesh_materials(export_mesh: Object | CachedExportMesh) -> list[bpy.types.Material | None]:
+    if isinstance(export_mesh, CachedExportMesh):
+        return [export_mesh.material]
+    return list(export_mesh.data.materials)
+
+def get_export_mesh_source_indices(export_mesh: Object | CachedExportMesh) -> np.ndarray | None:
+    if isinstance(export_mesh, CachedExportMesh):
+        return export_mesh.source_indices
+    source_index_attribute = export_mesh.data.attributes.get('_smush_blender_source_index')
+    if source_index_attribute is None:
+        return None
+    source_indices = np.zeros(len(export_mesh.data.vertices), dtype=np.int32)
+    source_index_attribute.data.foreach_get('value', source_indices)
+    return source_indices
+
+def has_deform_modifiers(mesh_object: Object, armature_position: str) -> bool:
+    # The Armature modifier is only evaluated when exporting the pose position.
+    return any(modifier.show_viewport and (modifier.type != 'ARMATURE' or armature_position == 'POSE') for modifier in mesh_object.modifiers)
+
+def get_evaluated_shape_key_positions(context: Context, mesh_object: Object, armature_position: str, shape_key_index: int) -> EvaluatedShapeKeyPositions:
+    with evaluated_export_object(context, mesh_object, armature_position, shape_key_index) as evaluated_object:
+        evaluated_mesh = evaluated_object.to_mesh()
+        try:
+            positions = np.zeros(len(evaluated_mesh.vertices) * 3, dtype=np.float32)
+            evaluated_mesh.vertices.foreach_get('co', positions)
+        finally:
+            evaluated_object.to_mesh_clear()
+
+    # Apply the same transforms as the base export mesh.
+    axis_correction = np.array(Matrix.Rotation(math.radians(90), 3, 'X'))
+    matrix = np.array(mesh_object.matrix_basis, dtype=np.float32)
+    positions = positions.reshape((-1, 3)) @ matrix[:3,:3].T + matrix[:3,3]
+    return EvaluatedShapeKeyPositions(positions @ axis_correction)
+
+def get_vis_shape_keys(mesh_object: Object) -> list[ShapeKey]:
     if mesh_object.data.shape_keys is None:
-        return set()
+        return []
     if mesh_object.data.shape_keys.key_blocks is None:
-        return set()
-    shape_keys_to_split: set[ShapeKey] = {sk for sk in mesh_object.data.shape_keys.key_blocks if "_VIS" in sk.name}
-    if len(shape_keys_to_split) == 0:
-        return set()
-    
-    new_meshes: set[Object] = set()
-    for shape_key_to_split in shape_keys_to_split:
-        shape_key_mesh_copy: Object = mesh_object.copy()
-        shape_key_mesh_copy.data: Mesh = mesh_object.data.copy()
-        shape_key_mesh_copy.name = shape_key_to_split.name
-        shape_key_mesh_copy.show_only_shape_key = True
-        shape_key_mesh_copy.active_shape_key_index = shape_key_mesh_copy.data.shape_keys.key_blocks.find(shape_key_to_split.name)
-        shape_key_mesh_copy.shape_key_add(name="_smush_blender_combined_key", from_mix=True)
-        for sk in shape_key_mesh_copy.data.shape_keys.key_blocks:
-            shape_key_mesh_copy.shape_key_remove(sk)
-        context.collection.objects.link(shape_key_mesh_copy)
-        
-        new_meshes.add(shape_key_mesh_copy)
-    print(f'{new_meshes=}')
-    return new_meshes
+        return []
+    return [sk for sk in mesh_object.data.shape_keys.key_blocks if "_VIS" in sk.name]
 
-def process_mesh(operator: Operator, context: Context, mesh_object_copy: Object, mesh_name_in_errors: str,
-                apply_modifiers: str, armature_position: str) -> set[Object]:
+@contextmanager
+def evaluated_export_object(context: Context, mesh_object: Object, armature_position: str, shape_key_index: int=0):
     """
-    Always returns at least one mesh, but since processing a mesh may split it by material, more than one mesh could be returned. 
+    Yields the evaluated version of a temporary object that shares the mesh data and modifiers of mesh_object.
+    The temporary object shows only one shape key, the basis by default, and only keeps the Armature modifier for the pose position.
+    The original object is never edited, so this also works for linked objects.
     """
+    # Copying the object shares its mesh data instead of copying it.
+    evaluation_object: Object = mesh_object.copy()
+    try:
+        if armature_position != 'POSE':
+            for modifier in [modifier for modifier in evaluation_object.modifiers if modifier.type == 'ARMATURE']:
+                evaluation_object.modifiers.remove(modifier)
+        if mesh_object.data.shape_keys is not None:
+            evaluation_object.show_only_shape_key = True
+            evaluation_object.active_shape_key_index = shape_key_index
+        # The scene collection is never excluded from the view layer, so the object is always evaluated.
+        evaluation_object.hide_viewport = False
+        context.scene.collection.objects.link(evaluation_object)
+        # The depsgraph needs to be evaluated again to include the new object.
+        depsgraph = context.evaluated_depsgraph_get()
+        yield evaluation_object.evaluated_get(depsgraph)
+    finally:
+        bpy.data.objects.remove(evaluation_object)
+
+def make_export_mesh_object(context: Context, mesh_object: Object, apply_modifiers: str, armature_position: str,
+                            track_source_vertices: bool, shape_key_index: int=0) -> Object:
+    """
+    Creates a temporary object holding the geometry to export.
+    The original mesh data is never copied, and the original object is never edited.
+    """
+    if apply_modifiers == 'APPLY':
+        # The depsgraph evaluates the whole modifier stack at once instead of applying one modifier at a time.
+        with evaluated_export_object(context, mesh_object, armature_position, shape_key_index) as evaluated_object:
+            mesh_data: Mesh = bpy.data.meshes.new_from_object(evaluated_object, preserve_all_data_layers=True, depsgraph=context.evaluated_depsgraph_get())
+    else:
+        # Original objects give the undeformed geometry without modifiers or shape keys.
+        mesh_data: Mesh = bpy.data.meshes.new_from_object(mesh_object, preserve_all_data_layers=True)
+        if shape_key_index != 0:
+            shape_key: ShapeKey = mesh_object.data.shape_keys.key_blocks[shape_key_index]
+            key_coords = np.zeros(len(shape_key.data) * 3, dtype=np.float32)
+            shape_key.data.foreach_get('co', key_coords)
+            mesh_data.vertices.foreach_set('co', key_coords)
+
+    # Materials linked to the object instead of the mesh aren't part of the mesh data.
+    for index, material_slot in enumerate(mesh_object.material_slots):
+        if index < len(mesh_data.materials):
+            mesh_data.materials[index] = material_slot.material
 
     # Apply any transforms before exporting to preserve vertex positions.
     # Assume the meshes have no children that would inherit their transforms.
-    mesh_object_copy.data.transform(mesh_object_copy.matrix_basis)
-    mesh_object_copy.matrix_basis.identity()
-
-    # Remove shapekeys 
-    mesh_object_copy.shape_key_clear()
-    
-    # Apply Modifiers
-    if apply_modifiers == 'APPLY':
-        override = context.copy()
-        override['object'] = mesh_object_copy
-        override['active_object'] = mesh_object_copy
-        override['selected_objects'] = [mesh_object_copy]
-        with context.temp_override(**override):
-            for modifier in mesh_object_copy.modifiers:
-                if armature_position == 'REST': # Optimization to speed up export when the user doesn't want to export armature changes anyways
-                    if modifier.type != 'ARMATURE':
-                        bpy.ops.object.modifier_apply(modifier=modifier.name)
-                else:
-                    bpy.ops.object.modifier_apply(modifier=modifier.name)
+    mesh_data.transform(mesh_object.matrix_basis)
+
+    # Remember the original vertex of each export vertex to map shape key coordinates after processing.
+    # This is only possible if the modifiers didn't change the vertex count.
+    if track_source_vertices and len(mesh_data.vertices) == len(mesh_object.data.vertices):
+        source_indices = mesh_data.attributes.new(name='_smush_blender_source_index', type='INT', domain='POINT')
+        source_indices.data.foreach_set('value', np.arange(len(mesh_data.vertices), dtype=np.int32))
+
+    export_mesh_object: Object = bpy.data.objects.new(mesh_object.name, mesh_data)
+    # Vertex group names should come with the mesh data, but make sure the weights can still be matched to bones.
+    if len(export_mesh_object.vertex_groups) == 0:
+        for vertex_group in mesh_object.vertex_groups:
+            export_mesh_object.vertex_groups.new(name=vertex_group.name)
+    # This is needed for split_duplicate_loop_attributes()
+    context.collection.objects.link(export_mesh_object)
+    return export_mesh_object
+
+def process_mesh(operator: Operator, context: Context, mesh_object_copy: Object, mesh_name_in_errors: str) -> set[Object]:
+    """
+    Always returns at least one mesh, but since processing a mesh may split it by material, more than one mesh could be returned. 
+    """
+    # Meshes without custom normals get smooth normals calculated from the split vertices instead.
+    has_custom_normals = mesh_object_copy.data.has_custom_normals
 
     # Cleanup and dissolve degen
     # https://blender.stackexchange.com/questions/139615/bmesh-ops-method-to-get-loose-vertices-edges-and-delete-from-that-list
@@ -1062,6 +1202,9 @@ def process_mesh(operator: Operator, context: Context, mesh_object_copy: Object,
         dest_obj.data.materials.append(mat)
         split_meshes.add(dest_obj)
     
+    if not has_custom_normals:
+        return split_meshes
+
     for split_mesh in split_meshes:
         # Extract the custom normals preserved in the color attribute.
         # Color attributes should not be affected by splitting or triangulating.
@@ -1081,7 +1224,8 @@ def process_mesh(operator: Operator, context: Context, mesh_object_copy: Object,
 
 def get_processed_meshes(operator: bpy.types.Operator, context: bpy.types.Context,
                     group_name_to_unprocessed_meshes: dict[str, set[bpy.types.Object]],
-                    apply_modifiers: str, split_shape_keys: str, armature_position: str) -> tuple[dict[str, dict[Object, set[Object]]], set[object]]:
+                    apply_modifiers: str, split_shape_keys: str, armature_position: str,
+                    use_mesh_cache: bool) -> tuple[dict[str, dict[Object, set[Object | CachedExportMesh | ShapeKeyExportMesh]]], set[Object], dict[Object, tuple]]:
     '''
     Splitting by shape key and by material may add more meshes to export, so need to track the new meshes.
     In addition the new shapekeys could be named completely differently
@@ -1091,7 +1235,6 @@ def get_processed_meshes(operator: bpy.types.Operator, context: bpy.types.Contex
         |-> Cube.001     "Unprocessed Mesh" # This is the mesh in blender un-modified with its un-trimmed name and shape keys that the user wants to export.
             |-> Cube.003 "Export Mesh"      # Every blender mesh will make at least one temporary "Export Mesh". This is the mesh that has been modified and cleaned up.
             |-> Cube.004 "Export Mesh"      # Maybe this one has two export meshes because it had more than one material
-            |-> Cube.005 "Export Mesh"      # Or maybe it had shape keys
         |-> Cube.002     "Unprocessed Mesh" # For proper error reporting, unprocessed meshes need to be tracked as well
             |-> Cube.006 "Export Mesh"      # Since saying "Cube.006 Failed" would not be helpful when "Cube.006" is not a mesh the user made
         |-> Cube.003
@@ -1099,72 +1242,142 @@ def get_processed_meshes(operator: bpy.types.Operator, context: bpy.types.Contex
     |-> Sphere           "Group Name"
         |-> ....
     |-> C_VIS            "Group Name"        # New group name for new shape key mesh name
-        |-> C_VIS        "Unprocessed Mesh"  # This is the shape key mesh, split off from its original mesh, but it still has modifiers
-            |-> C_VIS.001"Export Mesh"       # This is the shape key mesh after processing, applied modifiers, split materials, etc.
-            |-> C_VIS.002"Export Mesh"
+        |-> Cube.001     "Unprocessed Mesh"  # This is the mesh that has the shape key
+            |-> Cube.003 "Shape Key Export Mesh" # This reuses the processed "Export Mesh" with the shape key positions, no new mesh is made.
+            |-> Cube.004 "Shape Key Export Mesh"
+    Also returns every temporary export mesh, since the excluded base meshes are still needed by the shape key meshes.
+    Unprocessed meshes that didn't change since the last export reuse their cached export meshes instead of temporary meshes.
+    The fingerprints of the processed unprocessed meshes are returned for caching their export meshes once they are converted.
     '''
-    # Meshes with shape keys will make more "groups" with more "unprocessed meshes"
-    new_shape_key_meshes: set[Object] = set()
-    # If a mesh was succesfully split into multiple shapekey
-    meshes_that_split_into_shapekeys: set[Object] = set()
+    unprocessed_mesh_to_vis_shape_keys: dict[Object, list[ShapeKey]] = {}
     if split_shape_keys in ('EXPORT_INCLUDE_ORIGINAL', 'EXPORT_EXCULDE_ORIGINAL'):
-        for group_name, unprocessed_meshes in group_name_to_unprocessed_meshes.items():
+        for unprocessed_meshes in group_name_to_unprocessed_meshes.values():
             for unprocessed_mesh in unprocessed_meshes:
-                meshes = split_mesh_shape_keys_to_new_meshes(operator, context, unprocessed_mesh)
-                if len(meshes) > 0:
-                    new_shape_key_meshes |= meshes
-                    meshes_that_split_into_shapekeys.add(unprocessed_mesh)
-    
-        # Remove the split shapekey meshes if needed
-        if split_shape_keys == 'EXPORT_EXCULDE_ORIGINAL':
-            group_names = group_name_to_unprocessed_meshes.keys()
-            for group_name in group_names:
-                unprocessed_meshes = group_name_to_unprocessed_meshes[group_name]
-                group_name_to_unprocessed_meshes[group_name] = unprocessed_meshes - meshes_that_split_into_shapekeys
-    
-        group_names = group_name_to_unprocessed_meshes.keys()
-        new_group_names = {trim_name(new_shape_key_mesh.name) for new_shape_key_mesh in new_shape_key_meshes}
-        for missing_name in new_group_names - group_names:
-            group_name_to_unprocessed_meshes[missing_name] = set()
-        
-        for new_shape_key_mesh in new_shape_key_meshes:
-            group_name = trim_name(new_shape_key_mesh.name)
-            group_name_to_unprocessed_meshes[group_name].add(new_shape_key_mesh)
-    
-
-    # Return Dictionary initialization
-    group_name_to_unprocessed_meshes_to_export_meshes: dict[str, dict[Object, set[Object]]] = {}
-    for group_name, unprocessed_meshes in group_name_to_unprocessed_meshes.items():
-        group_name_to_unprocessed_meshes_to_export_meshes[group_name] = {}
-        for unprocessed_mesh in unprocessed_meshes:
-            group_name_to_unprocessed_meshes_to_export_meshes[group_name][unprocessed_mesh] = set() 
+                vis_shape_keys = get_vis_shape_keys(unprocessed_mesh)
+                if len(vis_shape_keys) > 0:
+                    unprocessed_mesh_to_vis_shape_keys[unprocessed_mesh] = vis_shape_keys
 
     # Process meshes
-    for group_name, unprocessed_meshes in group_name_to_unprocessed_meshes.items():
+    arma: Object = context.scene.sub_scene_properties.model_export_arma
+    unprocessed_mesh_to_export_meshes: dict[Object, set[Object | CachedExportMesh]] = {}
+    unprocessed_mesh_to_fingerprint: dict[Object, tuple] = {}
+    for unprocessed_meshes in group_name_to_unprocessed_meshes.values():
         for unprocessed_mesh in unprocessed_meshes:
-            # Make a copy of the mesh so that the original remains unmodified.
-            # The copy is out here so that is deleted regardless of error
-            unprocessed_mesh_copy: bpy.types.Object = unprocessed_mesh.copy()
-            unprocessed_mesh_copy.data: bpy.types.Mesh = unprocessed_mesh.data.copy()
-            # This is needed for split_duplicate_loop_attributes()
-            context.collection.objects.link(unprocessed_mesh_copy)
+            track_source_vertices = unprocessed_mesh in unprocessed_mesh_to_vis_shape_keys
+            if use_mesh_cache:
+                fingerprint = export_mesh_cache.get_fingerprint(unprocessed_mesh, arma, apply_modifiers == 'APPLY', apply_modifiers, armature_position, str(track_source_vertices))
+                cached_export_meshes = export_mesh_cache.get_cached_export_meshes(unprocessed_mesh, fingerprint)
+                if cached_export_meshes is not None:
+                    unprocessed_mesh_to_export_meshes[unprocessed_mesh] = set(cached_export_meshes)
+                    continue
+                unprocessed_mesh_to_fingerprint[unprocessed_mesh] = fingerprint
+            # The original mesh is only read, the temporary mesh is deleted regardless of error.
+            export_mesh_object = make_export_mesh_object(context, unprocessed_mesh, apply_modifiers, armature_position, track_source_vertices)
             try:
-                group_name_to_unprocessed_meshes_to_export_meshes[group_name][unprocessed_mesh] |= process_mesh(operator, context, unprocessed_mesh_copy, unprocessed_mesh.name, apply_modifiers, armature_position)
+                unprocessed_mesh_to_export_meshes[unprocessed_mesh] = process_mesh(operator, context, export_mesh_object, unprocessed_mesh.name)
             finally:
-                bpy.data.meshes.remove(unprocessed_mesh_copy.data)
+                bpy.data.meshes.remove(export_mesh_object.data)
+    processed_count = len(unprocessed_mesh_to_fingerprint)
 
+    # Return Dictionary initialization
+    group_name_to_unprocessed_meshes_to_export_meshes: dict[str, dict[Object, set[Object | ShapeKeyExportMesh]]] = {}
+    for group_name, unprocessed_meshes in group_name_to_unprocessed_meshes.items():
+        group_name_to_unprocessed_meshes_to_export_meshes[group_name] = {}
+        for unprocessed_mesh in unprocessed_meshes:
+            group_name_to_unprocessed_meshes_to_export_meshes[group_name][unprocessed_mesh] = set(unprocessed_mesh_to_export_meshes[unprocessed_mesh])
 
-    return group_name_to_unprocessed_meshes_to_export_meshes, new_shape_key_meshes
+    # Shape keys reuse the processed export meshes if every export vertex maps to an original vertex.
+    # Modifiers that change the vertex count prevent this, so each shape key is evaluated and processed like the base shape.
+    meshes_that_split_into_shapekeys: set[Object] = set()
+    shape_key_export_mesh_objects: set[Object] = set()
+    unprocessed_mesh_to_shape_key_export_meshes: dict[Object, dict[str, set[Object | ShapeKeyExportMesh]]] = {}
+    for unprocessed_mesh, vis_shape_keys in unprocessed_mesh_to_vis_shape_keys.items():
+        export_meshes = unprocessed_mesh_to_export_meshes[unprocessed_mesh]
+        key_blocks = unprocessed_mesh.data.shape_keys.key_blocks
+        shape_key_name_to_export_meshes: dict[str, set[Object | ShapeKeyExportMesh]] = {}
+        if any(get_export_mesh_source_indices(export_mesh) is None for export_mesh in export_meshes):
+            # The shape key meshes aren't part of the base mesh, so they can't be cached with it.
+            unprocessed_mesh_to_fingerprint.pop(unprocessed_mesh, None)
+            for shape_key in vis_shape_keys:
+                export_mesh_object = make_export_mesh_object(context, unprocessed_mesh, apply_modifiers, armature_position, False, key_blocks.find(shape_key.name))
+                try:
+                    shape_key_meshes = process_mesh(operator, context, export_mesh_object, unprocessed_mesh.name)
+                finally:
+                    bpy.data.meshes.remove(export_mesh_object.data)
+                shape_key_export_mesh_objects |= shape_key_meshes
+                shape_key_name_to_export_meshes[shape_key.name] = set(shape_key_meshes)
+        else:
+            # Deform modifiers need to act on the shape key, so the positions are evaluated instead of adding the offsets.
+            evaluate_positions = apply_modifiers == 'APPLY' and has_deform_modifiers(unprocessed_mesh, armature_position)
+            for shape_key in vis_shape_keys:
+                evaluated_positions = None
+                if evaluate_positions:
+                    evaluated_positions = get_evaluated_shape_key_positions(context, unprocessed_mesh, armature_position, key_blocks.find(shape_key.name))
+                shape_key_name_to_export_meshes[shape_key.name] = {
+                    ShapeKeyExportMesh(export_mesh, shape_key.name, evaluated_positions) for export_mesh in export_meshes
+                }
+        unprocessed_mesh_to_shape_key_export_meshes[unprocessed_mesh] = shape_key_name_to_export_meshes
+        meshes_that_split_into_shapekeys.add(unprocessed_mesh)
+
+    # Remove the split shapekey meshes if needed
+    if split_shape_keys == 'EXPORT_EXCULDE_ORIGINAL':
+        for unprocessed_meshes_to_export_meshes in group_name_to_unprocessed_meshes_to_export_meshes.values():
+            for unprocessed_mesh in meshes_that_split_into_shapekeys:
+                unprocessed_meshes_to_export_meshes.pop(unprocessed_mesh, None)
+
+    for unprocessed_mesh, shape_key_name_to_export_meshes in unprocessed_mesh_to_shape_key_export_meshes.items():
+        for shape_key_name, shape_key_export_meshes in shape_key_name_to_export_meshes.items():
+            group_name = trim_name(shape_key_name)
+            unprocessed_meshes_to_export_meshes = group_name_to_unprocessed_meshes_to_export_meshes.setdefault(group_name, {})
+            unprocessed_meshes_to_export_meshes.setdefault(unprocessed_mesh, set()).update(shape_key_export_meshes)
+
+    export_mesh_objects: set[Object] = set(shape_key_export_mesh_objects)
+    for export_meshes in unprocessed_mesh_to_export_meshes.values():
+        export_mesh_objects |= {export_mesh for export_mesh in export_meshes if not isinstance(export_mesh, CachedExportMesh)}
+
+    if use_mesh_cache:
+        reused_count = len(unprocessed_mesh_to_export_meshes) - processed_count
+        operator.report({'INFO'}, f'Processed {processed_count} changed mesh(es) and reused {reused_count} unchanged mesh(es).')
+
+    return group_name_to_unprocessed_meshes_to_export_meshes, export_mesh_objects, unprocessed_mesh_to_fingerprint
     
-def make_ssbh_mesh_data(operator: Operator, context: Context, group_name_to_unprocessed_meshes_to_export_meshes: dict[str, dict[Object, set[Object]]]) -> ssbh_data_py.mesh_data.MeshData:
+def make_ssbh_mesh_data(operator: Operator, context: Context,
+                        group_name_to_unprocessed_meshes_to_export_meshes: dict[str, dict[Object, set[Object | CachedExportMesh | ShapeKeyExportMesh]]],
+                        unprocessed_mesh_to_fingerprint: dict[Object, tuple]) -> ssbh_data_py.mesh_data.MeshData:
     ssbh_mesh_data = ssbh_data_py.mesh_data.MeshData()
+    # Shape key meshes are created from the mesh objects of their base export mesh.
+    export_mesh_to_ssbh_mesh_object: dict[Object | CachedExportMesh, ssbh_data_py.mesh_data.MeshObjectData] = {}
+    unprocessed_mesh_to_new_cached_export_meshes: dict[Object, list[CachedExportMesh]] = {}
+    def get_base_mesh_object(export_mesh: Object | CachedExportMesh, unprocessed_mesh: Object) -> ssbh_data_py.mesh_data.MeshObjectData:
+        if export_mesh not in export_mesh_to_ssbh_mesh_object:
+            if isinstance(export_mesh, CachedExportMesh):
+                ssbh_mesh_object = export_mesh_cache.copy_mesh_object(export_mesh.mesh_object)
+            else:
+                ssbh_mesh_object = make_mesh_object(operator, context, export_mesh, trim_name(unprocessed_mesh.name), 0, unprocessed_mesh.name)
+                if unprocessed_mesh in unprocessed_mesh_to_fingerprint:
+                    cached_export_mesh = CachedExportMesh(unprocessed_mesh.name, get_export_mesh_materials(export_mesh)[0],
+                                                          export_mesh_cache.copy_mesh_object(ssbh_mesh_object), get_export_mesh_source_indices(export_mesh))
+                    unprocessed_mesh_to_new_cached_export_meshes.setdefault(unprocessed_mesh, []).append(cached_export_mesh)
+            export_mesh_to_ssbh_mesh_object[export_mesh] = ssbh_mesh_object
+        return export_mesh_to_ssbh_mesh_object[export_mesh]
+
     for group_name, unprocessed_meshes_to_export_meshes in group_name_to_unprocessed_meshes_to_export_meshes.items():
         subindex = 0
         for unprocessed_mesh, export_meshes in unprocessed_meshes_to_export_meshes.items():
             for export_mesh in export_meshes:
-                ssbh_mesh_object = make_mesh_object(operator, context, export_mesh, group_name, subindex, unprocessed_mesh.name)
+                if isinstance(export_mesh, ShapeKeyExportMesh):
+                    base_mesh_object = get_base_mesh_object(export_mesh.export_mesh, unprocessed_mesh)
+                    ssbh_mesh_object = make_shape_key_mesh_object(unprocessed_mesh, export_mesh, base_mesh_object, group_name, subindex)
+                else:
+                    ssbh_mesh_object = get_base_mesh_object(export_mesh, unprocessed_mesh)
+                    ssbh_mesh_object.name = group_name
+                    ssbh_mesh_object.subindex = subindex
                 ssbh_mesh_data.objects.append(ssbh_mesh_object)
                 subindex += 1
+
+    # Only cache meshes once all of their export meshes were converted without errors.
+    for unprocessed_mesh, cached_export_meshes in unprocessed_mesh_to_new_cached_export_meshes.items():
+        export_mesh_cache.store_export_meshes(unprocessed_mesh, unprocessed_mesh_to_fingerprint[unprocessed_mesh], cached_export_meshes)
     return ssbh_mesh_data
 
 def make_mesh_object(operator, context, mesh: bpy.types.Object, group_name, i, mesh_name):
@@ -1182,7 +1395,8 @@ def make_mesh_object(operator, context, mesh: bpy.types.Object, group_name, i, m
     positions = np.zeros(len(mesh_data.vertices) * 3, dtype=np.float32)
     mesh_data.vertices.foreach_get('co', positions)
     # The output data is flattened, so we need to reshape it into the appropriate number of rows and columns.
-    position0.data = positions.reshape((-1, 3)) @ axis_correction
+    positions = positions.reshape((-1, 3)) @ axis_correction
+    position0.data = positions
     ssbh_mesh_object.positions = [position0]
 
     # Store vertex indices as a numpy array for faster indexing later.
@@ -1192,76 +1406,69 @@ def make_mesh_object(operator, context, mesh: bpy.types.Object, group_name, i, m
 
     # Export Normals
     normal0 = ssbh_data_py.mesh_data.AttributeData('Normal0')
-    loop_normals = np.zeros(len(mesh_data.loops) * 3, dtype=np.float32)
-    mesh_data.loops.foreach_get('normal', loop_normals)
-    normals = per_loop_to_per_vertex(loop_normals, vertex_indices, (len(mesh_data.vertices), 3))
-    normals = normals @ axis_correction
-
-    # Pad normals to 4 components instead of 3 components.
-    # This actually results in smaller file sizes since HalFloat4 is smaller than Float3.
-    normals = np.append(normals, np.zeros((normals.shape[0],1)), axis=1)
-            
+    loop_normals = None
+    if mesh_data.has_custom_normals:
+        loop_normals = np.zeros(len(mesh_data.loops) * 3, dtype=np.float32)
+        mesh_data.loops.foreach_get('normal', loop_normals)
+        loop_normals = loop_normals.reshape((-1, 3)) @ axis_correction
+    normals = calculate_vertex_normals(positions, vertex_indices, loop_normals)
     normal0.data = normals
     ssbh_mesh_object.normals = [normal0]
 
     # Export Weights
-    # TODO: Reversing a vertex -> group lookup to a group -> vertex lookup is expensive.
-    # TODO: Does Blender not expose this directly?
-    group_to_weights = { vg.index : (vg.name, []) for vg in mesh.vertex_groups }
-    has_unweighted_vertices = False
-    # TODO: Skip this for performance reasons if there are no vertex groups?
     '''
     Vertex groups can either be 'Deform' groups used for actual mesh deformation, or 'Other'
     Only want the 'Deform' groups exported.
     '''
     ssp: SubSceneProperties = context.scene.sub_scene_properties
     arma = ssp.model_export_arma
-    deform_vertex_group_indices = {vg.index for vg in mesh.vertex_groups if vg.name in arma.data.bones}
-    for vertex in mesh_data.vertices:
-        vertex: MeshVertex 
-        deform_groups = [g for g in vertex.groups if g.group in deform_vertex_group_indices]
-        if len(deform_groups) > 4:
-            # We won't fix this automatically since removing influences may break animations.
-            message = f'Vertex with more than 4 weights detected for mesh {mesh_name}.'
-            message += ' Select all in Edit Mode and click Mesh > Weights > Limit Total with the limit set to 4.'
-            message += ' Weights may need to be reassigned after limiting totals.'
-            raise RuntimeError(message)
-
-        # Only report this warning once.
-        if len(deform_groups) == 0 or all([g.weight == 0.0 for g in deform_groups]):
-            has_unweighted_vertices = True
-
-        # Blender doesn't enforce normalization, since it normalizes while animating.
-        # Normalize on export to ensure the weights work correctly in game.
-        weight_sum = sum([g.weight for g in deform_groups])
-        for group in deform_groups:
-            # Remove unused weights on export.
-            if group.weight > 0.0:
-                ssbh_weight = ssbh_data_py.mesh_data.VertexWeight(vertex.index, group.weight / weight_sum)
-                group_to_weights[group.group][1].append(ssbh_weight)
+    deform_vertex_group_indices = np.array([vg.index for vg in mesh.vertex_groups if vg.name in arma.data.bones], dtype=np.int64)
+
+    # Blender has no bulk access to vertex group weights, so reading them is the only loop over the vertices.
+    # The weights are filtered, checked, and normalized with numpy afterwards.
+    vertex_count = len(mesh_data.vertices)
+    weight_entries = np.array([(vertex.index, g.group, g.weight) for vertex in mesh_data.vertices for g in vertex.groups], dtype=np.float64).reshape((-1, 3))
+    entry_vertices = weight_entries[:, 0].astype(np.int64)
+    entry_groups = weight_entries[:, 1].astype(np.int64)
+    entry_weights = weight_entries[:, 2]
+    is_deform = np.isin(entry_groups, deform_vertex_group_indices)
+    entry_vertices, entry_groups, entry_weights = entry_vertices[is_deform], entry_groups[is_deform], entry_weights[is_deform]
+
+    if (np.bincount(entry_vertices, minlength=vertex_count) > 4).any():
+        # We won't fix this automatically since removing influences may break animations.
+        message = f'Vertex with more than 4 weights detected for mesh {mesh_name}.'
+        message += ' Select all in Edit Mode and click Mesh > Weights > Limit Total with the limit set to 4.'
+        message += ' Weights may need to be reassigned after limiting totals.'
+        raise RuntimeError(message)
 
-    if has_unweighted_vertices:
+    # Only report this warning once.
+    if (np.bincount(entry_vertices[entry_weights != 0.0], minlength=vertex_count) == 0).any():
         message = f'Mesh {mesh_name} has unweighted vertices or vertices with only 0.0 weights.'
         operator.report({'WARNING'}, message)
 
+    # Blender doesn't enforce normalization, since it normalizes while animating.
+    # Normalize on export to ensure the weights work correctly in game.
+    weight_sums = np.bincount(entry_vertices, weights=entry_weights, minlength=vertex_count)
+    # Remove unused weights on export.
+    is_used = entry_weights > 0.0
+    entry_vertices, entry_groups = entry_vertices[is_used], entry_groups[is_used]
+    entry_weights = entry_weights[is_used] / weight_sums[entry_vertices]
+
     # Avoid adding unused influences if there are no weights.
     # Some meshes are parented to a bone instead of using vertex skinning.
     # This requires the influence list to be empty to save properly.
     ssbh_mesh_object.bone_influences = []
-    for name, weights in group_to_weights.values():
+    # A stable sort keeps the weights of each group in vertex order.
+    order = np.argsort(entry_groups, kind='stable')
+    groups, group_starts = np.unique(entry_groups[order], return_index=True)
+    for group, vertices, weights in zip(groups, np.split(entry_vertices[order], group_starts[1:]), np.split(entry_weights[order], group_starts[1:])):
         # Assume all influence names are valid since some in game models have influences not in the skel.
         # For example, fighter/miifighter/model/b_deacon_m weights vertices to effect bones.
-        if len(weights) > 0:
-            ssbh_mesh_object.bone_influences.append(ssbh_data_py.mesh_data.BoneInfluence(name, weights))
+        ssbh_weights = list(map(ssbh_data_py.mesh_data.VertexWeight, vertices.tolist(), weights.tolist()))
+        ssbh_mesh_object.bone_influences.append(ssbh_data_py.mesh_data.BoneInfluence(mesh.vertex_groups[int(group)].name, ssbh_weights))
 
     # Mesh version 1.10 only has 16-bit unsigned vertex indices for skin weights.
-    # Meshes without vertex skinning can use the full range of 32-bit unsigned vertex indices.
-    vertex_index = vertex_indices.max()
-    if len(ssbh_mesh_object.bone_influences) > 0 and vertex_index > 65535:
-        message = f'Vertex index {vertex_index} exceeds the limit of 65535 for mesh {mesh_name}.'
-        message += ' Reduce the number of vertices or split the mesh into smaller meshes.'
-        message += ' Note that splitting duplicate UVs will increase the vertex count.'
-        raise RuntimeError(message)
+    # Skinned meshes with larger vertex indices are split after creating the mesh data.
 
     smash_uv_names = ['map1', 'bake1', 'uvSet', 'uvSet1', 'uvSet2']
     for uv_layer in mesh.data.uv_layers:
@@ -1330,27 +1537,81 @@ def make_mesh_object(operator, context, mesh: bpy.types.Object, group_name, i, m
         ssbh_mesh_object.color_sets.append(ssbh_color_layer)
 
     # Calculate tangents now that the necessary attributes are initialized.
-    # Use Blender's implementation since it uses mikktspace.
-    # Mikktspace is necessary to properly bake normal maps in Blender or external programs.
-    # This addresses a number of consistency issues with how normals are encoded/decoded.
-    # This will be similar to the in game tangents apart from different smoothing.
+    # The tangents are calculated from the split vertices, so Blender's mikktspace tangents aren't needed.
     # The vanilla tangents can still cause seams, so they aren't worth preserving.
-    mesh.data.calc_tangents()
-
+    # Use the same UV map as Blender would for baking normal maps.
     tangent0 = ssbh_data_py.mesh_data.AttributeData('Tangent0')
+    uvs = get_tangent_uvs(ssbh_mesh_object, mesh_data)
+    tangent0.data = calculate_vertex_tangents(positions, normals, uvs, vertex_indices)
 
-    loop_tangents = np.zeros(len(mesh.data.loops) * 3, dtype=np.float32)
-    mesh.data.loops.foreach_get('tangent', loop_tangents)
+    ssbh_mesh_object.tangents = [tangent0]
+            
+    return ssbh_mesh_object
 
-    loop_bitangent_signs = np.zeros(len(mesh.data.loops), dtype=np.float32)
-    mesh.data.loops.foreach_get('bitangent_sign', loop_bitangent_signs)
 
-    tangents = per_loop_to_per_vertex(loop_tangents, vertex_indices, (len(mesh.data.vertices), 3))
-    bitangent_signs = per_loop_to_per_vertex(loop_bitangent_signs, vertex_indices, (len(mesh.data.vertices), 1))
-    tangent0.data = np.append(tangents @ axis_correction, bitangent_signs * -1.0, axis=1)
+def get_tangent_uvs(ssbh_mesh_object: ssbh_data_py.mesh_data.MeshObjectData, mesh_data: Mesh) -> np.ndarray | None:
+    if len(ssbh_mesh_object.texture_coordinates) == 0:
+        return None
+    active_uv_name = mesh_data.uv_layers.active.name if mesh_data.uv_layers.active else None
+    uv_attribute = next((a for a in ssbh_mesh_object.texture_coordinates if a.name == active_uv_name), ssbh_mesh_object.texture_coordinates[0])
+    return np.array(uv_attribute.data, dtype=np.float32)
+
+def make_shape_key_mesh_object(unprocessed_mesh: Object, shape_key_export_mesh: ShapeKeyExportMesh,
+                               base_mesh_object: ssbh_data_py.mesh_data.MeshObjectData, group_name, i) -> ssbh_data_py.mesh_data.MeshObjectData:
+    """
+    Creates the mesh object for a `_VIS` shape key from the already processed mesh object of the base shape.
+    The shape key offsets are read directly from the shape key, or from its positions evaluated through the modifiers,
+    so the mesh isn't copied and processed again for each key.
+    """
+    # Processing splits and removes vertices, so find the original vertex for each export vertex.
+    source_indices = get_export_mesh_source_indices(shape_key_export_mesh.export_mesh)
+    base_positions = np.array(base_mesh_object.positions[0].data, dtype=np.float32)
+    if shape_key_export_mesh.evaluated_positions is not None:
+        vertex_offsets = shape_key_export_mesh.evaluated_positions.positions[source_indices] - base_positions
+    else:
+        key_blocks = unprocessed_mesh.data.shape_keys.key_blocks
+        shape_key: ShapeKey = key_blocks[shape_key_export_mesh.shape_key_name]
+        key_coords = np.zeros(len(shape_key.data) * 3, dtype=np.float32)
+        shape_key.data.foreach_get('co', key_coords)
+        # The base mesh uses the basis positions, so offset from the basis and not the key's relative_key.
+        # This exports the key's absolute positions like the evaluated positions.
+        basis_coords = np.zeros(len(key_blocks[0].data) * 3, dtype=np.float32)
+        key_blocks[0].data.foreach_get('co', basis_coords)
+
+        # Apply the same transforms as the base export mesh.
+        axis_correction = np.array(Matrix.Rotation(math.radians(90), 3, 'X'))
+        transform = np.array(unprocessed_mesh.matrix_basis.to_3x3()).T
+        offsets = (key_coords - basis_coords).reshape((-1, 3)) @ transform @ axis_correction
+        vertex_offsets = offsets[source_indices]
+
+    vertex_indices = np.array(base_mesh_object.vertex_indices, dtype=np.uint32)
+    positions = base_positions + vertex_offsets
+    normals = np.array(base_mesh_object.normals[0].data, dtype=np.float32)
+    tangents = np.array(base_mesh_object.tangents[0].data, dtype=np.float32)
+
+    # Only vertices on faces with a moved vertex need new normals and tangents.
+    moved_vertices = np.any(vertex_offsets != 0.0, axis=1)
+    triangles = vertex_indices.reshape((-1, 3))
+    changed_vertices = np.zeros(len(positions), dtype=bool)
+    changed_vertices[triangles[moved_vertices[triangles].any(axis=1)]] = True
+    if changed_vertices.any():
+        smooth_normals = calculate_vertex_normals(positions, vertex_indices, None)
+        normals[changed_vertices, :3] = smooth_normals[changed_vertices, :3]
+        uvs = get_tangent_uvs(base_mesh_object, unprocessed_mesh.data)
+        new_tangents = calculate_vertex_tangents(positions, normals, uvs, vertex_indices)
+        # Keep the original bitangent signs since moving vertices doesn't mirror the UVs.
+        tangents[changed_vertices, :3] = new_tangents[changed_vertices, :3]
+
+    # Attributes are copied instead of shared, since later steps like weights_to_parent_bones edit them in place.
+    ssbh_mesh_object = ssbh_data_py.mesh_data.MeshObjectData(group_name, i)
+    ssbh_mesh_object.vertex_indices = vertex_indices
+    ssbh_mesh_object.positions = [ssbh_data_py.mesh_data.AttributeData('Position0', positions)]
+    ssbh_mesh_object.normals = [ssbh_data_py.mesh_data.AttributeData('Normal0', normals)]
+    ssbh_mesh_object.tangents = [ssbh_data_py.mesh_data.AttributeData('Tangent0', tangents)]
+    ssbh_mesh_object.texture_coordinates = [ssbh_data_py.mesh_data.AttributeData(a.name, a.data) for a in base_mesh_object.texture_coordinates]
+    ssbh_mesh_object.color_sets = [ssbh_data_py.mesh_data.AttributeData(a.name, a.data) for a in base_mesh_object.color_sets]
+    ssbh_mesh_object.bone_influences = [ssbh_data_py.mesh_data.BoneInfluence(b.bone_name, b.vertex_weights) for b in base_mesh_object.bone_influences]
 
-    ssbh_mesh_object.tangents = [tangent0]
-            
     return ssbh_mesh_object
 
 
@@ -1437,7 +1698,7 @@ def make_ssbh_modl_data(operator, context, group_name_to_unprocessed_meshes_to_e
         sub_index = 0
         for unprocessed_mesh, export_meshes in unprocessed_meshes_to_export_meshes.items():
             for export_mesh in export_meshes:
-                mat_label = get_material_label_from_mesh(operator, export_mesh)
+                mat_label = get_material_label_from_mesh(operator, get_blender_export_mesh(export_mesh))
                 ssbh_modl_entry = ssbh_data_py.modl_data.ModlEntryData(group_name, sub_index, mat_label)
                 ssbh_modl_data.entries.append(ssbh_modl_entry)
                 sub_index += 1
@@ -1458,20 +1719,25 @@ def get_smash_transform(m) -> Matrix:
     return (p @ m @ p.inverted()).transposed()
 
 
-def get_smash_root_transform(bone: bpy.types.EditBone) -> Matrix:
-    bone.transform(Matrix.Rotation(math.radians(-90), 4, 'X'))
-    bone.transform(Matrix.Rotation(math.radians(90), 4, 'Z'))
-    unreoriented_matrix = get_smash_transform(bone.matrix)
-    bone.transform(Matrix.Rotation(math.radians(-90), 4, 'Z'))
-    bone.transform(Matrix.Rotation(math.radians(90), 4, 'X'))
-    return unreoriented_matrix
+def get_smash_root_transform(bone: bpy.types.Bone) -> Matrix:
+    # Rotate a copy of the rest matrix instead of transforming the bone.
+    reoriented_matrix = Matrix.Rotation(math.radians(90), 4, 'Z') @ Matrix.Rotation(math.radians(-90), 4, 'X') @ bone.matrix_local
+    return get_smash_transform(reoriented_matrix)
+
+# Vanilla skels are only read again if the file changed.
+vanilla_skel_cache: dict[str, tuple[float, ssbh_data_py.skel_data.SkelData]] = {}
 
 def read_vanilla_nusktb(path, mode):
     if not path:
         raise RuntimeError(f'Link mode {mode} requires a vanilla .NUSKTB file to be selected.')
 
     try:
+        mtime = os.path.getmtime(path)
+        cached = vanilla_skel_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
         skel = ssbh_data_py.skel_data.read_skel(path)
+        vanilla_skel_cache[path] = (mtime, skel)
         return skel
     except Exception as e:
         message = 'Failed to read vanilla .NUSKTB. Ensure the file exists and is a valid .NUSKTB file.'
@@ -1479,28 +1745,48 @@ def read_vanilla_nusktb(path, mode):
         raise RuntimeError(message)
 
 
-def get_ssbh_bone(blender_bone: bpy.types.EditBone, parent_index):
+def get_ssbh_bone(blender_bone: bpy.types.Bone, parent_index):
     if blender_bone.parent:
-        unreoriented_matrix = get_smash_transform(blender_bone.parent.matrix.inverted() @ blender_bone.matrix)
+        unreoriented_matrix = get_smash_transform(blender_bone.parent.matrix_local.inverted() @ blender_bone.matrix_local)
         m = list(list(r) for r in unreoriented_matrix)
-        #return ssbh_data_py.skel_data.BoneData(blender_bone.name, unreoriented_matrix, parent_index)
         return ssbh_data_py.skel_data.BoneData(blender_bone.name, m, parent_index)
     else:
         m = list(list(r) for r in get_smash_root_transform(blender_bone))
-        #return ssbh_data_py.skel_data.BoneData(blender_bone.name, get_smash_root_transform(blender_bone), None)
         return ssbh_data_py.skel_data.BoneData(blender_bone.name, m, None)
     
-def get_parent_first_ordered_bones(arma: bpy.types.Object) -> list[bpy.types.EditBone]:
-    ''' Edit Bones are not guaranteed to appear in such a way where the child appears after its parent
+def get_parent_first_ordered_bones(arma: bpy.types.Object) -> list[bpy.types.Bone]:
+    ''' Bones are not guaranteed to appear in such a way where the child appears after its parent
         This will make sure that parent bones always appear before their children
     '''
-    edit_bones: list[EditBone] = arma.data.edit_bones
-    parent_first_ordered_bones: list[EditBone] = []
-    for bone in edit_bones:
-        # only need to do this on the root bones, of which there could be several
+    bones: list[Bone] = arma.data.bones
+    # Each root bone, of which there could be several, is followed by its descendants like in children_recursive.
+    # That sorts the descendants by depth and keeps the armature order for bones at the same depth.
+    # Finding every bone's root and depth once avoids searching the hierarchy again for each root.
+    bone_to_root_and_depth: dict[str, tuple[str, int]] = {}
+    def get_root_and_depth(bone: Bone) -> tuple[str, int]:
+        path: list[Bone] = []
+        while bone.parent and bone.name not in bone_to_root_and_depth:
+            path.append(bone)
+            bone = bone.parent
+        root, depth = bone_to_root_and_depth.get(bone.name, (bone.name, 0))
+        bone_to_root_and_depth[bone.name] = (root, depth)
+        for path_bone in reversed(path):
+            depth += 1
+            bone_to_root_and_depth[path_bone.name] = (root, depth)
+        return root, depth
+
+    root_to_descendants: dict[str, list[tuple[int, Bone]]] = {bone.name: [] for bone in bones if not bone.parent}
+    for bone in bones:
+        root, depth = get_root_and_depth(bone)
+        if depth > 0:
+            root_to_descendants[root].append((depth, bone))
+
+    parent_first_ordered_bones: list[Bone] = []
+    for bone in bones:
         if not bone.parent:
             parent_first_ordered_bones.append(bone)
-            parent_first_ordered_bones.extend(child for child in bone.children_recursive)
+            # The sort is stable, so bones at the same depth stay in armature order.
+            parent_first_ordered_bones.extend(descendant for _, descendant in sorted(root_to_descendants[bone.name], key=lambda pair: pair[0]))
     return parent_first_ordered_bones
 
 def get_standard_bone_changes(arma: bpy.types.Object, vanilla_nusktb: Path) -> tuple[set[str], set[str]]:
@@ -1514,7 +1800,37 @@ def get_standard_bone_changes(arma: bpy.types.Object, vanilla_nusktb: Path) -> t
 
     return new_bones, missing_bones
 
-def make_update_prc(operator: Operator, context, bones_not_in_vanilla: list[EditBone]):
+# The last standard bone changes for each armature, along with the signature they were computed for.
+standard_bone_changes_cache: dict[int, tuple[tuple, tuple[set[str], set[str]]]] = {}
+
+def get_standard_bone_changes_signature(arma: bpy.types.Object, vanilla_nusktb: str) -> tuple:
+    # Cheap enough to check on every redraw, unlike reading the vanilla skel.
+    bones = arma.data.bones
+    bone_hash = hash(tuple((bone.name, bone.parent.name if bone.parent else '') for bone in bones))
+    try:
+        mtime = os.path.getmtime(vanilla_nusktb)
+    except OSError:
+        mtime = None
+    return (arma.data.as_pointer(), len(bones), bone_hash, vanilla_nusktb, mtime)
+
+def get_cached_standard_bone_changes(arma: bpy.types.Object, vanilla_nusktb: str) -> tuple[set[str], set[str]] | None:
+    """
+    Returns None if the changes haven't been checked since the armature or vanilla .nusktb last changed.
+    """
+    cached = standard_bone_changes_cache.get(arma.data.as_pointer())
+    if cached is None:
+        return None
+    signature, changes = cached
+    if signature != get_standard_bone_changes_signature(arma, vanilla_nusktb):
+        return None
+    return changes
+
+def refresh_standard_bone_changes(arma: bpy.types.Object, vanilla_nusktb: str) -> tuple[set[str], set[str]]:
+    changes = get_standard_bone_changes(arma, vanilla_nusktb)
+    standard_bone_changes_cache[arma.data.as_pointer()] = (get_standard_bone_changes_signature(arma, vanilla_nusktb), changes)
+    return changes
+
+def make_update_prc(operator: Operator, context, bones_not_in_vanilla: list[Bone]):
     ssp: SubSceneProperties = context.scene.sub_scene_properties
     prc_root = pyprc.param(ssp.vanilla_update_prc) # Read the .prc into 'prc_root'
     bones_fake_list = dict(prc_root).get(pyprc.hash('bones'))
@@ -1532,23 +1848,62 @@ def make_update_prc(operator: Operator, context, bones_not_in_vanilla: list[Edit
     bones_fake_list.set_list(bones_real_list)
     return prc_root
 
-def find_non_helper_ancestor_index(bone: EditBone, bones: list[EditBone]) -> int:
-    if bone.parent is None:
-        return None
-    if bone.parent.name.startswith('H_'):
-        return find_non_helper_ancestor_index(bone.parent, bones)
-    return bones.index(bone.parent)
+def find_non_helper_ancestor(bone: Bone) -> Bone | None:
+    ancestor = bone.parent
+    while ancestor is not None and ancestor.name.startswith('H_'):
+        ancestor = ancestor.parent
+    return ancestor
+
+def get_vanilla_ordered_bones(vanilla_skel: ssbh_data_py.skel_data.SkelData, arma_data: bpy.types.Armature,
+                              parent_first_ordered_bones: list[Bone]) -> tuple[list[Bone], list[Bone]]:
+    '''
+    Keeps the vanilla bone order and places new bones after their parent or non-helper ancestor.
+    New helper and swing bones go at the end. Returns the ordered bones and the bones not in the vanilla skel.
+    '''
+    ordered_bones: list[Bone] = []
+    for vanilla_bone in vanilla_skel.bones:
+        blender_bone = arma_data.bones.get(vanilla_bone.name)
+        if blender_bone:
+            ordered_bones.append(blender_bone)
+    bone_names: set[str] = {bone.name for bone in ordered_bones}
+
+    # Inserting right after a bone puts the most recently inserted bone first.
+    # Track the inserted bones per bone instead of inserting into the list, which is quadratic.
+    name_to_inserted_bones: dict[str, list[Bone]] = {}
+    bones_not_in_vanilla: list[Bone] = []
+    for blender_bone in parent_first_ordered_bones:
+        if blender_bone.name in bone_names:
+            continue
+        bones_not_in_vanilla.append(blender_bone)
+        bone_names.add(blender_bone.name)
+        if blender_bone.name.startswith('H_') or blender_bone.name.startswith('S_'): # Need to insert new helper or swing bones at the end
+            ordered_bones.append(blender_bone)
+            continue
+        if blender_bone.parent:
+            # Makes sure the new normal bone is not at the bottom bone section
+            anchor = find_non_helper_ancestor(blender_bone)
+            if anchor is not None:
+                name_to_inserted_bones.setdefault(anchor.name, []).append(blender_bone)
+            else:
+                ordered_bones.append(blender_bone)
+        else:
+            ordered_bones.append(blender_bone)
+
+    new_bones: list[Bone] = []
+    stack: list[Bone] = list(reversed(ordered_bones))
+    while stack:
+        bone = stack.pop()
+        new_bones.append(bone)
+        # The last inserted bone comes first, so it needs to be on top of the stack.
+        stack.extend(name_to_inserted_bones.get(bone.name, []))
+
+    return new_bones, bones_not_in_vanilla
 
 def make_skel(operator, context, mode):
     ssp: SubSceneProperties = context.scene.sub_scene_properties
     arma: bpy.types.Object = ssp.model_export_arma
     arma_data: bpy.types.Armature = arma.data
     prc = None
-    bpy.context.view_layer.objects.active = arma
-    # The object should be selected and visible before entering edit mode.
-    arma.select_set(True)
-    arma.hide_set(False)
-    bpy.ops.object.mode_set(mode='EDIT')
 
     skel = ssbh_data_py.skel_data.SkelData()
 
@@ -1562,59 +1917,33 @@ def make_skel(operator, context, mode):
         message += ' Bone order will not be preserved and may cause animation issues in game.'
         operator.report({'WARNING'}, message)
     
+    # The rest matrices are read from the bones directly, so edit mode isn't needed.
     parent_first_ordered_bones = get_parent_first_ordered_bones(arma)
 
-    new_bones: list[EditBone] = []
-    bones_not_in_vanilla: list[EditBone] = []
+    bones_not_in_vanilla: list[Bone] = []
     if mode == 'ORDER_AND_VALUES' or mode == 'ORDER_ONLY':
-        for vanilla_bone in vanilla_skel.bones:
-            blender_bone = arma_data.edit_bones.get(vanilla_bone.name)
-            if blender_bone:
-                new_bones.append(blender_bone)
-
-        for blender_bone in parent_first_ordered_bones:
-            if blender_bone not in new_bones:
-                bones_not_in_vanilla.append(blender_bone)
-                if blender_bone.name.startswith('H_') or blender_bone.name.startswith('S_'): # Need to insert new helper or swing bones at the end
-                    new_bones.append(blender_bone)
-                    continue
-                if blender_bone.parent:
-                    if blender_bone.parent.name.startswith('H_'): # Makes sure the new normal bone is not at the bottom bone section
-                        non_helper_ancestor_index = find_non_helper_ancestor_index(blender_bone, new_bones)
-                        if non_helper_ancestor_index is not None:
-                            new_bones.insert(non_helper_ancestor_index + 1, blender_bone)
-                        else:
-                            new_bones.append(blender_bone)
-                    else:
-                        parent_index = new_bones.index(blender_bone.parent)
-                        new_bones.insert(parent_index + 1, blender_bone)
-                else:
-                    new_bones.append(blender_bone)
+        new_bones, bones_not_in_vanilla = get_vanilla_ordered_bones(vanilla_skel, arma_data, parent_first_ordered_bones)
+    else:
+        new_bones = parent_first_ordered_bones
 
-        vanilla_skel_name_to_bone = {bone.name : bone for bone in vanilla_skel.bones}
-        for new_bone in new_bones:
-            ssbh_bone = get_ssbh_bone(new_bone, new_bones.index(new_bone.parent) if new_bone.parent else None)
+    vanilla_skel_name_to_bone = {bone.name : bone for bone in vanilla_skel.bones} if vanilla_skel else {}
+    name_to_index: dict[str, int] = {bone.name : index for index, bone in enumerate(new_bones)}
+    for new_bone in new_bones:
+        ssbh_bone = get_ssbh_bone(new_bone, name_to_index[new_bone.parent.name] if new_bone.parent else None)
 
-            if preserve_values:
-                vanilla_bone = vanilla_skel_name_to_bone.get(new_bone.name)
-                if vanilla_bone:
-                    ssbh_bone.transform = vanilla_bone.transform
+        if preserve_values:
+            vanilla_bone = vanilla_skel_name_to_bone.get(new_bone.name)
+            if vanilla_bone:
+                ssbh_bone.transform = vanilla_bone.transform
 
-            skel.bones.append(ssbh_bone)
-    else:
-        for bone in parent_first_ordered_bones:
-            ssbh_bone = get_ssbh_bone(bone, parent_first_ordered_bones.index(bone.parent) if bone.parent else None)
-            skel.bones.append(ssbh_bone)
+        skel.bones.append(ssbh_bone)
 
     if ssp.vanilla_update_prc != '':
         prc = make_update_prc(operator, context, bones_not_in_vanilla)
 
-    bpy.ops.object.mode_set(mode='OBJECT')
-    arma.select_set(False)
-    bpy.context.view_layer.objects.active = None
     return skel, prc
 
-def create_and_save_nuhlpb(path: Path, arma: bpy.types.Object):
+def create_nuhlpb(arma: bpy.types.Object) -> ssbh_data_py.hlpb_data.HlpbData:
     ssbh_hlpb                    = ssbh_data_py.hlpb_data.HlpbData()
     ssbh_hlpb.major_version      = arma.data.sub_helper_bone_data.major_version
     ssbh_hlpb.minor_version      = arma.data.sub_helper_bone_data.minor_version
@@ -1642,5 +1971,5 @@ def create_and_save_nuhlpb(path: Path, arma: bpy.types.Object):
                                         quat1             = [oc.quat1[1], oc.quat1[2], oc.quat1[3], oc.quat1[0]],
                                         quat2             = [oc.quat2[1], oc.quat2[2], oc.quat2[3], oc.quat2[0]],
                                     ) for oc in arma.data.sub_helper_bone_data.orient_constraints]
-    ssbh_hlpb.save(str(path))
+    return ssbh_hlpb
      
\ No newline at end of file
@@ -2,7 +2,6 @@ import os
 import os.path
 import bpy
 import mathutils
-import sqlite3
 import time
 import math
 import traceback
@@ -220,13 +219,6 @@ def import_model(operator: bpy.types.Operator, context: bpy.types.Context):
     bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
     return
 
-def get_shader_db_file_path():
-    # This file was generated with duplicates removed to optimize space.
-    # https://github.com/ScanMountGoat/Smush-Material-Research#shader-database
-    this_file_path = Path(__file__)
-    return this_file_path.parent.parent.joinpath('shader_file').joinpath('Nufx.db').resolve()
-
-
 
 def get_matrix4x4_blender(ssbh_matrix):
     return mathutils.Matrix(ssbh_matrix).transposed()
@@ -618,21 +610,6 @@ def enable_inputs(node_group_node, param_id):
             input.hide = False
 
 
-def get_vertex_attributes(node_group_node, shader_name):
-    # Query the shader database for attribute information.
-    # Using SQLite is much faster than iterating through the JSON dump.
-    with sqlite3.connect(get_shader_db_file_path()) as con:
-        # Construct a query to find all the vertex attributes for this shader.
-        # Invalid shaders will return an empty list.
-        sql = """
-            SELECT v.AttributeName 
-            FROM VertexAttribute v 
-            INNER JOIN ShaderProgram s ON v.ShaderProgramID = s.ID 
-            WHERE s.Name = ?
-            """
-        # The database has a single entry for each program, so don't include the render pass tag.
-        return [row[0] for row in con.execute(sql, (shader_name[:len('SFX_PBS_0000000000000080')],)).fetchall()]
-
 def get_from_mesh_list_with_pruned_name(meshes:list, pruned_name:str, fallback=None) -> bpy.types.Object:
     for mesh in meshes:
         if mesh.name.startswith(pruned_name):
@@ -12,5 +12,6 @@ from . import matl_enums
 from . import matl_params
 from . import operators
 from . import reimport_materials
+from . import shader_database
 from . import sub_matl_data
 from . import ui    
\ No newline at end of file
@@ -1,6 +1,6 @@
 import bpy
-import sqlite3
 import re 
+import time
 
 from bpy.types import ShaderNodeTexImage, ShaderNodeUVMap, ShaderNodeValue, ShaderNodeOutputMaterial, ShaderNodeVertexColor, Operator
 from bpy_extras import image_utils
@@ -15,8 +15,9 @@ from .shader_nodes.custom_uv_transform_node import ultimate_uv_transform_node_gr
 from ....dependencies import ssbh_data_py
 from .matl_params import texture_param_name_to_socket_params, vec4_param_name_to_socket_params
 from .sub_matl_data import *
-from .texture.convert_nutexb_to_png import convert_nutexb_to_png
+from .texture.convert_nutexb_to_png import convert_nutexb_to_png_data
 from .texture.default_textures import generated_default_texture_name_value
+from .shader_database import get_vertex_attributes, is_discard_shader
 
 """generated_default_texture_name_value: dict[str, tuple[float, float, float, float]] = {
      "/common/shader/sfxpbs/default_black": (0, 0, 0, 0),
@@ -40,12 +41,6 @@ from .texture.default_textures import generated_default_texture_name_value
      "#replace_cubemap": (1,1,1,1), # Not correct, but it needs to be here in case the user wants to use it without importing a model first
 }"""
 
-def get_shader_db_file_path():
-    # This file was generated with duplicates removed to optimize space.
-    # https://github.com/ScanMountGoat/Smush-Material-Research#shader-database
-    this_file_path = Path(__file__)
-    return this_file_path.parent.joinpath('shader_file').joinpath('Nufx.db').resolve()
-
 def create_default_texture(texture_name: str, value: tuple[float, float, float, float]):
     if texture_name not in bpy.data.images.keys():
         image = bpy.data.images.new(texture_name, 8, 8, alpha=True, is_data=True)
@@ -70,6 +65,12 @@ def get_matching_png_path(texture_name: str, model_dir: Path) -> Path | None:
             return png_file_path
     return None
 
+def pack_png_data(image: bpy.types.Image, texture_name: str, png_data: bytes):
+    # Packing from memory means no file is created next to the model, which also works for read-only folders.
+    image.pack(data=png_data, data_len=len(png_data))
+    # The path isn't read for packed images, but gives unpacking a sensible file name.
+    image.filepath_raw = f"//{texture_name}.png"
+
 def import_texture_to_blender(operator: bpy.types.Operator, texture_name: str, model_dir: Path) -> bpy.types.Image:
     '''
     In order for users to be able to export and re-load from the same folder, the priority will be .nutexb, then .png
@@ -92,32 +93,20 @@ def import_texture_to_blender(operator: bpy.types.Operator, texture_name: str, m
         case (True, True):
             operator.report({"INFO"}, f"Both a .nutexb and a .png were found for texture `{texture_name}`. The import priority will be nutexb if possible, followed by the png.")
             try:
-                temp_png_file_path = Path(model_dir) / (texture_name + "_temp.png")
-                convert_nutexb_to_png(matching_nutexb_path, temp_png_file_path)
+                png_data = convert_nutexb_to_png_data(matching_nutexb_path)
             except CalledProcessError as e:
                 operator.report({"INFO"}, f"Failed to convert .nutexb `{matching_nutexb_path.name}` to PNG, but the .PNG was available so that will be used instead. Error=`{e.stderr}`")
                 image.filepath = str(matching_png_path)
                 # The image wont be packed since its an existing external file.
             else:
-                image.filepath = str(temp_png_file_path)
-                image.pack()
-                try:
-                    temp_png_file_path.unlink()
-                except Exception as e:
-                    operator.report({"WARNING"}, f"Failed to remove temporary png file `{temp_png_file_path.name}`, error=`{e}`")
+                pack_png_data(image, texture_name, png_data)
         case (True, False):
             try:
-                temp_png_file_path = Path(model_dir) / (texture_name + "_temp.png")
-                convert_nutexb_to_png(matching_nutexb_path, temp_png_file_path)
+                png_data = convert_nutexb_to_png_data(matching_nutexb_path)
             except CalledProcessError as e:
                 operator.report({"WARNING"}, f"Failed to convert .nutexb `{matching_nutexb_path.name}` to PNG, please manually convert the .nutexb to a .png and place it in the folder. Error=`{e.stderr}`")
             else:
-                image.filepath = str(temp_png_file_path)
-                image.pack()
-                try:
-                    temp_png_file_path.unlink()
-                except Exception as e:
-                    operator.report({"WARNING"}, f"Failed to remove temporary png file `{temp_png_file_path.name}`, error=`{e}`")
+                pack_png_data(image, texture_name, png_data)
         case (False, True):
             image.filepath = str(matching_png_path)
         case (False, False):
@@ -134,26 +123,13 @@ def import_material_images(operator: bpy.types.Operator, ssbh_matl: ssbh_data_py
 
     return texture_name_to_image_dict
 
-def get_discard_shaders():
-    global discard_shaders
-    try:
-        discard_shaders
-    except NameError:
-        this_file_path = Path(__file__)
-        discard_shaders_file = this_file_path.parent.joinpath('shader_file').joinpath('shaders_discard_v13.0.1.txt').resolve()
-        with open(discard_shaders_file, 'r') as f:
-            discard_shaders = {line.strip() for line in f.readlines()}
-    return discard_shaders
-
 def get_blend_method(shader_label: str, blend_states: list[SUB_PG_matl_blend_state]):
     # TODO: Access blenders internal enum instead? Or use a cleaner enum method
     BlendMethod = Enum('BlendMethod', 'OPAQUE HASHED CLIP BLEND')
     if len(blend_states) != 1: # no vanilla ultimate shader has more than one blend state
         return BlendMethod.OPAQUE.name
     
-    discard_shaders = get_discard_shaders()
-    # Trims the trailing '_OPAQUE', '_SORT', etc.
-    if shader_label[:len('SFX_PBS_0000000000000080')] in discard_shaders:
+    if is_discard_shader(shader_label):
         return BlendMethod.CLIP.name
     
     blend_state_0 = blend_states[0]
@@ -228,6 +204,30 @@ def create_node_group(nodes, name: str, create_node_tree):
     group.node_tree = node_tree
     return group
 
+def setup_texture_node_image(texture_node: ShaderNodeTexImage, texture: SUB_PG_matl_texture):
+    texture_node.image = texture.image
+
+    # For now, manually set the colorspace types....
+    ParamId = ssbh_data_py.matl_data.ParamId
+    linear_textures_names = {ParamId.Texture4.name, ParamId.Texture6.name}
+    if texture.node_name in linear_textures_names:
+        texture_node.image.colorspace_settings.name = 'Non-Color'
+        texture_node.image.alpha_mode = 'CHANNEL_PACKED'
+
+def setup_sampler_node(sampler_node, texture_node: ShaderNodeTexImage, matched_sampler: SUB_PG_matl_sampler):
+    sampler_node.wrap_s = matched_sampler.wrap_s
+    sampler_node.wrap_t = matched_sampler.wrap_t
+    sampler_node.wrap_r = matched_sampler.wrap_r
+    sampler_node.min_filter = matched_sampler.min_filter
+    sampler_node.mag_filter = matched_sampler.mag_filter
+    sampler_node.anisotropic_filtering = matched_sampler.max_anisotropy is not None
+    sampler_node.max_anisotropy = matched_sampler.max_anisotropy if matched_sampler.max_anisotropy else 'One'
+    sampler_node.border_color = matched_sampler.border_color
+    sampler_node.lod_bias = matched_sampler.lod_bias 
+
+    # Now that the samplers loaded we can assign the texture filtering
+    texture_node.interpolation = 'Closest' if matched_sampler.mag_filter == 'Nearest' else 'Linear'
+
 def setup_blender_material_node_tree(material: bpy.types.Material):
     from .master_shader import create_master_shader, get_master_shader_name
     sub_matl_data: SUB_PG_sub_matl_data = material.sub_matl_data
@@ -304,14 +304,8 @@ def setup_blender_material_node_tree(material: bpy.types.Material):
         texture_node.location = (-800, 1000 - (texture_node_row_width * created_node_rows))
         texture_node.name = texture.node_name
         texture_node.label = texture.ui_name
-        texture_node.image = texture.image
         texture_node.show_options = False
-
-        # For now, manually set the colorspace types....
-        linear_textures_names = {ParamId.Texture4.name, ParamId.Texture6.name}
-        if texture.node_name in linear_textures_names:
-            texture_node.image.colorspace_settings.name = 'Non-Color'
-            texture_node.image.alpha_mode = 'CHANNEL_PACKED'
+        setup_texture_node_image(texture_node, texture)
         
         # Create UV Map Node
         uv_map_node: ShaderNodeUVMap = nodes.new("ShaderNodeUVMap")
@@ -364,22 +358,8 @@ def setup_blender_material_node_tree(material: bpy.types.Material):
         sampler_node.label = 'Sampler' + texture.node_name.split('Texture')[1]
         sampler_node.location = (texture_node.location[0] - 600, texture_node.location[1])
         sampler_node.width = 500
-
-        sampler_node.wrap_s = matched_sampler.wrap_s
-        sampler_node.wrap_t = matched_sampler.wrap_t
-        sampler_node.wrap_r = matched_sampler.wrap_r
-        sampler_node.min_filter = matched_sampler.min_filter
-        sampler_node.mag_filter = matched_sampler.mag_filter
-        sampler_node.anisotropic_filtering = matched_sampler.max_anisotropy is not None
-        sampler_node.max_anisotropy = matched_sampler.max_anisotropy if matched_sampler.max_anisotropy else 'One'
-        sampler_node.border_color = matched_sampler.border_color
-        sampler_node.lod_bias = matched_sampler.lod_bias 
-
         sampler_node.show_options = False
-
-        # Now that the samplers loaded we can assign the texture filtering
-        if matched_sampler.mag_filter == 'Nearest':
-            texture_node.interpolation = 'Closest'
+        setup_sampler_node(sampler_node, texture_node, matched_sampler)
 
         # Link these nodes together
         links.new(uv_map_node.outputs[0], uv_transform_node.inputs[4])
@@ -475,21 +455,6 @@ def setup_blender_material_node_tree(material: bpy.types.Material):
             input.hide = True
 
 
-def get_vertex_attributes(shader_name:str)->list[str]:
-    # Query the shader database for attribute information.
-    # Using SQLite is much faster than iterating through the JSON dump.
-    with sqlite3.connect(get_shader_db_file_path()) as con:
-        # Construct a query to find all the vertex attributes for this shader.
-        # Invalid shaders will return an empty list.
-        sql = """
-            SELECT v.AttributeName 
-            FROM VertexAttribute v 
-            INNER JOIN ShaderProgram s ON v.ShaderProgramID = s.ID 
-            WHERE s.Name = ?
-            """
-        # The database has a single entry for each program, so don't include the render pass tag.
-        return [row[0] for row in con.execute(sql, (shader_name[:len('SFX_PBS_0000000000000080')],)).fetchall()]
-    
 def create_blender_materials_from_matl(operator: bpy.types.Operator, ssbh_matl: ssbh_data_py.matl_data.MatlData) -> dict[str, bpy.types.Material]:
     '''
     Creates a blender material with the sub_matl_data filled out for every entry in the ssbh_matl.
@@ -498,14 +463,28 @@ def create_blender_materials_from_matl(operator: bpy.types.Operator, ssbh_matl:
     '''
     # Setup default textures if not already made
     create_default_textures()
-    # Make new Blender Materials
-    material_label_to_material: dict[str, bpy.types.Material] = \
-        {entry.material_label : bpy.data.materials.new(entry.material_label) for entry in ssbh_matl.entries}
     # Import images 
     texture_name_to_image_dict = import_material_images(operator, ssbh_matl, bpy.context.scene.sub_scene_properties.model_import_folder_path)
-    # Fill out the sub_matl_data of each material
+    # Make new Blender Materials
+    # Materials with the same shader and parameters have the same nodes, so copy the node tree of the first one.
+    material_label_to_material: dict[str, bpy.types.Material] = {}
+    template_key_to_material: dict[tuple, bpy.types.Material] = {}
+    built_times: list[float] = []
+    copied_times: list[float] = []
     for entry in ssbh_matl.entries:
-        sub_matl_data: SUB_PG_sub_matl_data = material_label_to_material[entry.material_label].sub_matl_data
+        start = time.perf_counter()
+        template_key = get_node_tree_template_key(entry)
+        template_material = template_key_to_material.get(template_key)
+        if template_material is None:
+            material = bpy.data.materials.new(entry.material_label)
+        else:
+            material = template_material.copy()
+            material.name = entry.material_label
+            clear_sub_matl_data(material.sub_matl_data)
+            material.use_backface_culling = False
+
+        # Fill out the sub_matl_data
+        sub_matl_data: SUB_PG_sub_matl_data = material.sub_matl_data
         sub_matl_data.set_shader_label(entry.shader_label)
         sub_matl_data.add_bools(entry.booleans)
         sub_matl_data.add_floats(entry.floats)
@@ -516,7 +495,20 @@ def create_blender_materials_from_matl(operator: bpy.types.Operator, ssbh_matl:
         sub_matl_data.add_rasterizer_states(entry.rasterizer_states)
         attrs = get_vertex_attributes(entry.shader_label)
         sub_matl_data.add_vertex_attributes(attrs)
-        
+
+        # Make the blender material settings
+        setup_blender_material_settings(material)
+        if template_material is None:
+            setup_blender_material_node_tree(material)
+            template_key_to_material[template_key] = material
+            built_times.append(time.perf_counter() - start)
+        else:
+            update_node_tree_copied_from_template(material)
+            copied_times.append(time.perf_counter() - start)
+        material_label_to_material[entry.material_label] = material
+
+    report_material_creation_times(operator, built_times, copied_times)
+
     # Eye materials implicitly use extra materials despite no mesh being explicitly assigned.
     # Need to track these to preserve them on export.
     for material_label, material in material_label_to_material.items():
@@ -528,10 +520,57 @@ def create_blender_materials_from_matl(operator: bpy.types.Operator, ssbh_matl:
                     new_linked_material: SUB_PG_matl_linked_material = sub_matl_data.linked_materials.add()
                     new_linked_material.blender_material = linked_material
 
-                    
-    # Make the blender material settings
-    for material_label, material in material_label_to_material.items():
-        setup_blender_material_settings(material)
-        setup_blender_material_node_tree(material)
-
     return material_label_to_material
+
+def get_node_tree_template_key(entry: ssbh_data_py.matl_data.MatlEntryData) -> tuple:
+    # The nodes only depend on the shader and which parameters are present.
+    # The vertex attributes come from the shader label, so they don't need to be part of the key.
+    return (
+        entry.shader_label,
+        tuple(texture.param_id.name for texture in entry.textures),
+        tuple(vector.param_id.name for vector in entry.vectors),
+        tuple(float_param.param_id.name for float_param in entry.floats),
+    )
+
+def clear_sub_matl_data(sub_matl_data: SUB_PG_sub_matl_data):
+    # Copied materials start with the sub_matl_data of the template.
+    collections = (
+        sub_matl_data.bools,
+        sub_matl_data.floats,
+        sub_matl_data.vectors,
+        sub_matl_data.textures,
+        sub_matl_data.samplers,
+        sub_matl_data.blend_states,
+        sub_matl_data.rasterizer_states,
+        sub_matl_data.vertex_attributes,
+        sub_matl_data.linked_materials,
+    )
+    for collection in collections:
+        collection.clear()
+
+def update_node_tree_copied_from_template(material: bpy.types.Material):
+    """
+    Updates the values that differ between materials with the same nodes, like images and sampler settings.
+    """
+    sub_matl_data: SUB_PG_sub_matl_data = material.sub_matl_data
+    nodes = material.node_tree.nodes
+    for texture in sub_matl_data.textures:
+        texture_node: ShaderNodeTexImage = nodes[texture.node_name]
+        setup_texture_node_image(texture_node, texture)
+        sampler_node = texture_node.inputs[0].links[0].from_node
+        setup_sampler_node(sampler_node, texture_node, get_matched_sampler(sub_matl_data, texture))
+
+    # The copied drivers still read the values from the template material.
+    material.node_tree.animation_data_clear()
+    setup_sub_matl_data_node_drivers(sub_matl_data)
+
+def report_material_creation_times(operator: bpy.types.Operator, built_times: list[float], copied_times: list[float]):
+    total_count = len(built_times) + len(copied_times)
+    if total_count == 0:
+        return
+    message = f'Created {total_count} materials in {sum(built_times) + sum(copied_times):.2f} seconds.'
+    if len(built_times) > 0:
+        message += f' Built {len(built_times)} node trees at {1000 * sum(built_times) / len(built_times):.1f} ms per material.'
+    if len(copied_times) > 0:
+        message += f' Copied {len(copied_times)} node trees at {1000 * sum(copied_times) / len(copied_times):.1f} ms per material.'
+    operator.report({'INFO'}, message)
@@ -1,5 +1,4 @@
 import bpy
-import sqlite3
 
 from pathlib import Path
 from typing import Any
@@ -9,7 +8,8 @@ from .sub_matl_data import *
 from .matl_params import vector_param_id_values, param_id_to_ui_name, vector_param_id_value_to_default_value
 from ..export_model import default_texture
 from .matl_params import *
-from .create_blender_materials_from_matl import setup_blender_material_settings, setup_blender_material_node_tree, get_shader_db_file_path, get_vertex_attributes
+from .create_blender_materials_from_matl import setup_blender_material_settings, setup_blender_material_node_tree
+from .shader_database import get_shader_program, get_vertex_attributes, get_material_parameter_ids
 
 """
 def get_shader_db_file_path():
@@ -31,35 +31,12 @@ def is_valid_shader_label(operator: bpy.types.Operator, shader_label: str) -> bo
         if not any(shader_label.endswith(suffix) for suffix in suffixes):
             operator.report({'ERROR'}, f'Shader Label "{shader_label}" has an invalid suffix!')
             return False
-    with sqlite3.connect(get_shader_db_file_path()) as con:
-        sql = """
-            SELECT *
-            FROM ShaderProgram s 
-            WHERE s.Name = ?
-            """
-        ret = [row[0] for row in con.execute(sql, (shader_label[:len('SFX_PBS_0000000000000080')],)).fetchall()]
-        if len(ret) == 0:
-            operator.report({'ERROR'}, f'Shader Label "{shader_label}" was not in the database!')
-            return False
+    if get_shader_program(shader_label) is None:
+        operator.report({'ERROR'}, f'Shader Label "{shader_label}" was not in the database!')
+        return False
     return True
 
 
-def get_material_parameter_ids(shader_label: str) -> set[int]:
-    # Query the shader database for attribute information.
-    # Using SQLite is much faster than iterating through the JSON dump.
-    with sqlite3.connect(get_shader_db_file_path()) as con:
-        # Construct a query to find all the vertex attributes for this shader.
-        # Invalid shaders will return an empty list.
-        sql = """
-            SELECT m.ParamId
-            FROM MaterialParameter m 
-            INNER JOIN ShaderProgram s ON m.ShaderProgramID = s.ID 
-            WHERE s.Name = ?
-            """
-        # The database has a single entry for each program, so don't include the render pass tag.
-        return {row[0] for row in con.execute(sql, (shader_label[:len('SFX_PBS_0000000000000080')],)).fetchall()}
-
-
 def create_sub_matl_data_from_shader_label(material: bpy.types.Material, shader_label: str):
 
     sub_matl_data: SUB_PG_sub_matl_data = material.sub_matl_data
@@ -0,0 +1,125 @@
+import bpy
+import os
+import pickle
+import sqlite3
+import tempfile
+
+from pathlib import Path
+from typing import NamedTuple
+
+class ShaderProgram(NamedTuple):
+    vertex_attributes: tuple[str, ...]
+    material_parameter_ids: frozenset[int]
+    # Shaders that discard pixels based on alpha, which import as alpha clip materials.
+    discard: bool
+
+class ShaderDatabaseIndex(NamedTuple):
+    # Changing either source file invalidates the pickled index.
+    source_file_signature: tuple
+    shader_name_to_program: dict[str, ShaderProgram]
+
+# The database has a single entry for each program, so labels are trimmed to remove the render pass tag.
+SHADER_NAME_LENGTH = len('SFX_PBS_0000000000000080')
+
+shader_database_index: ShaderDatabaseIndex | None = None
+
+def get_shader_file_folder() -> Path:
+    return Path(__file__).parent.joinpath('shader_file').resolve()
+
+def get_shader_db_file_path() -> Path:
+    # This file was generated with duplicates removed to optimize space.
+    # https://github.com/ScanMountGoat/Smush-Material-Research#shader-database
+    return get_shader_file_folder().joinpath('Nufx.db')
+
+def get_discard_shaders_file_path() -> Path:
+    return get_shader_file_folder().joinpath('shaders_discard_v13.0.1.txt')
+
+def get_index_cache_folder() -> Path:
+    # The addon folder may be read-only or replaced on updates, so the index is stored with Blender's user cache.
+    try:
+        return Path(bpy.utils.user_resource('CACHE', path='smash_ultimate_blender', create=True))
+    except (TypeError, ValueError):
+        # Older versions don't have a cache resource type.
+        return Path(tempfile.gettempdir()).joinpath('smash_ultimate_blender')
+
+def get_index_cache_file_path() -> Path:
+    return get_index_cache_folder().joinpath('Nufx.index.pickle')
+
+def get_source_file_signature() -> tuple:
+    db_stat = os.stat(get_shader_db_file_path())
+    discard_stat = os.stat(get_discard_shaders_file_path())
+    return (db_stat.st_mtime_ns, db_stat.st_size, discard_stat.st_mtime_ns, discard_stat.st_size)
+
+def build_shader_database_index(source_file_signature: tuple) -> ShaderDatabaseIndex:
+    with open(get_discard_shaders_file_path(), 'r') as f:
+        discard_shaders = {line.strip() for line in f.readlines()}
+
+    # Read each table once instead of running a query per shader.
+    with sqlite3.connect(get_shader_db_file_path()) as con:
+        shader_id_to_name: dict[int, str] = {row[0]: row[1] for row in con.execute('SELECT s.ID, s.Name FROM ShaderProgram s')}
+        shader_id_to_attributes: dict[int, list[str]] = {shader_id: [] for shader_id in shader_id_to_name}
+        for shader_id, attribute_name in con.execute('SELECT v.ShaderProgramID, v.AttributeName FROM VertexAttribute v'):
+            shader_id_to_attributes.setdefault(shader_id, []).append(attribute_name)
+        shader_id_to_param_ids: dict[int, set[int]] = {shader_id: set() for shader_id in shader_id_to_name}
+        for shader_id, param_id in con.execute('SELECT m.ShaderProgramID, m.ParamId FROM MaterialParameter m'):
+            shader_id_to_param_ids.setdefault(shader_id, set()).add(param_id)
+
+    shader_name_to_program = {
+        name: ShaderProgram(tuple(shader_id_to_attributes[shader_id]), frozenset(shader_id_to_param_ids[shader_id]), name in discard_shaders)
+        for shader_id, name in shader_id_to_name.items()
+    }
+    return ShaderDatabaseIndex(source_file_signature, shader_name_to_program)
+
+def load_cached_shader_database_index(source_file_signature: tuple) -> ShaderDatabaseIndex | None:
+    try:
+        with open(get_index_cache_file_path(), 'rb') as f:
+            cached_index = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(cached_index, ShaderDatabaseIndex) or cached_index.source_file_signature != source_file_signature:
+        return None
+    return cached_index
+
+def save_cached_shader_database_index(index: ShaderDatabaseIndex):
+    # The index is still kept in memory if the cache can't be written.
+    try:
+        cache_file_path = get_index_cache_file_path()
+        cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file_path, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+
+def get_shader_database_index() -> ShaderDatabaseIndex:
+    """
+    Returns the shader programs from the database, which is only queried again after it changes.
+    The source files are only checked when the index is first loaded in a session, not on every lookup.
+    """
+    global shader_database_index
+    if shader_database_index is not None:
+        return shader_database_index
+
+    source_file_signature = get_source_file_signature()
+    index = load_cached_shader_database_index(source_file_signature)
+    if index is None:
+        index = build_shader_database_index(source_file_signature)
+        save_cached_shader_database_index(index)
+    shader_database_index = index
+    return index
+
+def get_shader_program(shader_label: str) -> ShaderProgram | None:
+    return get_shader_database_index().shader_name_to_program.get(shader_label[:SHADER_NAME_LENGTH])
+
+def get_vertex_attributes(shader_label: str) -> list[str]:
+    # Invalid shaders return an empty list.
+    shader_program = get_shader_program(shader_label)
+    return list(shader_program.vertex_attributes) if shader_program is not None else []
+
+def get_material_parameter_ids(shader_label: str) -> set[int]:
+    # Invalid shaders return an empty set.
+    shader_program = get_shader_program(shader_label)
+    return set(shader_program.material_parameter_ids) if shader_program is not None else set()
+
+def is_discard_shader(shader_label: str) -> bool:
+    shader_program = get_shader_program(shader_label)
+    return shader_program is not None and shader_program.discard
@@ -1,3 +1,5 @@
+import tempfile
+
 from sys import platform
 from platform import processor
 from pathlib import Path
@@ -23,6 +25,16 @@ def convert_nutexb_to_png(nutexb_filepath: Path, output_filepath: Path):
     ultimate_tex_path = get_ultimate_tex_path()
     run([ultimate_tex_path, str(nutexb_filepath),  str(output_filepath)], capture_output=True, check=True)
 
+def convert_nutexb_to_png_data(nutexb_filepath: Path) -> bytes:
+    """
+    Decodes the .nutexb to PNG data without writing anything to the folder of the .nutexb.
+    """
+    # ultimate_tex_cli can only write to files, so use a temporary folder that is deleted afterwards.
+    with tempfile.TemporaryDirectory(prefix='smush_blender_nutexb_') as temp_dir:
+        output_filepath = Path(temp_dir).joinpath('texture.png')
+        convert_nutexb_to_png(nutexb_filepath, output_filepath)
+        return output_filepath.read_bytes()
+
 def batch_convert_nutexb_to_png(dir: Path):
     nutexb_paths: set[Path] = {path for path in dir.glob("*.nutexb")}
 
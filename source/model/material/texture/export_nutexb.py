@@ -1,12 +1,22 @@
 import bpy
+import hashlib
+import numpy as np
+import os
+import shutil
+import struct
+import tempfile
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from subprocess import run, CalledProcessError
+from typing import NamedTuple
 
 from .convert_nutexb_to_png import get_ultimate_tex_path
 from ..create_matl_from_blender_materials import has_sub_matl_data, get_linked_materials
 from .default_textures import generated_default_texture_name_value
 from ...export_model import would_trimmed_names_be_unique, get_problematic_names, trim_name
+from ...model_file_writer import get_file_hash
 
 def export_nutexb_from_blender_materials(operator: bpy.types.Operator, materials: set[bpy.types.Material], export_dir: Path):
     images: set[bpy.types.Image] = set()
@@ -25,48 +35,230 @@ def export_nutexb_from_blender_materials(operator: bpy.types.Operator, materials
 
     trim_names = would_trimmed_names_be_unique(texture_names)
 
-    temp_image_path = export_dir.joinpath("temp.png")
-    for image in images:
-        # Incase a user attempts to export placeholder images.
-        if not image.packed_file:
-            if image.source == 'FILE':
-                if image.filepath == '':
-                    operator.report({'WARNING'}, f"The image `{image.name}` is just a placeholder in blender (likely due to a failed import), so it has no data and cannot be exported.")
+    jobs: list[TextureEncodeJob] = []
+    # Each image gets its own temporary file, so the encodes can run at the same time.
+    with tempfile.TemporaryDirectory(prefix='smush_blender_textures_') as temp_dir:
+        for index, image in enumerate(images):
+            # Incase a user attempts to export placeholder images.
+            if not image.packed_file:
+                if image.source == 'FILE':
+                    if image.filepath == '':
+                        operator.report({'WARNING'}, f"The image `{image.name}` is just a placeholder in blender (likely due to a failed import), so it has no data and cannot be exported.")
+                        continue
+
+            nutexb_filepath: Path
+            if trim_names:
+                nutexb_filepath = export_dir.joinpath(trim_name(image.name) + ".nutexb")
+            else:
+                nutexb_filepath = export_dir.joinpath(image.name + ".nutexb")
+
+            format: str
+            if image.colorspace_settings.name == 'sRGB':
+                format = "BC7Srgb"
+            elif image.colorspace_settings.name == 'Non-Color':
+                format = "BC7Unorm"
+            else:
+                operator.report({'WARNING'}, f"Image `{image.name}` has unsupported color space of `{image.colorspace_settings.name}`, defaulting to BC7Unorm")
+                format = "BC7Unorm"
+
+            # Skip the encode if the pixels and format are the same as a previous export.
+            pixels = get_image_pixels(image)
+            cached_nutexb_path = get_cached_nutexb_path(pixels, image, format)
+            if cached_nutexb_path.is_file():
+                try:
+                    if not are_files_equal(cached_nutexb_path, nutexb_filepath):
+                        copy_file_atomically(cached_nutexb_path, nutexb_filepath)
+                    # Mark the file as recently used so pruning the cache removes other files first.
+                    os.utime(cached_nutexb_path)
+                    operator.report({'INFO'}, f"Reused the cached .NUTEXB for `{image.name}` since its pixels didn't change.")
                     continue
-        # For some image types, such as DDS, blender fails to save using "save", but "save_render" still works.
-        try:
-            image.file_format = 'PNG' # This feels like a hack... but changing this before saving ensures blender exports as a PNG even if its on-disk as a JPG or BMP etc
-            image.save(filepath=str(temp_image_path))
-        except Exception as e:
-            operator.report({'WARNING'}, f"Unable to save the blender image {image.name} to disk using `save`, but will attempt using `save_render`. Error = {e}")
+                except OSError as e:
+                    operator.report({'WARNING'}, f"Failed to reuse the cached .NUTEXB for `{image.name}`, encoding it again. Error = {e}")
+
+            # Write the pixels directly to an uncompressed .dds to avoid compressing and decompressing a PNG.
+            rgba8_pixels = get_rgba8_pixels(image, pixels)
+            if rgba8_pixels is not None:
+                temp_image_path = Path(temp_dir).joinpath(f"{index}.dds")
+                try:
+                    write_rgba8_dds(temp_image_path, rgba8_pixels, format == "BC7Srgb")
+                except OSError as e:
+                    operator.report({'ERROR'}, f"Failed to write the pixels of `{image.name}` to disk. Error = {e}")
+                    continue
+                jobs.append(TextureEncodeJob(image.name, temp_image_path, nutexb_filepath, format, cached_nutexb_path))
+                continue
+
+            # Images can only be saved from the main thread.
+            temp_image_path = Path(temp_dir).joinpath(f"{index}.png")
+            # For some image types, such as DDS, blender fails to save using "save", but "save_render" still works.
             try:
-                image.save_render(filepath=str(temp_image_path))
+                image.file_format = 'PNG' # This feels like a hack... but changing this before saving ensures blender exports as a PNG even if its on-disk as a JPG or BMP etc
+                image.save(filepath=str(temp_image_path))
             except Exception as e:
-                operator.report({'ERROR'}, f"Failed to save the blender image `{image.name}` to disk using either `save` or `save_render`. Error = {e}")
-                continue
+                operator.report({'WARNING'}, f"Unable to save the blender image {image.name} to disk using `save`, but will attempt using `save_render`. Error = {e}")
+                try:
+                    image.save_render(filepath=str(temp_image_path))
+                except Exception as e:
+                    operator.report({'ERROR'}, f"Failed to save the blender image `{image.name}` to disk using either `save` or `save_render`. Error = {e}")
+                    continue
 
-        nutexb_filepath: Path
-        if trim_names:
-            nutexb_filepath = export_dir.joinpath(trim_name(image.name) + ".nutexb")
-        else:
-            nutexb_filepath = export_dir.joinpath(image.name + ".nutexb")
+            jobs.append(TextureEncodeJob(image.name, temp_image_path, nutexb_filepath, format, cached_nutexb_path))
 
-        format: str
-        if image.colorspace_settings.name == 'sRGB':
-            format = "BC7Srgb"
-        elif image.colorspace_settings.name == 'Non-Color':
-            format = "BC7Unorm"
-        else:
-            operator.report({'WARNING'}, f"Image `{image.name}` has unsupported color space of `{image.colorspace_settings.name}`, defaulting to BC7Unorm")
-            format = "BC7Unorm"
+        encode_nutexb_files(operator, jobs)
+
+    # The cache is only an optimization, so failing to prune it isn't an error.
+    prune_nutexb_cache()
+
+# Encoded textures from previous exports, named by the hash of their pixels and encode settings.
+NUTEXB_CACHE_DIR = Path(tempfile.gettempdir()).joinpath('smush_blender_nutexb_cache')
+# The least recently used files are removed once the cache is larger than this or they haven't been used for this long.
+NUTEXB_CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024
+NUTEXB_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+def get_image_pixels(image: bpy.types.Image) -> np.ndarray:
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels
+
+def get_cached_nutexb_path(pixels: np.ndarray, image: bpy.types.Image, format: str) -> Path:
+    texture_hash = hashlib.sha256()
+    # Include the encoder so updating ultimate_tex_cli doesn't reuse outdated files.
+    encoder_modified_time = get_ultimate_tex_path().stat().st_mtime_ns
+    texture_hash.update(f'{image.size[0]}x{image.size[1]}x{image.channels};{format};{encoder_modified_time}'.encode())
+    texture_hash.update(pixels.data)
+    return NUTEXB_CACHE_DIR.joinpath(texture_hash.hexdigest() + '.nutexb')
+
+def store_cached_nutexb(nutexb_path: Path, cached_nutexb_path: Path):
+    cached_nutexb_path.parent.mkdir(parents=True, exist_ok=True)
+    copy_file_atomically(nutexb_path, cached_nutexb_path)
 
+def copy_file_atomically(source_path: Path, destination_path: Path):
+    # Copy to a temporary file first, so the destination is never left partially written.
+    file_descriptor, temp_path = tempfile.mkstemp(suffix='.tmp', dir=destination_path.parent)
+    os.close(file_descriptor)
+    try:
+        shutil.copyfile(source_path, temp_path)
+        # mkstemp only gives the owner access, so use the permissions of the source file instead.
+        shutil.copymode(source_path, temp_path)
+        os.replace(temp_path, destination_path)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+def prune_nutexb_cache():
+    """
+    Removes expired files and then the least recently used files until the cache fits in NUTEXB_CACHE_MAX_SIZE.
+    """
+    now = time.time()
+    entries: list[tuple[float, int, Path]] = []
+    total_size = 0
+    for path in NUTEXB_CACHE_DIR.glob('*'):
+        try:
+            stat = path.stat()
+            # Leftover temporary files are only expected after a crash.
+            is_stale_temp_file = path.suffix == '.tmp' and now - stat.st_mtime > 24 * 60 * 60
+            if is_stale_temp_file or now - stat.st_mtime > NUTEXB_CACHE_MAX_AGE:
+                path.unlink()
+            elif path.suffix == '.nutexb':
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+        except OSError:
+            pass
+
+    for _, size, path in sorted(entries):
+        if total_size <= NUTEXB_CACHE_MAX_SIZE:
+            break
         try:
-            run([get_ultimate_tex_path(), str(temp_image_path), str(nutexb_filepath), "--format", format], capture_output=True, check=True)
-        except CalledProcessError as e:
-            operator.report({'WARNING'}, f"failed to export `{image.name}` as .NUTEXB, error = {e.stderr}")
+            path.unlink()
+            total_size -= size
+        except OSError:
+            pass
+
+def are_files_equal(path: Path, other_path: Path) -> bool:
+    if not other_path.is_file() or path.stat().st_size != other_path.stat().st_size:
+        return False
+    return get_file_hash(path) == get_file_hash(other_path)
+
+def get_rgba8_pixels(image: bpy.types.Image, pixels: np.ndarray) -> np.ndarray | None:
+    """
+    Returns the pixels as RGBA8 rows from top to bottom, or None if the image needs to be saved by Blender instead.
+    """
+    # Float images are stored as scene linear values, so Blender needs to convert them to the image's color space.
+    if image.is_float:
+        return None
+    width, height = image.size
+    if width * height == 0 or len(pixels) % (width * height) != 0:
+        return None
+    channels = len(pixels) // (width * height)
+    if channels not in (1, 3, 4):
+        return None
+
+    # Byte images store the 8-bit values divided by 255, so this gives back the original values.
+    values = np.rint(np.clip(pixels, 0.0, 1.0) * 255.0).astype(np.uint8).reshape((height, width, channels))
+    if channels == 1:
+        values = np.concatenate((np.repeat(values, 3, axis=2), np.full((height, width, 1), 255, dtype=np.uint8)), axis=2)
+    elif channels == 3:
+        values = np.concatenate((values, np.full((height, width, 1), 255, dtype=np.uint8)), axis=2)
+    # Blender stores rows from bottom to top.
+    return np.ascontiguousarray(values[::-1])
+
+def write_rgba8_dds(path: Path, rgba8_pixels: np.ndarray, srgb: bool):
+    # https://learn.microsoft.com/en-us/windows/win32/direct3ddds/dds-header
+    height, width, _ = rgba8_pixels.shape
+    DDSD_CAPS, DDSD_HEIGHT, DDSD_WIDTH, DDSD_PITCH, DDSD_PIXELFORMAT = 0x1, 0x2, 0x4, 0x8, 0x1000
+    DDPF_FOURCC = 0x4
+    DDSCAPS_TEXTURE = 0x1000
+    header = struct.pack('<4s7I44x2I4s5I5I',
+        b'DDS ', 124, DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PITCH | DDSD_PIXELFORMAT, height, width, width * 4, 0, 1,
+        32, DDPF_FOURCC, b'DX10', 0, 0, 0, 0, 0,
+        DDSCAPS_TEXTURE, 0, 0, 0, 0)
+    DXGI_FORMAT_R8G8B8A8_UNORM, DXGI_FORMAT_R8G8B8A8_UNORM_SRGB = 28, 29
+    D3D10_RESOURCE_DIMENSION_TEXTURE2D = 3
+    dx10_header = struct.pack('<5I', DXGI_FORMAT_R8G8B8A8_UNORM_SRGB if srgb else DXGI_FORMAT_R8G8B8A8_UNORM, D3D10_RESOURCE_DIMENSION_TEXTURE2D, 0, 1, 0)
+    with open(path, 'wb') as file:
+        file.write(header)
+        file.write(dx10_header)
+        file.write(rgba8_pixels.data)
 
+class TextureEncodeJob(NamedTuple):
+    image_name: str
+    image_path: Path
+    nutexb_path: Path
+    format: str
+    cached_nutexb_path: Path
+
+def encode_nutexb(job: TextureEncodeJob) -> tuple[float, str | None]:
+    """
+    Returns the time taken and the error if the encode failed.
+    """
+    start = time.perf_counter()
+    try:
+        run([get_ultimate_tex_path(), str(job.image_path), str(job.nutexb_path), "--format", job.format], capture_output=True, check=True)
+    except CalledProcessError as e:
+        return time.perf_counter() - start, e.stderr.decode(errors='replace')
+
+    encode_time = time.perf_counter() - start
+
+    # The cache is only an optimization, so failing to update it isn't an error.
     try:
-        if temp_image_path.exists():
-            temp_image_path.unlink()
-    except Exception as e:
-        operator.report({'WARNING'}, f"Failed to remove temporary .png file used for exporting textures, error = {e}")
+        store_cached_nutexb(job.nutexb_path, job.cached_nutexb_path)
+    except OSError:
+        pass
+    return encode_time, None
+
+def encode_nutexb_files(operator: bpy.types.Operator, jobs: list[TextureEncodeJob]):
+    if len(jobs) == 0:
+        return
+
+    # BC7 encoding happens in separate ultimate_tex_cli processes, so threads are enough to keep every core busy.
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+        results = list(executor.map(encode_nutexb, jobs))
+    total_time = time.perf_counter() - start
+
+    # Operators can only report from the main thread.
+    for job, (encode_time, error) in zip(jobs, results):
+        if error is not None:
+            operator.report({'WARNING'}, f"failed to export `{job.image_name}` as .NUTEXB, error = {error}")
+        else:
+            operator.report({'INFO'}, f"Encoded `{job.image_name}` as {job.format} in {encode_time:.2f} seconds.")
+    operator.report({'INFO'}, f"Encoded {len(jobs)} texture(s) in {total_time:.2f} seconds.")
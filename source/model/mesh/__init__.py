@@ -0,0 +1,4 @@
+from . import export_mesh_cache
+from . import normals_and_tangents
+from . import optimize_vertex_cache
+from . import split_skinned_meshes
\ No newline at end of file
@@ -0,0 +1,146 @@
+import bpy
+import numpy as np
+
+from bpy.app.handlers import persistent
+from bpy.types import Material, Object
+from typing import NamedTuple
+
+from ....dependencies import ssbh_data_py
+
+class CachedExportMesh:
+    """
+    A processed export mesh from a previous export.
+    Used in place of the temporary export mesh object, so unchanged meshes don't need to be processed again.
+    """
+    def __init__(self, name: str, material: Material | None, mesh_object: ssbh_data_py.mesh_data.MeshObjectData, source_indices: np.ndarray | None):
+        self.name = name
+        self.material = material
+        self.mesh_object = mesh_object
+        self.source_indices = source_indices
+
+class CacheEntry(NamedTuple):
+    fingerprint: tuple
+    export_meshes: list[CachedExportMesh]
+
+# Keyed by the pointer of the unprocessed mesh object.
+cache: dict[int, CacheEntry] = {}
+# Pointers of objects and meshes whose geometry changed since they were cached.
+dirty_pointers: set[int] = set()
+# The number of updates for each object and mesh pointer, so changes to modifier targets can be detected.
+update_counts: dict[int, int] = {}
+# The exporter temporarily changes the pose position and visibility, which doesn't change the cached data.
+ignore_updates = False
+
+def copy_mesh_object(mesh_object: ssbh_data_py.mesh_data.MeshObjectData) -> ssbh_data_py.mesh_data.MeshObjectData:
+    # Later export steps edit mesh objects in place, so the cache never shares its attributes.
+    def copy_attributes(attributes: list[ssbh_data_py.mesh_data.AttributeData]) -> list[ssbh_data_py.mesh_data.AttributeData]:
+        return [ssbh_data_py.mesh_data.AttributeData(a.name, np.array(a.data)) for a in attributes]
+
+    mesh_object_copy = ssbh_data_py.mesh_data.MeshObjectData(mesh_object.name, mesh_object.subindex)
+    mesh_object_copy.parent_bone_name = mesh_object.parent_bone_name
+    mesh_object_copy.disable_depth_test = mesh_object.disable_depth_test
+    mesh_object_copy.disable_depth_write = mesh_object.disable_depth_write
+    mesh_object_copy.sort_bias = mesh_object.sort_bias
+    mesh_object_copy.vertex_indices = np.array(mesh_object.vertex_indices, dtype=np.uint32)
+    mesh_object_copy.positions = copy_attributes(mesh_object.positions)
+    mesh_object_copy.normals = copy_attributes(mesh_object.normals)
+    mesh_object_copy.binormals = copy_attributes(mesh_object.binormals)
+    mesh_object_copy.tangents = copy_attributes(mesh_object.tangents)
+    mesh_object_copy.texture_coordinates = copy_attributes(mesh_object.texture_coordinates)
+    mesh_object_copy.color_sets = copy_attributes(mesh_object.color_sets)
+    mesh_object_copy.bone_influences = [
+        ssbh_data_py.mesh_data.BoneInfluence(b.bone_name, [ssbh_data_py.mesh_data.VertexWeight(w.vertex_index, w.vertex_weight) for w in b.vertex_weights])
+        for b in mesh_object.bone_influences
+    ]
+    return mesh_object_copy
+
+def get_modifier_targets(mesh_object: Object) -> list[Object]:
+    # Modifiers store their target objects in differently named properties like "object", "target", or "mirror_object".
+    targets: list[Object] = []
+    for modifier in mesh_object.modifiers:
+        for prop in modifier.bl_rna.properties:
+            if prop.type == 'POINTER' and prop.fixed_type.identifier == 'Object':
+                target = getattr(modifier, prop.identifier)
+                if target is not None:
+                    targets.append(target)
+    return targets
+
+def get_update_count(id: bpy.types.ID | None) -> int:
+    return update_counts.get(id.as_pointer(), 0) if id is not None else 0
+
+def get_fingerprint(mesh_object: Object, armature: Object, apply_modifiers: bool, *export_settings: str) -> tuple:
+    """
+    Identifies the inputs of processing that aren't covered by the depsgraph updates.
+    Edits to the geometry, modifiers, shape keys, and weights are tracked with depsgraph updates instead.
+    """
+    # Only vertex groups matching a bone are exported as weights.
+    bones = armature.data.bones
+    deform_vertex_group_names = tuple(vertex_group.name for vertex_group in mesh_object.vertex_groups if vertex_group.name in bones)
+
+    # Applied modifiers can depend on other objects, which aren't part of the mesh object's updates.
+    modifier_targets = ()
+    if apply_modifiers:
+        modifier_targets = tuple(
+            (target.as_pointer(), tuple(tuple(row) for row in target.matrix_world), get_update_count(target), get_update_count(target.data))
+            for target in get_modifier_targets(mesh_object)
+        )
+
+    return (
+        mesh_object.data.as_pointer(),
+        tuple(tuple(row) for row in mesh_object.matrix_basis),
+        tuple(slot.material.as_pointer() if slot.material is not None else 0 for slot in mesh_object.material_slots),
+        tuple(vertex_group.name for vertex_group in mesh_object.vertex_groups),
+        deform_vertex_group_names,
+        modifier_targets,
+        export_settings,
+    )
+
+def get_cached_export_meshes(mesh_object: Object, fingerprint: tuple) -> list[CachedExportMesh] | None:
+    if mesh_object.as_pointer() in dirty_pointers or mesh_object.data.as_pointer() in dirty_pointers:
+        return None
+    cache_entry = cache.get(mesh_object.as_pointer())
+    if cache_entry is None or cache_entry.fingerprint != fingerprint:
+        return None
+    # Materials are only referenced, so make sure none of them were deleted.
+    try:
+        for export_mesh in cache_entry.export_meshes:
+            if export_mesh.material is not None:
+                export_mesh.material.name
+    except ReferenceError:
+        return None
+    return cache_entry.export_meshes
+
+def store_export_meshes(mesh_object: Object, fingerprint: tuple, export_meshes: list[CachedExportMesh]):
+    cache[mesh_object.as_pointer()] = CacheEntry(fingerprint, export_meshes)
+    dirty_pointers.discard(mesh_object.as_pointer())
+    dirty_pointers.discard(mesh_object.data.as_pointer())
+
+@persistent
+def mark_updated_ids_dirty(_scene, depsgraph: bpy.types.Depsgraph):
+    if ignore_updates:
+        return
+    for update in depsgraph.updates:
+        if update.is_updated_geometry or update.is_updated_transform:
+            pointer = update.id.original.as_pointer()
+            dirty_pointers.add(pointer)
+            update_counts[pointer] = update_counts.get(pointer, 0) + 1
+
+@persistent
+def clear_cache(*_args):
+    # Undo and loading files can free or reallocate the cached objects.
+    cache.clear()
+    dirty_pointers.clear()
+    update_counts.clear()
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(mark_updated_ids_dirty)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(clear_cache)
+
+def unregister():
+    if mark_updated_ids_dirty in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(mark_updated_ids_dirty)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if clear_cache in handlers:
+            handlers.remove(clear_cache)
+    clear_cache()
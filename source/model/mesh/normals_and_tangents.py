@@ -0,0 +1,51 @@
+import numpy as np
+
+from ....dependencies import ssbh_data_py
+
+def average_loop_values(loop_values: np.ndarray, vertex_indices: np.ndarray, vertex_count: int) -> np.ndarray:
+    """
+    Averages per loop values like normals to per vertex values.
+    Loops of the same vertex only differ slightly after splitting duplicate loop attributes.
+    """
+    cols = loop_values.shape[1]
+    loop_counts = np.bincount(vertex_indices, minlength=vertex_count).astype(np.float32)
+    per_vertex = np.empty((vertex_count, cols), dtype=np.float32)
+    for col in range(cols):
+        per_vertex[:, col] = np.bincount(vertex_indices, weights=loop_values[:, col], minlength=vertex_count)
+    per_vertex /= np.maximum(loop_counts, 1.0)[:, np.newaxis]
+    return per_vertex
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(lengths > 0.0, lengths, 1.0)
+
+def calculate_vertex_normals(positions: np.ndarray, vertex_indices: np.ndarray, loop_normals: np.ndarray | None) -> np.ndarray:
+    """
+    Returns normals padded to 4 components.
+    Custom normals are averaged from the loop normals, otherwise smooth normals are calculated from the positions.
+    Sharp edges are already split, so smooth normals don't smooth across them.
+    """
+    if loop_normals is not None:
+        normals = normalize(average_loop_values(loop_normals, vertex_indices, len(positions)))
+    else:
+        normals = np.array(ssbh_data_py.mesh_data.calculate_smooth_normals(positions, vertex_indices), dtype=np.float32)[:, :3]
+
+    # Pad normals to 4 components instead of 3 components.
+    # This actually results in smaller file sizes since HalFloat4 is smaller than Float3.
+    return np.hstack((normals, np.zeros((len(normals), 1), dtype=np.float32)))
+
+def calculate_vertex_tangents(positions: np.ndarray, normals: np.ndarray, uvs: np.ndarray | None, vertex_indices: np.ndarray) -> np.ndarray:
+    """
+    Returns tangents with the bitangent sign in the 4th component.
+    Tangents need a UV map, so meshes without one get an arbitrary tangent perpendicular to the normal.
+    The exported UVs are flipped vertically, so the signs match Blender's bitangent_sign * -1 like previous exports.
+    test/verify_tangent_signs.py checks this for regular and mirrored UVs.
+    """
+    if uvs is not None:
+        return np.array(ssbh_data_py.mesh_data.calculate_tangents_vec4(positions, normals[:, :3], uvs, vertex_indices), dtype=np.float32)
+
+    normals = normals[:, :3]
+    # Use whichever axis is least aligned with the normal to avoid a zero length cross product.
+    axes = np.eye(3, dtype=np.float32)[np.argmin(np.abs(normals), axis=1)]
+    tangents = normalize(np.cross(normals, axes))
+    return np.hstack((tangents, np.ones((len(tangents), 1), dtype=np.float32)))
@@ -0,0 +1,178 @@
+import bpy
+import numpy as np
+
+from ....dependencies import ssbh_data_py
+
+# The FIFO size used by Tipsify and for measuring ACMR.
+CACHE_SIZE = 32
+
+def calculate_acmr(vertex_indices: np.ndarray, cache_size: int = CACHE_SIZE) -> float:
+    """
+    Average cache miss ratio, the number of transformed vertices per triangle for a FIFO post-transform cache.
+    Lower is better, the ideal for a regular triangle mesh is around 0.5.
+    """
+    if len(vertex_indices) == 0:
+        return 0.0
+    # A vertex is still in the FIFO cache if fewer than cache_size misses happened since it was added.
+    miss_time = np.full(int(vertex_indices.max()) + 1, -cache_size - 1, dtype=np.int64)
+    misses = 0
+    for vertex in vertex_indices.tolist():
+        if misses - miss_time[vertex] > cache_size:
+            miss_time[vertex] = misses
+            misses += 1
+    return misses / (len(vertex_indices) // 3)
+
+def get_vertex_triangle_adjacency(triangles: np.ndarray, vertex_count: int) -> tuple[np.ndarray, np.ndarray]:
+    # Compressed rows of the triangles using each vertex.
+    triangle_per_corner = np.repeat(np.arange(len(triangles)), 3)
+    order = np.argsort(triangles.ravel(), kind='stable')
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(triangles.ravel(), minlength=vertex_count), out=offsets[1:])
+    return offsets, triangle_per_corner[order]
+
+def tipsify(triangles: np.ndarray, vertex_count: int, cache_size: int = CACHE_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reorders triangles for the post-transform vertex cache.
+    Returns the new triangle order and the start of each cluster of triangles separated by cache flushes.
+    https://gfx.cs.princeton.edu/pubs/Sander_2007_%3ETR/tipsy.pdf
+    """
+    offsets, adjacent_triangles = get_vertex_triangle_adjacency(triangles, vertex_count)
+    offsets = offsets.tolist()
+    adjacent_triangles = adjacent_triangles.tolist()
+    triangle_vertices = triangles.tolist()
+
+    live_triangles = np.bincount(triangles.ravel(), minlength=vertex_count).tolist()
+    cache_time = [0] * vertex_count
+    emitted = [False] * len(triangle_vertices)
+    dead_end: list[int] = []
+    triangle_order: list[int] = []
+    cluster_starts: list[int] = [0]
+
+    time = cache_size + 1
+    cursor = 0
+    fanning_vertex = int(triangles[0, 0]) if len(triangle_vertices) > 0 else -1
+    while fanning_vertex >= 0:
+        candidates: list[int] = []
+        for triangle in adjacent_triangles[offsets[fanning_vertex]:offsets[fanning_vertex + 1]]:
+            if emitted[triangle]:
+                continue
+            emitted[triangle] = True
+            triangle_order.append(triangle)
+            for vertex in triangle_vertices[triangle]:
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live_triangles[vertex] -= 1
+                if time - cache_time[vertex] > cache_size:
+                    cache_time[vertex] = time
+                    time += 1
+
+        # Prefer the candidate that stays in the cache the longest while fanning its remaining triangles.
+        fanning_vertex = -1
+        best_priority = -1
+        for vertex in candidates:
+            if live_triangles[vertex] <= 0:
+                continue
+            age = time - cache_time[vertex]
+            if age + 2 * live_triangles[vertex] <= cache_size and age > best_priority:
+                best_priority = age
+                fanning_vertex = vertex
+        if fanning_vertex >= 0:
+            continue
+
+        # Continue from recently used vertices before scanning for any unfinished vertex.
+        while dead_end:
+            vertex = dead_end.pop()
+            if live_triangles[vertex] > 0:
+                fanning_vertex = vertex
+                break
+        else:
+            while cursor < vertex_count and live_triangles[cursor] <= 0:
+                cursor += 1
+            if cursor < vertex_count:
+                fanning_vertex = cursor
+
+        # Cache contents are mostly lost when jumping to a new vertex, which separates the clusters.
+        if fanning_vertex >= 0 and len(triangle_order) > cluster_starts[-1]:
+            cluster_starts.append(len(triangle_order))
+
+    return np.array(triangle_order, dtype=np.int64), np.array(cluster_starts, dtype=np.int64)
+
+def sort_clusters_for_overdraw(positions: np.ndarray, triangles: np.ndarray, cluster_starts: np.ndarray) -> np.ndarray:
+    """
+    Sorts clusters so outward facing clusters draw first and occlude the rest of the mesh.
+    The triangle order within each cluster is preserved to keep the vertex cache efficiency.
+    """
+    if len(cluster_starts) <= 1:
+        return triangles
+
+    corners = positions[triangles]
+    # The cross product is scaled by triangle area, so summing gives area weighted cluster normals.
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    face_centers = corners.mean(axis=1)
+    cluster_sizes = np.diff(np.append(cluster_starts, len(triangles)))
+    cluster_normals = np.add.reduceat(face_normals, cluster_starts, axis=0)
+    cluster_centers = np.add.reduceat(face_centers, cluster_starts, axis=0) / cluster_sizes[:, np.newaxis]
+    mesh_center = face_centers.mean(axis=0)
+    outwardness = np.einsum('ij,ij->i', cluster_centers - mesh_center, cluster_normals)
+
+    cluster_order = np.argsort(-outwardness, kind='stable')
+    triangle_order = np.concatenate([np.arange(cluster_starts[i], cluster_starts[i] + cluster_sizes[i]) for i in cluster_order])
+    return triangles[triangle_order]
+
+def reorder_vertices_by_first_use(mesh_object: ssbh_data_py.mesh_data.MeshObjectData, vertex_indices: np.ndarray, vertex_count: int):
+    # Store vertices in the order they are first used to improve vertex fetch locality.
+    unique_vertices, first_use = np.unique(vertex_indices, return_index=True)
+    used_vertices = unique_vertices[np.argsort(first_use)]
+    unused_vertices = np.setdiff1d(np.arange(vertex_count), used_vertices)
+    new_to_old = np.concatenate([used_vertices, unused_vertices])
+    old_to_new = np.empty(vertex_count, dtype=np.int64)
+    old_to_new[new_to_old] = np.arange(vertex_count)
+
+    mesh_object.vertex_indices = old_to_new[vertex_indices].astype(np.uint32)
+    for attributes in (mesh_object.positions, mesh_object.normals, mesh_object.binormals, mesh_object.tangents,
+                       mesh_object.texture_coordinates, mesh_object.color_sets):
+        for attribute in attributes:
+            attribute.data = np.asarray(attribute.data)[new_to_old]
+
+    bone_influences = []
+    for influence in mesh_object.bone_influences:
+        weights = [ssbh_data_py.mesh_data.VertexWeight(int(old_to_new[w.vertex_index]), w.vertex_weight) for w in influence.vertex_weights]
+        bone_influences.append(ssbh_data_py.mesh_data.BoneInfluence(influence.bone_name, weights))
+    mesh_object.bone_influences = bone_influences
+
+def optimize_mesh_object(mesh_object: ssbh_data_py.mesh_data.MeshObjectData, reduce_overdraw: bool) -> tuple[float, float]:
+    """
+    Reorders the triangles and vertices of the mesh object for rendering in game.
+    Returns the ACMR before and after optimizing.
+    """
+    vertex_indices = np.asarray(mesh_object.vertex_indices, dtype=np.int64)
+    positions = np.asarray(mesh_object.positions[0].data, dtype=np.float32)
+    acmr_before = calculate_acmr(vertex_indices)
+
+    triangles = vertex_indices.reshape((-1, 3))
+    triangle_order, cluster_starts = tipsify(triangles, len(positions))
+    triangles = triangles[triangle_order]
+    if reduce_overdraw:
+        triangles = sort_clusters_for_overdraw(positions, triangles, cluster_starts)
+
+    reorder_vertices_by_first_use(mesh_object, triangles.ravel(), len(positions))
+    acmr_after = calculate_acmr(np.asarray(mesh_object.vertex_indices, dtype=np.int64))
+    return acmr_before, acmr_after
+
+def optimize_mesh_data(operator: bpy.types.Operator, ssbh_mesh_data: ssbh_data_py.mesh_data.MeshData, reduce_overdraw: bool):
+    total_triangles = 0
+    total_misses_before = 0.0
+    total_misses_after = 0.0
+    for mesh_object in ssbh_mesh_data.objects:
+        if len(mesh_object.vertex_indices) == 0:
+            continue
+        acmr_before, acmr_after = optimize_mesh_object(mesh_object, reduce_overdraw)
+        triangle_count = len(mesh_object.vertex_indices) // 3
+        total_triangles += triangle_count
+        total_misses_before += acmr_before * triangle_count
+        total_misses_after += acmr_after * triangle_count
+        operator.report({'INFO'}, f'Mesh {mesh_object.name} ({mesh_object.subindex}) ACMR: {acmr_before:.3f} -> {acmr_after:.3f}')
+
+    if total_triangles > 0:
+        message = f'Vertex cache optimization ACMR for all meshes: {total_misses_before / total_triangles:.3f} -> {total_misses_after / total_triangles:.3f}'
+        operator.report({'INFO'}, message)
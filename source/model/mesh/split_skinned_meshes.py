@@ -0,0 +1,136 @@
+import bpy
+import numpy as np
+
+from operator import attrgetter
+
+from ....dependencies import ssbh_data_py
+
+# Mesh version 1.10 only has 16-bit unsigned vertex indices for skin weights.
+MAX_SKINNED_VERTEX_COUNT = 65536
+
+def spread_bits(values: np.ndarray) -> np.ndarray:
+    # Inserts two zero bits between each of the lower 10 bits, so three coordinates can be interleaved.
+    values = values.astype(np.uint32) & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+def get_locality_sorted_triangles(positions: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    # Sorting by the morton code (z-order curve) of the face centers keeps nearby triangles together.
+    # This keeps the chunks compact, so fewer vertices get duplicated across chunk borders.
+    centers = positions[triangles].mean(axis=1)
+    min_position = centers.min(axis=0)
+    extent = np.maximum(centers.max(axis=0) - min_position, 1e-6)
+    cells = ((centers - min_position) / extent * 1023.0).astype(np.uint32)
+    codes = spread_bits(cells[:, 0]) | (spread_bits(cells[:, 1]) << 1) | (spread_bits(cells[:, 2]) << 2)
+    return triangles[np.argsort(codes, kind='stable')]
+
+def get_triangle_chunks(triangles: np.ndarray, max_vertex_count: int) -> list[np.ndarray]:
+    chunks: list[np.ndarray] = []
+    start = 0
+    while start < len(triangles):
+        flattened = triangles[start:].ravel()
+        _, first_indices = np.unique(flattened, return_index=True)
+        if len(first_indices) <= max_vertex_count:
+            chunks.append(triangles[start:])
+            break
+        # The chunk ends before the triangle that adds one vertex too many.
+        first_indices.sort()
+        end = start + first_indices[max_vertex_count] // 3
+        chunks.append(triangles[start:end])
+        start = end
+    return chunks
+
+def copy_attributes(attributes: list[ssbh_data_py.mesh_data.AttributeData], used_vertices: np.ndarray) -> list[ssbh_data_py.mesh_data.AttributeData]:
+    return [ssbh_data_py.mesh_data.AttributeData(a.name, np.asarray(a.data)[used_vertices]) for a in attributes]
+
+def make_chunk_mesh_object(mesh_object: ssbh_data_py.mesh_data.MeshObjectData, chunk: np.ndarray, vertex_count: int,
+                           influence_arrays: list[tuple[str, np.ndarray, np.ndarray]]) -> ssbh_data_py.mesh_data.MeshObjectData:
+    used_vertices, new_vertex_indices = np.unique(chunk.ravel(), return_inverse=True)
+    old_to_new = np.full(vertex_count, -1, dtype=np.int64)
+    old_to_new[used_vertices] = np.arange(len(used_vertices))
+
+    chunk_mesh_object = ssbh_data_py.mesh_data.MeshObjectData(mesh_object.name, mesh_object.subindex)
+    chunk_mesh_object.parent_bone_name = mesh_object.parent_bone_name
+    chunk_mesh_object.disable_depth_test = mesh_object.disable_depth_test
+    chunk_mesh_object.disable_depth_write = mesh_object.disable_depth_write
+    chunk_mesh_object.sort_bias = mesh_object.sort_bias
+    chunk_mesh_object.vertex_indices = new_vertex_indices.astype(np.uint32)
+    chunk_mesh_object.positions = copy_attributes(mesh_object.positions, used_vertices)
+    chunk_mesh_object.normals = copy_attributes(mesh_object.normals, used_vertices)
+    chunk_mesh_object.binormals = copy_attributes(mesh_object.binormals, used_vertices)
+    chunk_mesh_object.tangents = copy_attributes(mesh_object.tangents, used_vertices)
+    chunk_mesh_object.texture_coordinates = copy_attributes(mesh_object.texture_coordinates, used_vertices)
+    chunk_mesh_object.color_sets = copy_attributes(mesh_object.color_sets, used_vertices)
+
+    bone_influences = []
+    for bone_name, vertex_indices, vertex_weights in influence_arrays:
+        new_indices = old_to_new[vertex_indices]
+        in_chunk = new_indices >= 0
+        if not in_chunk.any():
+            continue
+        # ssbh_data_py only accepts a list of VertexWeight, so convert the arrays to Python values once instead of per weight.
+        weights = list(map(ssbh_data_py.mesh_data.VertexWeight, new_indices[in_chunk].tolist(), vertex_weights[in_chunk].tolist()))
+        bone_influences.append(ssbh_data_py.mesh_data.BoneInfluence(bone_name, weights))
+    chunk_mesh_object.bone_influences = bone_influences
+
+    return chunk_mesh_object
+
+def split_mesh_object(mesh_object: ssbh_data_py.mesh_data.MeshObjectData) -> list[ssbh_data_py.mesh_data.MeshObjectData]:
+    """
+    Splits a skinned mesh object with too many vertices into chunks that each fit the 16-bit skin weight indices.
+    Returns the original mesh object if it doesn't need to be split.
+    """
+    positions = np.asarray(mesh_object.positions[0].data, dtype=np.float32)
+    if len(mesh_object.bone_influences) == 0 or len(positions) <= MAX_SKINNED_VERTEX_COUNT:
+        return [mesh_object]
+
+    triangles = np.asarray(mesh_object.vertex_indices, dtype=np.int64).reshape((-1, 3))
+    chunks = get_triangle_chunks(get_locality_sorted_triangles(positions, triangles), MAX_SKINNED_VERTEX_COUNT)
+
+    influence_arrays = [
+        (
+            influence.bone_name,
+            np.fromiter(map(attrgetter('vertex_index'), influence.vertex_weights), dtype=np.int64, count=len(influence.vertex_weights)),
+            np.fromiter(map(attrgetter('vertex_weight'), influence.vertex_weights), dtype=np.float32, count=len(influence.vertex_weights)),
+        )
+        for influence in mesh_object.bone_influences
+    ]
+    return [make_chunk_mesh_object(mesh_object, chunk, len(positions), influence_arrays) for chunk in chunks]
+
+def split_large_skinned_meshes(operator: bpy.types.Operator, ssbh_mesh_data: ssbh_data_py.mesh_data.MeshData,
+                               ssbh_modl_data: ssbh_data_py.modl_data.ModlData | None):
+    """
+    Replaces skinned mesh objects over the vertex limit with several mesh objects with consecutive subindices.
+    The subindices of the other mesh objects in the same group and the matching .NUMDLB entries are updated to match.
+    """
+    if not any(len(o.bone_influences) > 0 and len(o.positions[0].data) > MAX_SKINNED_VERTEX_COUNT for o in ssbh_mesh_data.objects):
+        return
+
+    material_labels: dict[tuple[str, int], str] = {}
+    if ssbh_modl_data is not None:
+        material_labels = {(e.mesh_object_name, e.mesh_object_subindex): e.material_label for e in ssbh_modl_data.entries}
+
+    new_mesh_objects: list[ssbh_data_py.mesh_data.MeshObjectData] = []
+    new_modl_entries: list[ssbh_data_py.modl_data.ModlEntryData] = []
+    group_name_to_next_subindex: dict[str, int] = {}
+    for mesh_object in ssbh_mesh_data.objects:
+        material_label = material_labels.get((mesh_object.name, mesh_object.subindex))
+        chunks = split_mesh_object(mesh_object)
+        if len(chunks) > 1:
+            message = f'Mesh {mesh_object.name} has {len(mesh_object.positions[0].data)} vertices, which exceeds the limit of 65536 for skinned meshes.'
+            message += f' It was split into {len(chunks)} meshes.'
+            operator.report({'INFO'}, message)
+
+        for chunk in chunks:
+            chunk.subindex = group_name_to_next_subindex.get(chunk.name, 0)
+            group_name_to_next_subindex[chunk.name] = chunk.subindex + 1
+            new_mesh_objects.append(chunk)
+            if material_label is not None:
+                new_modl_entries.append(ssbh_data_py.modl_data.ModlEntryData(chunk.name, chunk.subindex, material_label))
+
+    ssbh_mesh_data.objects = new_mesh_objects
+    if ssbh_modl_data is not None:
+        ssbh_modl_data.entries = new_modl_entries
@@ -0,0 +1,75 @@
+import bpy
+import os
+import hashlib
+import tempfile
+import traceback
+
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+class PendingFile(NamedTuple):
+    path: Path
+    save: Callable[[str], None]
+    description: str
+
+def get_file_hash(path: Path) -> bytes:
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.digest()
+
+def save_if_changed(pending_file: PendingFile) -> bool:
+    """
+    Saves to a temporary file in the same folder, and only replaces the existing file if the contents changed.
+    Replacing the file with a rename means other programs never see a partially written file.
+    Returns True if the file was written.
+    """
+    path = pending_file.path
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)
+    os.close(fd)
+    try:
+        pending_file.save(temp_path)
+        if path.is_file() and os.path.getsize(path) == os.path.getsize(temp_path):
+            if get_file_hash(path) == get_file_hash(Path(temp_path)):
+                return False
+        os.replace(temp_path, path)
+        return True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+class ModelFileWriter:
+    """
+    Collects the exported files and writes them together at the end of the export.
+    Unchanged files are skipped, so file watching mod loaders only reload what changed.
+    """
+    def __init__(self):
+        self.pending_files: list[PendingFile] = []
+
+    def add(self, path: Path, save: Callable[[str], None], description: str):
+        self.pending_files.append(PendingFile(path, save, description))
+
+    def write(self, operator: bpy.types.Operator):
+        if len(self.pending_files) == 0:
+            return
+
+        # The ssbh save functions hold the GIL for most of the work, so the files are saved one at a time.
+        results: list[tuple[bool | None, str]] = []
+        for pending_file in self.pending_files:
+            try:
+                results.append((save_if_changed(pending_file), ''))
+            except Exception as e:
+                results.append((None, f'Error="{e}" ; Traceback=\n{traceback.format_exc()}'))
+
+        written = 0
+        unchanged = 0
+        for pending_file, (was_written, error) in zip(self.pending_files, results):
+            if was_written is None:
+                operator.report({'ERROR'}, f'Failed to save {pending_file.description}, {error}')
+            elif was_written:
+                written += 1
+            else:
+                unchanged += 1
+        operator.report({'INFO'}, f'Saved {written} changed file(s) and skipped {unchanged} unchanged file(s).')
+        self.pending_files.clear()
@@ -21,6 +21,7 @@ classes = [
     source.model.export_model.SUB_OP_model_exporter,
     source.model.export_model.SUB_OP_vanilla_nusktb_selector,
     source.model.export_model.SUB_OP_vanilla_update_prc_selector,
+    source.model.export_model.SUB_OP_standard_bone_changes_refresh,
     source.exo.magic_exo_skel.SUB_OP_build_bone_list,
     source.exo.magic_exo_skel.SUB_OP_populate_bone_list,
     source.exo.magic_exo_skel.SUB_OP_update_bone_list,
@@ -175,6 +176,8 @@ classes = [
     source.swing.operators.SUB_OP_swing_data_connection_remove,
     source.swing.operators.SUB_OP_swing_import,
     source.swing.operators.SUB_OP_swing_export,
+    source.swing.operators.SUB_OP_swing_rename_collisions,
+    source.swing.swing_preview.SUB_OP_swing_bake_preview,
     source.updater.ui.SUB_PT_update_plugin,
     source.extras.eye_material_custom_vector_31_modal.SUB_OP_eye_material_custom_vector_31_modal,
     source.extras.set_linear_vertex_color.SUB_OP_LinearColorSet,
@@ -1,3 +1,7 @@
 from . import operators
+from . import param_labels
+from . import shape_updates
 from . import sub_swing_data
+from . import swing_preview
+from . import swing_solver
 from . import ui    
\ No newline at end of file
@@ -1,17 +1,20 @@
 # BPY Imports
 import bpy
 from bpy.types import (
-    Operator, Context, CopyTransformsConstraint, CopyLocationConstraint, TrackToConstraint, Collection, Object, Mesh, Armature)
+    Operator, Context, CopyTransformsConstraint, CopyLocationConstraint, TrackToConstraint, Collection, LayerCollection, Object, Mesh, Armature)
 from bpy.props import (
     IntProperty, StringProperty, EnumProperty, BoolProperty, FloatProperty, CollectionProperty, PointerProperty, FloatVectorProperty)
 # Standard Library Imports
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator
 from math import radians, degrees
 from mathutils import Vector
 # 3rd Party Imports
 from ...dependencies import pyprc
 # Local Project Imports
 from ..extras import create_meshes
+from .param_labels import ensure_pyprc_labels_loaded
 from .sub_swing_data import *
 
 ''' 
@@ -558,8 +561,7 @@ class SUB_OP_swing_data_sphere_remove(Operator):
         sub_swing_data: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
         active_sphere: SUB_PG_swing_sphere = sub_swing_data.spheres[sub_swing_data.active_sphere_index]
 
-        bpy.data.meshes.remove(active_sphere.blender_object.data)
-        #bpy.data.objects.remove(active_sphere.blender_object) # Deleting the mesh automatically deletes the object too?
+        create_meshes.remove_shape_object(active_sphere.blender_object)
         
         remove_active_collision_from_collection("SPHERE", sub_swing_data)
         return {'FINISHED'}   
@@ -674,7 +676,7 @@ class SUB_OP_swing_data_oval_remove(Operator):
         sub_swing_data: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
         active_oval: SUB_PG_swing_oval = sub_swing_data.ovals[sub_swing_data.active_oval_index]
 
-        bpy.data.meshes.remove(active_oval.blender_object.data)
+        create_meshes.remove_shape_object(active_oval.blender_object)
 
         remove_active_collision_from_collection('OVAL', context.object.data.sub_swing_data)
         return {'FINISHED'}
@@ -778,7 +780,7 @@ class SUB_OP_swing_data_ellipsoid_remove(Operator):
         sub_swing_data: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
         active_ellipsoid: SUB_PG_swing_oval = sub_swing_data.ellipsoids[sub_swing_data.active_ellipsoid_index]
 
-        bpy.data.meshes.remove(active_ellipsoid.blender_object.data)
+        create_meshes.remove_shape_object(active_ellipsoid.blender_object)
 
         remove_active_collision_from_collection('ELLIPSOID', context.object.data.sub_swing_data)
         return {'FINISHED'}
@@ -895,7 +897,7 @@ class SUB_OP_swing_data_capsule_remove(Operator):
         sub_swing_data: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
         active_capsule: SUB_PG_swing_oval = sub_swing_data.capsules[sub_swing_data.active_capsule_index]
 
-        bpy.data.meshes.remove(active_capsule.blender_object.data)
+        create_meshes.remove_shape_object(active_capsule.blender_object)
 
         remove_active_collision_from_collection('CAPSULE', context.object.data.sub_swing_data)
         return {'FINISHED'}
@@ -1004,7 +1006,7 @@ class SUB_OP_swing_data_plane_remove(Operator):
         sub_swing_data: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
         active_plane: SUB_PG_swing_plane = sub_swing_data.planes[sub_swing_data.active_plane_index]
 
-        bpy.data.meshes.remove(active_plane.blender_object.data)
+        create_meshes.remove_shape_object(active_plane.blender_object)
 
         remove_active_collision_from_collection('PLANE', context.object.data.sub_swing_data)
         return {'FINISHED'}
@@ -1104,7 +1106,7 @@ class SUB_OP_swing_data_connection_remove(Operator):
 
         active_connection: SUB_PG_swing_connection = sub_swing_data.connections[sub_swing_data.active_connection_index]
 
-        bpy.data.meshes.remove(active_connection.blender_object.data)
+        create_meshes.remove_shape_object(active_connection.blender_object)
 
         active_connection_index = sub_swing_data.active_connection_index
         sub_swing_data.connections.remove(active_connection_index)
@@ -1145,8 +1147,14 @@ class SUB_OP_swing_import(Operator):
         setup_bone_meshes(self, context, collection)
         return {'FINISHED'}
     
+@lru_cache(maxsize=None)
+def get_prc_hash(input):
+    return pyprc.hash(input)
+
 def struct_get(param_struct, input, fallback=None):
-    return dict(param_struct).get(pyprc.hash(input), fallback)
+    # Converting a struct to a dict is slow, so callers doing many lookups should convert it once and pass the dict.
+    param_dict = param_struct if isinstance(param_struct, dict) else dict(param_struct)
+    return param_dict.get(get_prc_hash(input), fallback)
 
 def struct_get_str(param_struct, input):
     h = struct_get(param_struct, input)
@@ -1160,13 +1168,13 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
     arma_data: bpy.types.Armature = context.object.data
     ssd: SUB_PG_sub_swing_data = arma_data.sub_swing_data
     prc_root = pyprc.param(filepath)
-    labels_path = (Path(__file__).parent.parent.parent / 'dependencies' / 'pyprc' / 'ParamLabels.csv').resolve()
-    pyprc.hash.load_labels(str(labels_path))
+    ensure_pyprc_labels_loaded()
 
     raw_hash_to_blender_bone = {pyprc.hash(bone.name.lower()) : bone for bone in arma_data.bones}
+    prc_root = dict(prc_root)
     
     try:
-        prc_spheres = list(dict(prc_root).get(pyprc.hash('spheres')))
+        prc_spheres = [dict(prc_struct) for prc_struct in prc_root.get(pyprc.hash('spheres'))]
     except:
         operator.report({'ERROR'}, 'No "spheres" list in the prc!')
         return
@@ -1186,7 +1194,7 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
 
     
     try:
-        prc_ovals = list(dict(prc_root).get(pyprc.hash('ovals')))
+        prc_ovals = [dict(prc_struct) for prc_struct in prc_root.get(pyprc.hash('ovals'))]
     except:
         operator.report({'ERROR'}, 'No "ovals" list in the prc!')
         return
@@ -1212,7 +1220,7 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
         new_oval.end_offset.z = struct_get_val(prc_oval, 'end_offset_z')
 
     try:
-        prc_ellipsoids = list(dict(prc_root).get(pyprc.hash('ellipsoids')))
+        prc_ellipsoids = [dict(prc_struct) for prc_struct in prc_root.get(pyprc.hash('ellipsoids'))]
     except:
         operator.report({'ERROR'}, 'No "ellipsoids" list in the prc!')
         return
@@ -1236,7 +1244,7 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
         new_ellipsoid.scale.z = struct_get_val(prc_ellipsoid, 'sz')
     
     try:
-        prc_capsules = list(dict(prc_root).get(pyprc.hash('capsules')))
+        prc_capsules = [dict(prc_struct) for prc_struct in prc_root.get(pyprc.hash('capsules'))]
     except:
         operator.report({'ERROR'}, 'No "capsules" list in the prc!')
         return
@@ -1263,7 +1271,7 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
         new_capsule.end_radius = struct_get_val(prc_capsule, 'end_radius')
 
     try:
-        prc_planes = list(dict(prc_root).get(pyprc.hash('planes')))
+        prc_planes = [dict(prc_struct) for prc_struct in prc_root.get(pyprc.hash('planes'))]
     except:
         operator.report({'ERROR'}, 'No "planes" list in the prc!')
         return
@@ -1282,7 +1290,7 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
         new_plane.distance = struct_get_val(prc_plane, 'distance')
 
     try:
-        prc_connections = list(dict(prc_root).get(pyprc.hash('connections')))
+        prc_connections = [dict(prc_struct) for prc_struct in prc_root.get(pyprc.hash('connections'))]
     except:
         operator.report({'ERROR'}, 'No "connections" list in the prc!')
         return
@@ -1307,10 +1315,12 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
         new_connection.length = struct_get_val(prc_connection, 'length')
     
     try:
-        prc_swing_bone_chains = list(dict(prc_root).get(pyprc.hash('swingbones')))
+        prc_swing_bone_chains = [dict(prc_struct) for prc_struct in prc_root.get(pyprc.hash('swingbones'))]
     except:
         operator.report({'ERROR'}, 'No "swingbones" list in the prc!')
         return
+    # Look up collisions by name instead of searching every collision list for each reference.
+    collision_name_to_info = get_collision_name_to_info(ssd)
     for chain in prc_swing_bone_chains:
         matched_start_bone: bpy.types.Bone = raw_hash_to_blender_bone.get(struct_get(chain, 'start_bonename').value)
         matched_end_bone: bpy.types.Bone = raw_hash_to_blender_bone.get(struct_get(chain, 'end_bonename').value)
@@ -1340,7 +1350,7 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
             new_chain.has_unk_8 = True
             new_chain.unk_8 = unk_8
         
-        for prc_swing_bone_parameters in list(struct_get(chain, 'params')):
+        for prc_swing_bone_parameters in [dict(prc_struct) for prc_struct in struct_get(chain, 'params')]:
             new_swing_bone: SUB_PG_swing_bone           = new_chain.swing_bones.add()
             new_swing_bone.air_resistance       = struct_get_val(prc_swing_bone_parameters, 'airresistance')
             new_swing_bone.water_resistance     = struct_get_val(prc_swing_bone_parameters, 'waterresistance')
@@ -1367,7 +1377,7 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
                 if str(prc_swing_bone_collision.value) == '':
                     operator.report({'INFO'}, f'A swing bone in chain {new_chain.name} has an empty collision, discarding the empty collision.')
                     continue
-                col_type, col_index = get_collision_info(ssd, str(prc_swing_bone_collision.value))
+                col_type, col_index = collision_name_to_info.get(str(prc_swing_bone_collision.value), (None, None))
                 if col_type is None or col_index is None:
                     operator.report({'WARNING'}, f'A swing bone in chain {new_chain.name} refrences missing collision {str(prc_swing_bone_collision.value)}, discarding the missing collision.')
                     continue
@@ -1388,32 +1398,13 @@ def swing_prc_import(operator: Operator, context: Context, filepath: str):
             current_blender_bone.sub_swing_blender_bone_data.swing_bone_index = bone_index
             current_blender_bone = current_blender_bone.children[0]
 
-def get_collision_info(ssd, collision_name):
-    ssd: SUB_PG_sub_swing_data = ssd
-    # Needs to be in same order as the enum
-    collision_collections = [
-        ssd.spheres,
-        ssd.ovals,
-        ssd.ellipsoids,
-        ssd.capsules,
-        ssd.planes,
-    ]
-    for collection in collision_collections:
+def get_collision_name_to_info(ssd: SUB_PG_sub_swing_data) -> dict[str, tuple[str, int]]:
+    collision_name_to_info: dict[str, tuple[str, int]] = {}
+    for collision_type, collection in get_collision_collections(ssd):
         for collision_index, collision in enumerate(collection):
-            if collision.name == collision_name:
-                if isinstance(collision, SUB_PG_swing_sphere):
-                    return 'SPHERE', collision_index
-                elif isinstance(collision, SUB_PG_swing_oval):
-                    return 'OVAL', collision_index
-                elif isinstance(collision, SUB_PG_swing_ellipsoid):
-                    return 'ELLIPSOID', collision_index
-                elif isinstance(collision, SUB_PG_swing_capsule):
-                    return 'CAPSULE', collision_index
-                elif isinstance(collision, SUB_PG_swing_plane):
-                    return 'PLANE', collision_index
-                else:
-                    raise RuntimeError
-    return None, None
+            # Keep the first match if names are duplicated.
+            collision_name_to_info.setdefault(collision.name, (collision_type, collision_index))
+    return collision_name_to_info
 
 def is_uncracked_hash(s: str) -> bool:
     try:
@@ -1440,10 +1431,37 @@ def rename_uncracked_hashes(operator: Operator, context: Context):
     for swing_bone_chain in ssd.swing_bone_chains:
         if is_uncracked_hash(swing_bone_chain.name):
             swing_bone_chain.name = f'{swing_bone_chain.start_bone_name}_to_{swing_bone_chain.end_bone_name}'
-        for swing_bone in swing_bone_chain.swing_bones:
-            for collision in swing_bone.collisions:
-                if True:
-                    pass
+
+class SUB_OP_swing_rename_collisions(Operator):
+    bl_idname = 'sub.swing_rename_collisions'
+    bl_label = 'Rename Collisions'
+    bl_description = 'Replaces text in the names of all swing collisions at once'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    find: StringProperty(name='Find', description='Text to replace in the collision names')
+    replace: StringProperty(name='Replace', description='Replacement text')
+
+    @classmethod
+    def poll(cls, context):
+        if not context.object:
+            return False
+        return context.object.type == 'ARMATURE'
+
+    def invoke(self, context, _event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if self.find == '':
+            self.report({'ERROR'}, 'Enter the text to find in the collision names')
+            return {'CANCELLED'}
+
+        def get_new_name(name: str) -> str | None:
+            return name.replace(self.find, self.replace) if self.find in name else None
+
+        ssd: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
+        renamed_count = rename_collisions(ssd, get_new_name)
+        self.report({'INFO'}, f'Renamed {renamed_count} collisions')
+        return {'FINISHED'}
 
 def new_swing_collection(collection_name: str) -> Collection:
     collection = bpy.data.collections.new(collection_name)
@@ -1452,22 +1470,20 @@ def new_swing_collection(collection_name: str) -> Collection:
 
 def parent_swing_child_to_parent_obj_armature_deform(parent: bpy.types.Object, child: bpy.types.Object, type: str, index: int):
     child.parent = parent
-    linked_sphere_data: SUB_PG_sub_swing_data_linked_mesh = child.data.sub_swing_data_linked_mesh
+    linked_sphere_data: SUB_PG_sub_swing_data_linked_mesh = child.sub_swing_data_linked_mesh
     linked_sphere_data.collision_collection_type = type
     linked_sphere_data.is_swing_mesh = True
     linked_sphere_data.collision_collection_index = index
-    armature_modifier: bpy.types.ArmatureModifier = child.modifiers.new("Armature", "ARMATURE")
-    armature_modifier.object = parent
+    create_meshes.bind_shape_to_armature(child)
 
 def parent_swing_bone_collision(parent, child, chain_index, bone_index):
     child.parent = parent
-    linked_sphere_data: SUB_PG_sub_swing_data_linked_mesh = child.data.sub_swing_data_linked_mesh
+    linked_sphere_data: SUB_PG_sub_swing_data_linked_mesh = child.sub_swing_data_linked_mesh
     linked_sphere_data.is_swing_mesh = True
     linked_sphere_data.is_swing_bone_shape = True
     linked_sphere_data.swing_chain_index = chain_index
     linked_sphere_data.swing_bone_index = bone_index
-    armature_modifier: bpy.types.ArmatureModifier = child.modifiers.new("Armature", "ARMATURE")
-    armature_modifier.object = parent
+    create_meshes.bind_shape_to_armature(child)
 
 def create_swing_mesh_master_collection(parent_collection: Collection, arma_obj: Object):
     swing_master_collection: Collection = new_swing_collection(f'{arma_obj.name} Swing Objects')
@@ -1516,7 +1532,48 @@ def get_swing_mesh_master_collection(context: Context, arma_obj: Object) -> Coll
         # Just spawn the new collection in one of the several possible ones the armature is in.
         return create_swing_mesh_master_collection(arma_collections.pop(), arma_obj)
 
+def unlink_collection_from_scene(context: Context, collection: Collection) -> list[Collection]:
+    parent_collections = [c for c in [context.scene.collection] + list(context.scene.collection.children_recursive) if collection.name in c.children]
+    for parent_collection in parent_collections:
+        parent_collection.children.unlink(collection)
+    return parent_collections
+
+def walk_layer_collections(layer_collection: LayerCollection, path: tuple[str, ...]=()) -> Iterator[tuple[tuple[str, ...], LayerCollection]]:
+    # Collections can be linked in several places, so each layer collection is identified by its full path.
+    path = path + (layer_collection.collection.name,)
+    yield path, layer_collection
+    for child in layer_collection.children:
+        yield from walk_layer_collections(child, path)
+
+def get_layer_collection_states(context: Context, collection: Collection) -> dict[tuple[str, ...], tuple[bool, bool]]:
+    states: dict[tuple[str, ...], tuple[bool, bool]] = {}
+    for view_layer in context.scene.view_layers:
+        for path, layer_collection in walk_layer_collections(view_layer.layer_collection):
+            if collection.name in path:
+                states[(view_layer.name, *path)] = (layer_collection.exclude, layer_collection.hide_viewport)
+    return states
+
+def restore_layer_collection_states(context: Context, states: dict[tuple[str, ...], tuple[bool, bool]]):
+    for view_layer in context.scene.view_layers:
+        for path, layer_collection in walk_layer_collections(view_layer.layer_collection):
+            state = states.get((view_layer.name, *path))
+            if state is not None:
+                layer_collection.exclude, layer_collection.hide_viewport = state
+
 def setup_bone_meshes(operator: Operator, context: Context, master_collection: Collection):
+    # Linking objects and collections into the scene updates the view layers and relations each time.
+    # Build everything while the master collection is outside the scene, so this only happens once at the end.
+    # Unlinking removes the layer collections, so their exclude and hide settings are restored after linking again.
+    layer_collection_states = get_layer_collection_states(context, master_collection)
+    parent_collections = unlink_collection_from_scene(context, master_collection)
+    try:
+        create_bone_meshes(operator, context, master_collection)
+    finally:
+        for parent_collection in parent_collections:
+            parent_collection.children.link(master_collection)
+        restore_layer_collection_states(context, layer_collection_states)
+
+def create_bone_meshes(operator: Operator, context: Context, master_collection: Collection):
     ssd: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
     master_collection_props: SUB_PG_sub_swing_master_collection_props = master_collection.sub_swing_collection_props
 
@@ -1752,94 +1809,115 @@ pyprc.param.struct([
 '''
 def new_prc_list(list_name):
     return pyprc.param.struct([
-        (pyprc.hash(list_name),pyprc.param.list([]))
+        (get_prc_hash(list_name),pyprc.param.list([]))
     ])
 
 def new_prc_struct():
     return pyprc.param.struct([])
 
-def new_prc_hash(hash_name: str|int, hash_value: str|int):
-    regex = r"^0x[\da-f]{10}$"
-    matches = re.match(regex, hash_name)
-    if matches is not None:
-        hash_name = int(hash_name, base=16)
-    
-    matches = re.match(regex, hash_value)
-    if matches is not None:
-        hash_value = int(hash_value, base=16)
+@lru_cache(maxsize=None)
+def get_prc_hash_from_label(label: str|int):
+    # Uncracked hashes are stored as their hex string.
+    if isinstance(label, str) and re.match(r"^0x[\da-f]{10}$", label) is not None:
+        return pyprc.hash(int(label, base=16))
+    return pyprc.hash(label)
 
+def new_prc_hash(hash_name: str|int, hash_value: str|int):
     return pyprc.param.struct([
-        (pyprc.hash(hash_name), pyprc.param.hash(pyprc.hash(hash_value)))
+        (get_prc_hash_from_label(hash_name), pyprc.param.hash(get_prc_hash_from_label(hash_value)))
     ])
 
 def new_prc_float(float_name: str| int, float_value: float):
     return pyprc.param.struct([
-        (pyprc.hash(float_name), pyprc.param.float(float_value))
+        (get_prc_hash(float_name), pyprc.param.float(float_value))
     ])
 
 def new_prc_byte(byte_name: str|int, byte_value: int):
     return pyprc.param.struct([
-        (pyprc.hash(byte_name), pyprc.param.i8(byte_value))
+        (get_prc_hash(byte_name), pyprc.param.i8(byte_value))
     ])
 def new_prc_int(int_name: str|int, int_value: int):
     return pyprc.param.struct([
-        (pyprc.hash(int_name), pyprc.param.i32(int_value))
+        (get_prc_hash(int_name), pyprc.param.i32(int_value))
     ])
 def extend_struct(struct, new_thing):
     struct.set_struct(list(struct) + list(new_thing))
 
 class PrcStruct():
-    _prc_struct = None
+    """
+    Collects the entries and only builds the pyprc struct in get_param.
+    Extending a pyprc struct copies all of its entries, so building it one entry at a time was quadratic.
+    """
     def __init__(self, params: list = []):
-        self._prc_struct = pyprc.param.struct([])
+        # pyprc (hash, param) entries, and nested PrcStructs so lists can still be filled after being added.
+        self._entries = []
         for param in params:
             self += param
     def __iter__(self):
-        return self._prc_struct.__iter__()
+        return iter(self.get_entries())
     def __iadd__(self, other):
         self.extend_struct(other)
         return self
     def __repr__(self):
-        return self._prc_struct.__repr__()
+        return self.get_param().__repr__()
+    def get_entries(self) -> list:
+        entries = []
+        for entry in self._entries:
+            if isinstance(entry, PrcStruct):
+                entries.extend(entry.get_entries())
+            else:
+                entries.append(entry)
+        return entries
     def get_param(self):
-        return self._prc_struct
+        return pyprc.param.struct(self.get_entries())
     def extend_struct(self, new_prc_param):
-        self._prc_struct.set_struct(list(self._prc_struct) + list(new_prc_param))
+        if isinstance(new_prc_param, PrcStruct):
+            self._entries.append(new_prc_param)
+        else:
+            self._entries.extend(new_prc_param)
         return self
     def save(self, path):
-        self._prc_struct.save(path)
+        self.get_param().save(path)
 
 class PrcList(PrcStruct):
     def __init__(self, list_name: str):
-        self._prc_struct = pyprc.param.struct([
-            (pyprc.hash(list_name), pyprc.param.list([]))
-        ])
+        self._list_hash = get_prc_hash(list_name)
+        self._items = []
     def __iadd__(self, other):
         self.extend_list(other)
         return self
+    def get_entries(self) -> list:
+        return [(self._list_hash, self.get_prc_list())]
     def get_prc_list(self):
-        return list(self._prc_struct)[0][1]
+        return pyprc.param.list([item.get_param() for item in self._items])
     def get_prc_list_as_py_list(self):
         return list(self.get_prc_list())
     def extend_list(self, new_prc_param: PrcStruct):
-        self.get_prc_list().set_list(self.get_prc_list_as_py_list() + [new_prc_param.get_param()])
+        self._items.append(new_prc_param)
         return self
 
 class PrcHash40():
     _prc_param = None
     def __init__(self, hash_value):
-        regex = r"0x[\da-f]{10}"
-        matches = re.match(regex, hash_value)
-        if matches is not None:
-            hash_value = int(hash_value, base=16)
-
-        self._prc_param = pyprc.param.hash(pyprc.hash(hash_value))
+        self._prc_param = pyprc.param.hash(get_prc_hash_from_label(hash_value))
     def get_param(self):
         return self._prc_param
     def __repr__(self):
         return self._prc_param.__repr__()
 
+def get_collision_key_to_name(ssd: SUB_PG_sub_swing_data) -> dict[tuple[str, int], str]:
+    # Resolve every collision reference once, instead of searching the collision lists for each swing bone.
+    return {
+        (collision_type, collision_index): collision.name
+        for collision_type, collection in get_collision_collections(ssd)
+        for collision_index, collision in enumerate(collection)
+    }
+
 def swing_prc_export(operator: Operator, context: Context, filepath: str):
+    arma_data: bpy.types.Armature = context.object.data
+    get_swing_prc_root(arma_data).save(filepath)
+
+def get_swing_prc_root(arma_data: bpy.types.Armature) -> PrcStruct:
     # forward declaration for typechecking.
     swing_bone_chain: SUB_PG_swing_bone_chain
     swing_bone: SUB_PG_swing_bone 
@@ -1851,8 +1929,8 @@ def swing_prc_export(operator: Operator, context: Context, filepath: str):
     plane: SUB_PG_swing_plane
     connection: SUB_PG_swing_connection
 
-    arma_data: bpy.types.Armature = context.object.data
     ssd: SUB_PG_sub_swing_data = arma_data.sub_swing_data
+    collision_key_to_name = get_collision_key_to_name(ssd)
     prc_root = PrcStruct()
     # Add 'swingbones' list
     swing_bone_chains_list = PrcList('swingbones')
@@ -1922,17 +2000,8 @@ def swing_prc_export(operator: Operator, context: Context, filepath: str):
             ])
             swing_bone_collision: SUB_PG_swing_bone_collision
             for swing_bone_collision in swing_bone.collisions:
-                if swing_bone_collision.collision_type == 'SPHERE':
-                    c = ssd.spheres[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'OVAL':
-                    c = ssd.ovals[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'ELLIPSOID':
-                    c = ssd.ellipsoids[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'CAPSULE':
-                    c = ssd.capsules[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'PLANE':
-                    c = ssd.planes[swing_bone_collision.collision_index]
-                collision_list += PrcHash40(c.name)
+                collision_name = collision_key_to_name[(swing_bone_collision.collision_type, swing_bone_collision.collision_index)]
+                collision_list += PrcHash40(collision_name)
             if len(swing_bone.collisions) == 0:
                 collision_list += PrcHash40("")
             swing_bone_param_list += swing_bone_params_struct
@@ -2037,18 +2106,9 @@ def swing_prc_export(operator: Operator, context: Context, filepath: str):
                 #swing_bone_collision_list += PrcHash40(collision.target_collision_name)
             swing_bone_collision: SUB_PG_swing_bone_collision
             for swing_bone_collision in swing_bone.collisions:
-                if swing_bone_collision.collision_type == 'SPHERE':
-                    c = ssd.spheres[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'OVAL':
-                    c = ssd.ovals[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'ELLIPSOID':
-                    c = ssd.ellipsoids[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'CAPSULE':
-                    c = ssd.capsules[swing_bone_collision.collision_index]
-                elif swing_bone_collision.collision_type == 'PLANE':
-                    c = ssd.planes[swing_bone_collision.collision_index]
-                swing_bone_collision_list += PrcHash40(c.name)
+                collision_name = collision_key_to_name[(swing_bone_collision.collision_type, swing_bone_collision.collision_index)]
+                swing_bone_collision_list += PrcHash40(collision_name)
             prc_root += swing_bone_collision_list
 
-    prc_root.save(filepath)
+    return prc_root
 
@@ -0,0 +1,26 @@
+import os
+
+from pathlib import Path
+
+from ...dependencies import pyprc
+
+# The source signature of the labels loaded into pyprc.
+pyprc_labels_signature: tuple | None = None
+
+def get_labels_csv_path() -> Path:
+    return (Path(__file__).parent.parent.parent / 'dependencies' / 'pyprc' / 'ParamLabels.csv').resolve()
+
+def get_source_signature() -> tuple:
+    csv_stat = os.stat(get_labels_csv_path())
+    return (csv_stat.st_mtime_ns, csv_stat.st_size)
+
+def ensure_pyprc_labels_loaded():
+    """
+    Loads the labels used by pyprc for converting hashes to strings.
+    pyprc keeps the labels for the whole process, so they only need to be loaded again if the file changed.
+    """
+    global pyprc_labels_signature
+    source_signature = get_source_signature()
+    if pyprc_labels_signature != source_signature:
+        pyprc.hash.load_labels(str(get_labels_csv_path()))
+        pyprc_labels_signature = source_signature
@@ -0,0 +1,58 @@
+import bpy
+import traceback
+
+from typing import Callable
+
+# Seconds to wait after the first edit, so a slider drag is coalesced into a few rebuilds.
+REGENERATE_INTERVAL = 0.05
+
+# Keyed by the armature name and the property path of the shape, so each shape is only regenerated once per tick.
+dirty_shapes: dict[tuple[str, str], Callable] = {}
+
+def mark_shape_dirty(shape: bpy.types.PropertyGroup, regenerate: Callable):
+    """
+    Queues the shape's mesh to be regenerated by the timer instead of rebuilding it in the update callback.
+    """
+    if shape.blender_object is None:
+        return
+    dirty_shapes[(shape.id_data.name, shape.path_from_id())] = regenerate
+    # Timers don't run while a script blocks Blender in background mode, so regenerate right away.
+    if bpy.app.background:
+        flush_dirty_shapes()
+        return
+    if not bpy.app.timers.is_registered(regenerate_dirty_shapes):
+        bpy.app.timers.register(regenerate_dirty_shapes, first_interval=REGENERATE_INTERVAL)
+
+def flush_dirty_shapes():
+    """
+    Regenerates the queued shapes now instead of waiting for the timer.
+    Scripts can call this after editing shapes to read the updated meshes in the same call.
+    """
+    if bpy.app.timers.is_registered(regenerate_dirty_shapes):
+        bpy.app.timers.unregister(regenerate_dirty_shapes)
+    regenerate_dirty_shapes()
+
+def regenerate_dirty_shapes():
+    shapes = list(dirty_shapes.items())
+    dirty_shapes.clear()
+    for (armature_name, path), regenerate in shapes:
+        armature = bpy.data.armatures.get(armature_name)
+        if armature is None:
+            continue
+        # The shape may have been removed since it was marked.
+        try:
+            shape = armature.path_resolve(path)
+        except ValueError:
+            continue
+        # One invalid shape shouldn't stop the others from updating.
+        try:
+            regenerate(shape)
+        except Exception:
+            print(f'Failed to regenerate swing shape {armature_name}.{path}:\n{traceback.format_exc()}')
+    # Returning None stops the timer until the next edit.
+    return None
+
+def unregister():
+    if bpy.app.timers.is_registered(regenerate_dirty_shapes):
+        bpy.app.timers.unregister(regenerate_dirty_shapes)
+    dirty_shapes.clear()
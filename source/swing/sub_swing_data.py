@@ -6,22 +6,22 @@ from bpy.props import (
     IntProperty, StringProperty, EnumProperty, BoolProperty, FloatProperty, CollectionProperty, PointerProperty, FloatVectorProperty)
 # Core Library imports
 import re
+from typing import Callable
 from math import(
     radians,)
 # 3rd Party Imports
 # Local Project Imports
 from ..extras import create_meshes
+from .shape_updates import mark_shape_dirty
 
-def get_unique_name_for_entry_in_collection_property(entry, collection) -> str:
-    other_names: set[str] = {e.name for e in collection if e.as_pointer() != entry.as_pointer()}
-    
-    if entry.name not in other_names:
-        return entry.name
+def get_unique_name(name: str, other_names: set[str]) -> str:
+    if name not in other_names:
+        return name
     
     regex = r"(\w+)\.(\d{3})"
-    matches = re.match(regex, entry.name)
+    matches = re.match(regex, name)
     if matches is None:
-        base_name = entry.name
+        base_name = name
         number = 1
     else:
         base_name = matches.groups()[0]
@@ -33,6 +33,10 @@ def get_unique_name_for_entry_in_collection_property(entry, collection) -> str:
             return new_name
      
     raise ValueError("Over 1000 duplicate names, this can't be right...")
+
+def get_unique_name_for_entry_in_collection_property(entry, collection) -> str:
+    other_names: set[str] = {e.name for e in collection if e.as_pointer() != entry.as_pointer()}
+    return get_unique_name(entry.name, other_names)
     
 def is_entry_name_unique_in_collection_property(entry, collection) -> bool:
     other_names: set[str] = {e.name for e in collection if e.as_pointer() != entry.as_pointer()}
@@ -53,29 +57,57 @@ class SUB_PG_armature_swing_bone(PropertyGroup):
 class SUB_PG_armature_swing_bone_children(PropertyGroup):
     name: StringProperty('Armature Swing Bone Child Name')
 
+# Set while renaming collisions in bulk, which keeps the names unique itself.
+collision_name_checks_suspended = False
+
+def get_collision_collections(ssd: 'SUB_PG_sub_swing_data') -> list[tuple[str, 'bpy.types.bpy_prop_collection']]:
+    # Needs to be in same order as the enum
+    return [
+        ('SPHERE', ssd.spheres),
+        ('OVAL', ssd.ovals),
+        ('ELLIPSOID', ssd.ellipsoids),
+        ('CAPSULE', ssd.capsules),
+        ('PLANE', ssd.planes),
+    ]
+
 def collision_object_name_update(self, context):
-    ssd: SUB_PG_sub_swing_data = context.object.data.sub_swing_data
-    collision: SUB_PG_swing_bone_collision
+    if collision_name_checks_suspended:
+        return
+    ssd: SUB_PG_sub_swing_data = self.id_data.sub_swing_data
 
     # Need to make sure the name isn't used by other collision objects.
-    collision_collections = [
-        ssd.spheres,
-        ssd.ovals,
-        ssd.ellipsoids,
-        ssd.capsules,
-        ssd.planes,
-    ]
-    collision_names = [col.name for col_collection in collision_collections for col in col_collection if col.as_pointer() != self.as_pointer()]
-    if self.name in collision_names:
-        regex = r"(\w+\.)(\d+)"
-        matches = re.match(regex, self.name)
-        if matches is None:
-            self.name = self.name + '.001'
-        else:
-            base_name = matches.groups()[0]
-            number = int(matches.groups()[1])
-            self.name = f'{base_name}{number+1:003d}'
-         
+    other_names = {
+        col.name for _, col_collection in get_collision_collections(ssd) for col in col_collection
+        if col.as_pointer() != self.as_pointer()
+    }
+    if self.name in other_names:
+        self.name = get_unique_name(self.name, other_names)
+
+def rename_collisions(ssd: 'SUB_PG_sub_swing_data', get_new_name: Callable[[str], str | None]) -> int:
+    """
+    Renames every collision that get_new_name returns a name for in a single pass and returns the rename count.
+    Swing bones reference collisions by type and index, so renaming doesn't change any references.
+    """
+    global collision_name_checks_suspended
+    collisions = [col for _, col_collection in get_collision_collections(ssd) for col in col_collection]
+    new_names = [get_new_name(col.name) for col in collisions]
+    used_names = {col.name for col, new_name in zip(collisions, new_names) if new_name is None}
+
+    renamed_count = 0
+    collision_name_checks_suspended = True
+    try:
+        for col, new_name in zip(collisions, new_names):
+            if new_name is None:
+                continue
+            new_name = get_unique_name(new_name, used_names)
+            used_names.add(new_name)
+            if new_name != col.name:
+                col.name = new_name
+                renamed_count += 1
+    finally:
+        collision_name_checks_suspended = False
+    return renamed_count
+
 collision_types = (
     ('SPHERE', 'Sphere', 'Sphere'),
     ('OVAL', 'Oval', 'Oval'),
@@ -98,6 +130,9 @@ class SUB_PG_swing_bone_collision(PropertyGroup):
     )
 
 def swing_bone_update(self, context):
+    mark_shape_dirty(self, regenerate_swing_bone)
+
+def regenerate_swing_bone(self):
     if self.blender_object is None:
         return
     if self.name == "":
@@ -170,6 +205,9 @@ class SUB_PG_swing_bone_chain(PropertyGroup):
     #end_bone: PointerProperty(type=bpy.types.Bone)
 
 def swing_sphere_update(self, context):
+    mark_shape_dirty(self, regenerate_swing_sphere)
+
+def regenerate_swing_sphere(self):
     if self.blender_object is None:
         return
     if self.bone == "":
@@ -180,6 +218,9 @@ def swing_sphere_update(self, context):
     create_meshes.make_sphere_2(sphere_obj, self.radius, self.offset, arma.bones[self.bone])
 
 def swing_oval_update(self, context):
+    mark_shape_dirty(self, regenerate_swing_oval)
+
+def regenerate_swing_oval(self):
     if self.blender_object is None:
         return
     if self.start_bone_name is None:
@@ -200,6 +241,9 @@ def swing_oval_update(self, context):
         end_bone = arma_data.bones.get(self.end_bone_name),)
 
 def swing_ellipsoid_update(self, context):
+    mark_shape_dirty(self, regenerate_swing_ellipsoid)
+
+def regenerate_swing_ellipsoid(self):
     if self.blender_object is None:
         return
     if self.bone_name == "":
@@ -251,6 +295,9 @@ class SUB_PG_swing_ellipsoid(PropertyGroup):
     )
 
 def swing_capsule_update(self, context):
+    mark_shape_dirty(self, regenerate_swing_capsule)
+
+def regenerate_swing_capsule(self):
     if self.blender_object is None:
         return
     if self.start_bone_name == "":
@@ -279,6 +326,9 @@ class SUB_PG_swing_capsule(PropertyGroup):
 
 
 def swing_plane_update(self, context):
+    mark_shape_dirty(self, regenerate_swing_plane)
+
+def regenerate_swing_plane(self):
     if self.blender_object is None:
         return
     if self.bone_name == "":
@@ -303,6 +353,9 @@ class SUB_PG_swing_plane(PropertyGroup):
     )
 
 def swing_connection_update(self, context):
+    mark_shape_dirty(self, regenerate_swing_connection)
+
+def regenerate_swing_connection(self):
     if self.blender_object is None:
         return
     if self.start_bone_name == "":
@@ -326,6 +379,21 @@ class SUB_PG_swing_connection(PropertyGroup):
         name='Connection Object',
     )
 
+def swing_shape_segments_update(self, context):
+    create_meshes.update_unit_meshes()
+    # Shapes that can't be instanced have their own mesh, which is rebuilt with the new resolution.
+    for armature in bpy.data.armatures:
+        ssd: SUB_PG_sub_swing_data = armature.sub_swing_data
+        for swing_bone_chain in ssd.swing_bone_chains:
+            for swing_bone in swing_bone_chain.swing_bones:
+                mark_shape_dirty(swing_bone, regenerate_swing_bone)
+        for oval in ssd.ovals:
+            mark_shape_dirty(oval, regenerate_swing_oval)
+        for capsule in ssd.capsules:
+            mark_shape_dirty(capsule, regenerate_swing_capsule)
+        for connection in ssd.connections:
+            mark_shape_dirty(connection, regenerate_swing_connection)
+
 # Armature.sub_swing_data
 class SUB_PG_sub_swing_data(PropertyGroup):
     swing_bone_chains: CollectionProperty(type=SUB_PG_swing_bone_chain)
@@ -401,6 +469,13 @@ class SUB_PG_sub_swing_data_linked_mesh(PropertyGroup):
         default=0,
     )
 
+def get_swing_linked_mesh_data(obj: bpy.types.Object) -> SUB_PG_sub_swing_data_linked_mesh:
+    # Swing meshes can be shared between objects, so this is stored on the object.
+    # Files from older versions stored it on the mesh instead.
+    if obj.sub_swing_data_linked_mesh.is_swing_mesh:
+        return obj.sub_swing_data_linked_mesh
+    return obj.data.sub_swing_data_linked_mesh
+
 class SUB_PG_sub_swing_master_collection_props(PropertyGroup):
     linked_object: PointerProperty(
         name="The linked Armature",
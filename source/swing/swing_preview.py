@@ -0,0 +1,343 @@
+import bpy
+import numpy as np
+import time
+
+from bpy.types import Operator, Context, Object, Bone, Action
+from bpy.props import IntProperty, FloatProperty
+from mathutils import Quaternion, Vector
+from math import pi
+from typing import NamedTuple
+
+from .sub_swing_data import SUB_PG_sub_swing_data, SUB_PG_swing_bone_chain, SUB_PG_swing_bone, SUB_PG_swing_bone_collision
+from .swing_solver import SwingSegments, SwingCollisions, simulate, get_chain_rotations
+from ..extras.create_meshes import get_ellipsoid_matrix
+
+class PreviewChain(NamedTuple):
+    # The swing bones in order from the root, each one the parent of the next.
+    bones: list[Bone]
+    # The particle at the head of each bone, followed by the particle at the head of the last bone's child.
+    particles: list[int]
+
+class SwingPreviewSetup(NamedTuple):
+    chains: list[PreviewChain]
+    segments: SwingSegments
+    # The bone whose head is each particle.
+    particle_bone_names: list[str]
+    # The segment's swing bone data, used for finding its collisions.
+    segment_swing_bones: list[SUB_PG_swing_bone]
+
+def get_preview_chains(arma_obj: Object) -> list[tuple[PreviewChain, list[SUB_PG_swing_bone]]]:
+    ssd: SUB_PG_sub_swing_data = arma_obj.data.sub_swing_data
+    chains = []
+    particle_count = 0
+    swing_bone_chain: SUB_PG_swing_bone_chain
+    for swing_bone_chain in ssd.swing_bone_chains:
+        bones: list[Bone] = []
+        swing_bones: list[SUB_PG_swing_bone] = []
+        swing_bone: SUB_PG_swing_bone
+        for swing_bone in swing_bone_chain.swing_bones:
+            bone: Bone = arma_obj.data.bones.get(swing_bone.name)
+            # The chain is only simulated up to the first bone that doesn't continue it.
+            if bone is None or len(bone.children) != 1:
+                break
+            if len(bones) > 0 and bone.parent != bones[-1]:
+                break
+            bones.append(bone)
+            swing_bones.append(swing_bone)
+        if len(bones) == 0:
+            continue
+        particles = list(range(particle_count, particle_count + len(bones) + 1))
+        particle_count += len(particles)
+        chains.append((PreviewChain(bones, particles), swing_bones))
+    return chains
+
+def get_preview_setup(arma_obj: Object) -> SwingPreviewSetup:
+    chains: list[PreviewChain] = []
+    particle_bone_names: list[str] = []
+    segment_swing_bones: list[SUB_PG_swing_bone] = []
+    parent_particles, child_particles, depths = [], [], []
+    for chain, swing_bones in get_preview_chains(arma_obj):
+        chains.append(chain)
+        particle_bone_names.extend([bone.name for bone in chain.bones] + [chain.bones[-1].children[0].name])
+        for depth, swing_bone in enumerate(swing_bones):
+            parent_particles.append(chain.particles[depth])
+            child_particles.append(chain.particles[depth + 1])
+            depths.append(depth)
+            segment_swing_bones.append(swing_bone)
+
+    def get_values(attribute_name: str, dtype=np.float64) -> np.ndarray:
+        return np.array([getattr(swing_bone, attribute_name) for swing_bone in segment_swing_bones], dtype=dtype)
+
+    max_angles = [min(pi, max(abs(a) for a in (*swing_bone.angle_z, *swing_bone.angle_y))) for swing_bone in segment_swing_bones]
+    segments = SwingSegments(
+        np.array(parent_particles, dtype=np.int64),
+        np.array(child_particles, dtype=np.int64),
+        np.array(depths, dtype=np.int64),
+        get_values('air_resistance'),
+        get_values('friction_rate'),
+        get_values('goal_strength'),
+        get_values('inertial_mass'),
+        get_values('local_gravity') * get_values('fall_speed_scale'),
+        get_values('ground_hit', dtype=bool),
+        np.array(max_angles, dtype=np.float64),
+        np.array([swing_bone.collision_size[1] for swing_bone in segment_swing_bones], dtype=np.float64),
+    )
+    return SwingPreviewSetup(chains, segments, particle_bone_names, segment_swing_bones)
+
+def sample_pose_matrices(context: Context, arma_obj: Object, bone_names: set[str], frames: range) -> dict[str, np.ndarray]:
+    """
+    Returns the animated armature space matrix of each bone for every frame.
+    """
+    matrices = {name: np.zeros((len(frames), 4, 4)) for name in bone_names}
+    pose_bones = [(arma_obj.pose.bones[name], matrices[name]) for name in bone_names]
+    for frame_index, frame in enumerate(frames):
+        context.scene.frame_set(frame)
+        for pose_bone, bone_matrices in pose_bones:
+            bone_matrices[frame_index] = pose_bone.matrix
+    return matrices
+
+def transform_points(matrices: np.ndarray, point) -> np.ndarray:
+    return matrices[:, :3, :3] @ np.array(point, dtype=np.float64) + matrices[:, :3, 3]
+
+def get_shape_bone_names(shape, collision_type: str) -> list[str]:
+    if collision_type == 'SPHERE':
+        return [shape.bone]
+    if collision_type in ('OVAL', 'CAPSULE'):
+        return [shape.start_bone_name, shape.end_bone_name]
+    return [shape.bone_name]
+
+def get_preview_collisions(arma_obj: Object, setup: SwingPreviewSetup, pose_matrices: dict[str, np.ndarray], frame_count: int, ground_normal: Vector, ground_distance: float) -> SwingCollisions:
+    ssd: SUB_PG_sub_swing_data = arma_obj.data.sub_swing_data
+    segment_count = len(setup.segment_swing_bones)
+
+    # Only shapes whose bones exist are simulated, so map the collision indices to the simulated shapes.
+    def get_shapes(collision_type: str, shapes) -> dict[int, object]:
+        return {index: shape for index, shape in enumerate(shapes) if all(name in pose_matrices for name in get_shape_bone_names(shape, collision_type))}
+
+    spheres = get_shapes('SPHERE', ssd.spheres)
+    capsules = {('OVAL', index): shape for index, shape in get_shapes('OVAL', ssd.ovals).items()}
+    capsules.update({('CAPSULE', index): shape for index, shape in get_shapes('CAPSULE', ssd.capsules).items()})
+    ellipsoids = get_shapes('ELLIPSOID', ssd.ellipsoids)
+    planes = get_shapes('PLANE', ssd.planes)
+
+    def get_mask(collision_types: tuple[str, ...], keys: list, use_type_in_key: bool) -> np.ndarray:
+        key_to_column = {key: column for column, key in enumerate(keys)}
+        mask = np.zeros((segment_count, len(keys)), dtype=bool)
+        collision: SUB_PG_swing_bone_collision
+        for segment_index, swing_bone in enumerate(setup.segment_swing_bones):
+            for collision in swing_bone.collisions:
+                if collision.collision_type not in collision_types:
+                    continue
+                key = (collision.collision_type, collision.collision_index) if use_type_in_key else collision.collision_index
+                column = key_to_column.get(key)
+                if column is not None:
+                    mask[segment_index, column] = True
+        return mask
+
+    def stack(values: list[np.ndarray], shape: tuple[int, ...]) -> np.ndarray:
+        return np.stack(values, axis=1) if len(values) > 0 else np.zeros((frame_count, 0) + shape)
+
+    sphere_centers = stack([transform_points(pose_matrices[s.bone], s.offset) for s in spheres.values()], (3,))
+    sphere_radii = np.array([s.radius for s in spheres.values()], dtype=np.float64)
+
+    capsule_starts = stack([transform_points(pose_matrices[c.start_bone_name], c.start_offset) for c in capsules.values()], (3,))
+    capsule_ends = stack([transform_points(pose_matrices[c.end_bone_name], c.end_offset) for c in capsules.values()], (3,))
+    capsule_start_radii = np.array([c.radius if key[0] == 'OVAL' else c.start_radius for key, c in capsules.items()], dtype=np.float64)
+    capsule_end_radii = np.array([c.radius if key[0] == 'OVAL' else c.end_radius for key, c in capsules.items()], dtype=np.float64)
+
+    ellipsoid_matrices = stack([
+        pose_matrices[e.bone_name] @ np.array(get_ellipsoid_matrix(e.offset, e.rotation, e.scale)) for e in ellipsoids.values()
+    ], (4, 4))
+
+    plane_normals_list, plane_distances_list = [], []
+    for plane in planes.values():
+        matrices = pose_matrices[plane.bone_name]
+        local_normal = Vector([plane.nx, plane.ny, plane.nz]).normalized()
+        normals = matrices[:, :3, :3] @ np.array(local_normal)
+        points = transform_points(matrices, plane.distance * local_normal)
+        plane_normals_list.append(normals)
+        plane_distances_list.append((normals * points).sum(axis=-1))
+    plane_normals = stack(plane_normals_list, (3,))
+    plane_distances = np.stack(plane_distances_list, axis=1) if len(planes) > 0 else np.zeros((frame_count, 0))
+
+    return SwingCollisions(
+        sphere_centers, sphere_radii, get_mask(('SPHERE',), list(spheres.keys()), False),
+        capsule_starts, capsule_ends, capsule_start_radii, capsule_end_radii, get_mask(('OVAL', 'CAPSULE'), list(capsules.keys()), True),
+        ellipsoid_matrices, get_mask(('ELLIPSOID',), list(ellipsoids.keys()), False),
+        plane_normals, plane_distances, get_mask(('PLANE',), list(planes.keys()), False),
+        np.array(ground_normal, dtype=np.float64), ground_distance,
+    )
+
+def get_simulated_rotations(chain: PreviewChain, pose_matrices: dict[str, np.ndarray], goal_positions: np.ndarray, positions: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Rotates each bone of the chain so its child's head is at the simulated position, and returns the rotations for the pose bones.
+    """
+    frame_count = positions.shape[0]
+    root_parent: Bone = chain.bones[0].parent
+    if root_parent is not None:
+        root_parent_matrices = pose_matrices[root_parent.name]
+        root_parent_rest = np.array(root_parent.matrix_local)
+    else:
+        root_parent_matrices = np.tile(np.identity(4), (frame_count, 1, 1))
+        root_parent_rest = np.identity(4)
+
+    child_particles = chain.particles[1:len(chain.bones) + 1]
+    rotations = get_chain_rotations(
+        root_parent_matrices,
+        root_parent_rest,
+        np.array([bone.matrix_local for bone in chain.bones]),
+        np.stack([pose_matrices[bone.name] for bone in chain.bones]),
+        goal_positions[:, child_particles].swapaxes(0, 1),
+        positions[:, child_particles].swapaxes(0, 1),
+    )
+    return {bone.name: bone_rotations for bone, bone_rotations in zip(chain.bones, rotations)}
+
+def get_rotation_values(pose_bone: bpy.types.PoseBone, rotations: np.ndarray) -> tuple[str, np.ndarray]:
+    """
+    Converts the quaternions to the bone's rotation mode, so its existing rotation channels can be keyed.
+    """
+    if pose_bone.rotation_mode == 'QUATERNION':
+        return 'rotation_quaternion', rotations
+    if pose_bone.rotation_mode == 'AXIS_ANGLE':
+        values = np.zeros_like(rotations)
+        for index, rotation in enumerate(rotations):
+            axis, angle = Quaternion(rotation).to_axis_angle()
+            values[index] = (angle, *axis)
+        return 'rotation_axis_angle', values
+
+    values = np.zeros((len(rotations), 3))
+    previous_euler = None
+    for index, rotation in enumerate(rotations):
+        # Keep each euler close to the previous frame to avoid jumps of 360 degrees.
+        if previous_euler is None:
+            euler = Quaternion(rotation).to_euler(pose_bone.rotation_mode)
+        else:
+            euler = Quaternion(rotation).to_euler(pose_bone.rotation_mode, previous_euler)
+        values[index] = euler
+        previous_euler = euler
+    return 'rotation_euler', values
+
+def bake_rotations(arma_obj: Object, action: Action, bone_name_to_rotations: dict[str, np.ndarray], frames: range):
+    frame_values = np.array(frames, dtype=np.float64)
+    for bone_name, rotations in bone_name_to_rotations.items():
+        pose_bone = arma_obj.pose.bones[bone_name]
+        # The preview replaces the animated rotations of the swing bones in the bone's own rotation mode.
+        property_name, values = get_rotation_values(pose_bone, rotations)
+        data_path = pose_bone.path_from_id(property_name)
+        for fcurve in [fc for fc in action.fcurves if fc.data_path == data_path]:
+            action.fcurves.remove(fcurve)
+        for index in range(values.shape[1]):
+            fcurve = action.fcurves.new(data_path, index=index, action_group=bone_name)
+            fcurve.keyframe_points.add(count=len(frame_values))
+            fcurve.keyframe_points.foreach_set('co', np.column_stack((frame_values, values[:, index])).astype(np.float32).ravel())
+            fcurve.update()
+
+# Custom property on preview actions pointing to the action they were baked from.
+PREVIEW_SOURCE_ACTION_KEY = 'smush_blender_swing_preview_source'
+
+def get_source_action(action: Action) -> Action:
+    """
+    Returns the action that a preview was baked from, so baking again never simulates an earlier preview.
+    """
+    source_action = action.get(PREVIEW_SOURCE_ACTION_KEY)
+    return source_action if isinstance(source_action, Action) else action
+
+def bake_swing_preview(operator: Operator, context: Context, arma_obj: Object, gravity: float, ground_height: float, substeps: int):
+    start = time.perf_counter()
+    setup = get_preview_setup(arma_obj)
+    if len(setup.chains) == 0:
+        operator.report({'ERROR'}, 'No swing bone chains have bones in this armature.')
+        return {'CANCELLED'}
+
+    ssd: SUB_PG_sub_swing_data = arma_obj.data.sub_swing_data
+    bone_names = set(setup.particle_bone_names)
+    bone_names.update(chain.bones[0].parent.name for chain in setup.chains if chain.bones[0].parent is not None)
+    for collision_type, shapes in (('SPHERE', ssd.spheres), ('OVAL', ssd.ovals), ('ELLIPSOID', ssd.ellipsoids), ('CAPSULE', ssd.capsules), ('PLANE', ssd.planes)):
+        for shape in shapes:
+            bone_names.update(name for name in get_shape_bone_names(shape, collision_type) if name in arma_obj.pose.bones)
+
+    # Always sample the original animation, even if a previous preview is active.
+    active_action: Action = arma_obj.animation_data.action
+    source_action = get_source_action(active_action)
+
+    scene = context.scene
+    frames = range(scene.frame_start, scene.frame_end + 1)
+    current_frame = scene.frame_current
+    arma_obj.animation_data.action = source_action
+    try:
+        pose_matrices = sample_pose_matrices(context, arma_obj, bone_names, frames)
+    finally:
+        arma_obj.animation_data.action = active_action
+        scene.frame_set(current_frame)
+    goal_positions = np.stack([pose_matrices[name][:, :3, 3] for name in setup.particle_bone_names], axis=1)
+
+    # Gravity and the ground are in world space, but the solver works in armature space.
+    world_to_armature = arma_obj.matrix_world.inverted()
+    gravity_vector = world_to_armature.to_3x3() @ Vector([0.0, 0.0, -gravity])
+    ground_normal = (arma_obj.matrix_world.to_3x3().transposed() @ Vector([0.0, 0.0, 1.0])).normalized()
+    ground_distance = ground_normal.dot(world_to_armature @ Vector([0.0, 0.0, ground_height]))
+    collisions = get_preview_collisions(arma_obj, setup, pose_matrices, len(frames), ground_normal, ground_distance)
+
+    simulation_start = time.perf_counter()
+    frame_time = scene.render.fps_base / scene.render.fps
+    positions = simulate(setup.segments, goal_positions, collisions, np.array(gravity_vector), frame_time, substeps)
+    simulation_time = time.perf_counter() - simulation_start
+
+    bone_name_to_rotations: dict[str, np.ndarray] = {}
+    for chain in setup.chains:
+        bone_name_to_rotations.update(get_simulated_rotations(chain, pose_matrices, goal_positions, positions))
+
+    # Bake to a copy, so the original animation is kept.
+    preview_action: Action = source_action.copy()
+    preview_action[PREVIEW_SOURCE_ACTION_KEY] = source_action
+    bake_rotations(arma_obj, preview_action, bone_name_to_rotations, frames)
+    arma_obj.animation_data.action = preview_action
+
+    # Replace the previous preview of the same action, so baking again doesn't leave numbered copies.
+    preview_name = f'{source_action.name} Swing Preview'
+    previous_preview = bpy.data.actions.get(preview_name)
+    if previous_preview is not None and get_source_action(previous_preview) == source_action and previous_preview.users == 0:
+        bpy.data.actions.remove(previous_preview)
+    preview_action.name = preview_name
+
+    operator.report({'INFO'}, f'Baked {len(setup.segments.depths)} swing bones over {len(frames)} frames to {preview_action.name} in {time.perf_counter() - start:.2f} seconds ({simulation_time:.2f} seconds simulating).')
+    return {'FINISHED'}
+
+class SUB_OP_swing_bake_preview(Operator):
+    bl_idname = 'sub.swing_bake_preview'
+    bl_label = 'Bake Swing Preview'
+    bl_description = 'Simulates the swing bone chains over the active animation and bakes the result to a copy of the action'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    gravity: FloatProperty(
+        name='Gravity',
+        description='Gravity in world units per second squared',
+        default=9.8,
+        min=0.0,
+    )
+    ground_height: FloatProperty(
+        name='Ground Height',
+        description='Height of the ground used by swing bones with ground hit enabled',
+        default=0.0,
+        unit='LENGTH',
+    )
+    substeps: IntProperty(
+        name='Substeps',
+        description='Simulation steps per frame. More steps are more stable, but slower',
+        default=4,
+        min=1,
+        max=32,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        arma: bpy.types.Object = context.object
+        if not arma or arma.type != 'ARMATURE':
+            return False
+        if arma.animation_data is None or arma.animation_data.action is None:
+            return False
+        ssd: SUB_PG_sub_swing_data = arma.data.sub_swing_data
+        return len(ssd.swing_bone_chains) > 0
+
+    def execute(self, context):
+        return bake_swing_preview(self, context, context.object, self.gravity, self.ground_height, self.substeps)
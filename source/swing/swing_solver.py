@@ -0,0 +1,335 @@
+import numpy as np
+
+from typing import NamedTuple
+
+# The solver doesn't use bpy, so it can be run and benchmarked outside of Blender.
+
+class SwingSegments(NamedTuple):
+    """
+    The swing bones of every chain, where each segment goes from a bone's head to its child's head.
+    Particles that aren't the child of any segment are pinned to the animation.
+    Values are per segment, except for the particle indices.
+    """
+    parent_particles: np.ndarray
+    child_particles: np.ndarray
+    # The index of the segment in its chain, so segments of the same depth can be solved together.
+    depths: np.ndarray
+    air_resistance: np.ndarray
+    friction_rate: np.ndarray
+    goal_strength: np.ndarray
+    inertial_mass: np.ndarray
+    # local_gravity * fall_speed_scale
+    gravity_scale: np.ndarray
+    ground_hit: np.ndarray
+    # The largest angle in radians between the simulated and animated segment.
+    max_angle: np.ndarray
+    # The collision radius at the child particle.
+    radius: np.ndarray
+
+class SwingCollisions(NamedTuple):
+    """
+    The collision shapes in armature space for every frame, and the shapes each segment collides with.
+    Per frame arrays start with the frame axis, and masks have a row for each segment.
+    """
+    sphere_centers: np.ndarray
+    sphere_radii: np.ndarray
+    sphere_mask: np.ndarray
+    # Ovals are capsules with the same radius on both ends.
+    capsule_starts: np.ndarray
+    capsule_ends: np.ndarray
+    capsule_start_radii: np.ndarray
+    capsule_end_radii: np.ndarray
+    capsule_mask: np.ndarray
+    # Transforms a unit sphere to the ellipsoid.
+    ellipsoid_matrices: np.ndarray
+    ellipsoid_mask: np.ndarray
+    # Particles stay on the side of the plane that the normal points to.
+    plane_normals: np.ndarray
+    plane_distances: np.ndarray
+    plane_mask: np.ndarray
+    ground_normal: np.ndarray
+    ground_distance: float
+
+def empty_collisions(frame_count: int, segment_count: int, ground_normal=(0.0, 0.0, 1.0), ground_distance=0.0) -> SwingCollisions:
+    return SwingCollisions(
+        np.zeros((frame_count, 0, 3)), np.zeros(0), np.zeros((segment_count, 0), dtype=bool),
+        np.zeros((frame_count, 0, 3)), np.zeros((frame_count, 0, 3)), np.zeros(0), np.zeros(0), np.zeros((segment_count, 0), dtype=bool),
+        np.zeros((frame_count, 0, 4, 4)), np.zeros((segment_count, 0), dtype=bool),
+        np.zeros((frame_count, 0, 3)), np.zeros((frame_count, 0)), np.zeros((segment_count, 0), dtype=bool),
+        np.array(ground_normal, dtype=np.float64), ground_distance,
+    )
+
+class FrameShapes(NamedTuple):
+    sphere_centers: np.ndarray
+    capsule_starts: np.ndarray
+    capsule_ends: np.ndarray
+    ellipsoid_matrices: np.ndarray
+    ellipsoid_inverse_matrices: np.ndarray
+    plane_normals: np.ndarray
+    plane_distances: np.ndarray
+
+def lerp(a: np.ndarray, b: np.ndarray, t: float) -> np.ndarray:
+    return a + (b - a) * t
+
+def normalize(vectors: np.ndarray, fallback: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    lengths = np.linalg.norm(vectors, axis=-1)
+    valid = lengths > 1e-12
+    directions = np.where(valid[:, None], vectors / np.where(valid, lengths, 1.0)[:, None], fallback)
+    return directions, lengths
+
+def get_frame_shapes(collisions: SwingCollisions, frame: int, t: float) -> FrameShapes:
+    # Shapes are interpolated between frames like the goal positions, so fast shapes don't skip over particles.
+    ellipsoid_matrices = lerp(collisions.ellipsoid_matrices[frame - 1], collisions.ellipsoid_matrices[frame], t)
+    plane_normals = lerp(collisions.plane_normals[frame - 1], collisions.plane_normals[frame], t)
+    plane_normals /= np.maximum(np.linalg.norm(plane_normals, axis=-1, keepdims=True), 1e-12)
+    return FrameShapes(
+        lerp(collisions.sphere_centers[frame - 1], collisions.sphere_centers[frame], t),
+        lerp(collisions.capsule_starts[frame - 1], collisions.capsule_starts[frame], t),
+        lerp(collisions.capsule_ends[frame - 1], collisions.capsule_ends[frame], t),
+        ellipsoid_matrices,
+        np.linalg.inv(ellipsoid_matrices) if len(ellipsoid_matrices) > 0 else ellipsoid_matrices,
+        plane_normals,
+        lerp(collisions.plane_distances[frame - 1], collisions.plane_distances[frame], t),
+    )
+
+def get_round_shape_pushes(points: np.ndarray, radii: np.ndarray, closest: np.ndarray, shape_radii: np.ndarray, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # closest has the closest point on each shape's center for each particle, with shape (particles, shapes, 3).
+    offsets = points[:, None, :] - closest
+    distances = np.linalg.norm(offsets, axis=-1)
+    penetrations = shape_radii + radii[:, None] - distances
+    active = mask & (penetrations > 0.0)
+    # Particles exactly on a center are pushed along +Z, since any direction is valid.
+    directions = np.where((distances > 1e-12)[..., None], offsets / np.maximum(distances, 1e-12)[..., None], np.array([0.0, 0.0, 1.0]))
+    pushes = directions * np.where(active, penetrations, 0.0)[..., None]
+    return pushes.sum(axis=1), (directions * active[..., None]).sum(axis=1)
+
+def get_plane_pushes(points: np.ndarray, radii: np.ndarray, normals: np.ndarray, distances: np.ndarray, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    signed_distances = points @ normals.T - distances
+    penetrations = radii[:, None] - signed_distances
+    active = mask & (penetrations > 0.0)
+    pushes = np.where(active, penetrations, 0.0) @ normals
+    return pushes, active.astype(np.float64) @ normals
+
+def push_out_of_collisions(points: np.ndarray, segment_indices: np.ndarray, segments: SwingSegments, collisions: SwingCollisions, shapes: FrameShapes) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the pushed points and the sum of the contact normals, which is zero for particles without contacts.
+    Overlapping shapes add their pushes together, which is close enough for a preview.
+    """
+    radii = segments.radius[segment_indices]
+    pushes = np.zeros_like(points)
+    normals = np.zeros_like(points)
+
+    if len(collisions.sphere_radii) > 0:
+        closest = np.broadcast_to(shapes.sphere_centers[None, :, :], (len(points),) + shapes.sphere_centers.shape)
+        push, normal = get_round_shape_pushes(points, radii, closest, collisions.sphere_radii[None, :], collisions.sphere_mask[segment_indices])
+        pushes += push
+        normals += normal
+
+    if len(collisions.capsule_start_radii) > 0:
+        axes = shapes.capsule_ends - shapes.capsule_starts
+        axis_lengths_squared = np.maximum((axes * axes).sum(axis=-1), 1e-12)
+        t = np.clip(((points[:, None, :] - shapes.capsule_starts[None]) * axes[None]).sum(axis=-1) / axis_lengths_squared, 0.0, 1.0)
+        closest = shapes.capsule_starts[None] + t[..., None] * axes[None]
+        shape_radii = lerp(collisions.capsule_start_radii[None, :], collisions.capsule_end_radii[None, :], t)
+        push, normal = get_round_shape_pushes(points, radii, closest, shape_radii, collisions.capsule_mask[segment_indices])
+        pushes += push
+        normals += normal
+
+    if collisions.ellipsoid_mask.shape[1] > 0:
+        # Find the nearest point in the space of the unit sphere and use the ellipsoid's gradient as the normal.
+        local_points = np.einsum('eij,pj->pei', shapes.ellipsoid_inverse_matrices[:, :3, :3], points) + shapes.ellipsoid_inverse_matrices[None, :, :3, 3]
+        local_directions = local_points / np.maximum(np.linalg.norm(local_points, axis=-1, keepdims=True), 1e-12)
+        surface_points = np.einsum('eij,pej->pei', shapes.ellipsoid_matrices[:, :3, :3], local_directions) + shapes.ellipsoid_matrices[None, :, :3, 3]
+        gradients = np.einsum('eji,pej->pei', shapes.ellipsoid_inverse_matrices[:, :3, :3], local_points)
+        gradients /= np.maximum(np.linalg.norm(gradients, axis=-1, keepdims=True), 1e-12)
+        signed_distances = ((points[:, None, :] - surface_points) * gradients).sum(axis=-1)
+        penetrations = radii[:, None] - signed_distances
+        active = collisions.ellipsoid_mask[segment_indices] & (penetrations > 0.0)
+        pushes += (gradients * np.where(active, penetrations, 0.0)[..., None]).sum(axis=1)
+        normals += (gradients * active[..., None]).sum(axis=1)
+
+    if len(shapes.plane_distances) > 0:
+        push, normal = get_plane_pushes(points, radii, shapes.plane_normals, shapes.plane_distances, collisions.plane_mask[segment_indices])
+        pushes += push
+        normals += normal
+
+    ground_mask = segments.ground_hit[segment_indices][:, None]
+    push, normal = get_plane_pushes(points, radii, collisions.ground_normal[None, :], np.array([collisions.ground_distance]), ground_mask)
+    pushes += push
+    normals += normal
+
+    return points + pushes, normals
+
+def limit_angle(directions: np.ndarray, goal_directions: np.ndarray, max_angles: np.ndarray) -> np.ndarray:
+    cos_angles = np.clip((directions * goal_directions).sum(axis=-1), -1.0, 1.0)
+    exceeded = np.arccos(cos_angles) > max_angles
+    if not exceeded.any():
+        return directions
+    # Rotate towards the goal in the plane of both directions until the angle is the limit.
+    perpendiculars, _ = normalize(directions - goal_directions * cos_angles[:, None], goal_directions)
+    limited = goal_directions * np.cos(max_angles)[:, None] + perpendiculars * np.sin(max_angles)[:, None]
+    return np.where(exceeded[:, None], limited, directions)
+
+def simulate(segments: SwingSegments, goal_positions: np.ndarray, collisions: SwingCollisions, gravity: np.ndarray, frame_time: float, substeps: int = 4) -> np.ndarray:
+    """
+    Simulates the swing chains with position based dynamics and returns the particle positions for every frame.
+    goal_positions are the animated particle positions in armature space with shape (frames, particles, 3).
+    The results only depend on the inputs, so the same inputs always give the same positions.
+    """
+    frame_count, particle_count, _ = goal_positions.shape
+    goal_positions = np.asarray(goal_positions, dtype=np.float64)
+    gravity = np.asarray(gravity, dtype=np.float64)
+
+    positions = np.empty_like(goal_positions)
+    x = goal_positions[0].copy()
+    previous_x = x.copy()
+    positions[0] = x
+
+    children = segments.child_particles
+    parents = segments.parent_particles
+    pinned = np.ones(particle_count, dtype=bool)
+    pinned[children] = False
+    # Parents are always solved before their children.
+    levels = [np.flatnonzero(segments.depths == depth) for depth in range(int(segments.depths.max(initial=-1)) + 1)]
+
+    dt = frame_time / substeps
+    damping = 1.0 / (1.0 + np.maximum(segments.air_resistance, 0.0) * dt)
+    goal_pull = np.clip(segments.goal_strength * dt / np.maximum(segments.inertial_mass, 1e-6), 0.0, 1.0)
+    friction = np.clip(segments.friction_rate, 0.0, 1.0)
+    acceleration = gravity[None, :] * segments.gravity_scale[:, None] * dt * dt
+
+    for frame in range(1, frame_count):
+        for substep in range(1, substeps + 1):
+            t = substep / substeps
+            goal = lerp(goal_positions[frame - 1], goal_positions[frame], t)
+            shapes = get_frame_shapes(collisions, frame, t)
+
+            # Verlet integration of the free particles.
+            velocities = (x[children] - previous_x[children]) * damping[:, None]
+            previous_x[children] = x[children]
+            x[children] += velocities + acceleration
+            x[children] += (goal[children] - x[children]) * goal_pull[:, None]
+            x[pinned] = goal[pinned]
+            previous_x[pinned] = goal[pinned]
+
+            for level in levels:
+                level_parents = parents[level]
+                level_children = children[level]
+                goal_directions, rest_lengths = normalize(goal[level_children] - goal[level_parents], np.array([0.0, 0.0, 1.0]))
+
+                directions, _ = normalize(x[level_children] - x[level_parents], goal_directions)
+                directions = limit_angle(directions, goal_directions, segments.max_angle[level])
+                points = x[level_parents] + directions * rest_lengths[:, None]
+
+                points, normals = push_out_of_collisions(points, level, segments, collisions, shapes)
+                # Pushing out of shapes can stretch the segment, so restore the length.
+                directions, _ = normalize(points - x[level_parents], goal_directions)
+                x[level_children] = x[level_parents] + directions * rest_lengths[:, None]
+
+                # Friction removes part of the velocity along the contact surface.
+                contact_normals, contact_lengths = normalize(normals, np.zeros(3))
+                in_contact = contact_lengths > 0.0
+                if in_contact.any():
+                    displacements = x[level_children] - previous_x[level_children]
+                    tangents = displacements - contact_normals * (displacements * contact_normals).sum(axis=-1, keepdims=True)
+                    previous_x[level_children] += tangents * (friction[level] * in_contact)[:, None]
+
+        positions[frame] = x
+
+    return positions
+
+def transform_points(matrices: np.ndarray, points: np.ndarray) -> np.ndarray:
+    return np.einsum('...ij,...j->...i', matrices[..., :3, :3], points) + matrices[..., :3, 3]
+
+def get_rotation_differences(vectors: np.ndarray, other_vectors: np.ndarray) -> np.ndarray:
+    """
+    Returns the 4x4 matrices of the shortest rotations from vectors to other_vectors like mathutils rotation_difference.
+    """
+    directions, _ = normalize(vectors, np.array([0.0, 0.0, 1.0]))
+    other_directions, _ = normalize(other_vectors, np.array([0.0, 0.0, 1.0]))
+    # The half way quaternion (1 + dot, cross) is normalized to the rotation between the directions.
+    quaternions = np.concatenate(((directions * other_directions).sum(axis=-1, keepdims=True) + 1.0, np.cross(directions, other_directions)), axis=-1)
+    # Opposite directions rotate half a turn around any perpendicular axis.
+    opposite = quaternions[:, 0] < 1e-6
+    if opposite.any():
+        axes = np.cross(directions[opposite], np.array([1.0, 0.0, 0.0]))
+        axes = np.where((np.abs(directions[opposite, 0]) > 0.9)[:, None], np.cross(directions[opposite], np.array([0.0, 1.0, 0.0])), axes)
+        quaternions[opposite] = np.concatenate((np.zeros((len(axes), 1)), axes), axis=-1)
+    quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+    w, x, y, z = quaternions.T
+    matrices = np.zeros((len(quaternions), 4, 4))
+    matrices[:, 0] = np.stack((1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y), np.zeros_like(w)), axis=-1)
+    matrices[:, 1] = np.stack((2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x), np.zeros_like(w)), axis=-1)
+    matrices[:, 2] = np.stack((2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y), np.zeros_like(w)), axis=-1)
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+def get_quaternions(matrices: np.ndarray) -> np.ndarray:
+    """
+    Returns the (w, x, y, z) rotations of the 4x4 matrices like mathutils to_quaternion, which ignores their scale.
+    """
+    m = matrices[:, :3, :3] / np.maximum(np.linalg.norm(matrices[:, :3, :3], axis=1, keepdims=True), 1e-12)
+    m = np.where((np.linalg.det(m) < 0.0)[:, None, None], -m, m)
+    m00, m01, m02 = m[:, 0, 0], m[:, 0, 1], m[:, 0, 2]
+    m10, m11, m12 = m[:, 1, 0], m[:, 1, 1], m[:, 1, 2]
+    m20, m21, m22 = m[:, 2, 0], m[:, 2, 1], m[:, 2, 2]
+
+    # Compute the largest component first and the others from it, which avoids dividing by small values.
+    # Each case is (the case's mask, 4 * largest^2, the index of the largest, the other components from w to z, flip for a positive w).
+    use_x = (m22 < 0.0) & (m00 > m11)
+    use_y = (m22 < 0.0) & ~use_x
+    use_z = (m22 >= 0.0) & (m00 < -m11)
+    use_w = (m22 >= 0.0) & ~use_z
+    cases = [
+        (use_x, 1.0 + m00 - m11 - m22, 1, (m21 - m12, m10 + m01, m02 + m20), m21 < m12),
+        (use_y, 1.0 - m00 + m11 - m22, 2, (m02 - m20, m10 + m01, m21 + m12), m02 < m20),
+        (use_z, 1.0 - m00 - m11 + m22, 3, (m10 - m01, m02 + m20, m21 + m12), m10 < m01),
+        (use_w, 1.0 + m00 + m11 + m22, 0, (m21 - m12, m02 - m20, m10 - m01), np.zeros(len(m), dtype=bool)),
+    ]
+    quaternions = np.zeros((len(m), 4))
+    for mask, trace, largest_index, others, flip in cases:
+        s = 2.0 * np.sqrt(np.maximum(trace[mask], 1e-12))
+        s = np.where(flip[mask], -s, s)
+        other_indices = [index for index in range(4) if index != largest_index]
+        quaternions[mask, largest_index] = 0.25 * s
+        quaternions[np.ix_(mask, other_indices)] = np.stack([other[mask] for other in others], axis=-1) / s[:, None]
+    quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+    # Avoid flipping between equivalent quaternions, which would interpolate the long way around.
+    flips = np.ones(len(quaternions))
+    flips[1:] = np.where((quaternions[1:] * quaternions[:-1]).sum(axis=-1) < 0.0, -1.0, 1.0)
+    return quaternions * np.cumprod(flips)[:, None]
+
+def get_chain_rotations(root_parent_matrices: np.ndarray, root_parent_rest: np.ndarray, rest_matrices: np.ndarray,
+                        animated_matrices: np.ndarray, goal_positions: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Rotates each bone of a chain so its child's head is at the simulated position, and returns the pose bone quaternions with shape (bones, frames, 4).
+    Matrices are in armature space with the frame axis first, and animated_matrices, goal_positions and positions have a row for each bone.
+    Every frame is computed at once, so only the bones of the chain are looped over.
+    """
+    parent_matrices = root_parent_matrices
+    inverse_parent_matrices = np.linalg.inv(root_parent_matrices)
+    inverse_animated_parents = inverse_parent_matrices
+    parent_rest = root_parent_rest
+    rotations = np.zeros(animated_matrices.shape[:2] + (4,))
+    for depth, (rest_matrix, animated) in enumerate(zip(rest_matrices, animated_matrices)):
+        # Keep the animated transform relative to the parent, then aim the bone at the simulated child.
+        inverse_animated = np.linalg.inv(animated)
+        matrices = parent_matrices @ inverse_animated_parents @ animated
+        inverse_matrices = np.linalg.inv(matrices)
+        goal_directions = transform_points(inverse_animated, goal_positions[depth])
+        simulated_directions = transform_points(inverse_matrices, positions[depth])
+        differences = get_rotation_differences(goal_directions, simulated_directions)
+        matrices = matrices @ differences
+        # The differences are rotations, so their inverse is the transpose.
+        inverse_matrices = differences.swapaxes(1, 2) @ inverse_matrices
+
+        bases = np.linalg.inv(rest_matrix) @ parent_rest @ inverse_parent_matrices @ matrices
+        rotations[depth] = get_quaternions(bases)
+
+        parent_matrices = matrices
+        inverse_parent_matrices = inverse_matrices
+        inverse_animated_parents = inverse_animated
+        parent_rest = rest_matrix
+    return rotations
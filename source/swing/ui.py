@@ -36,6 +36,12 @@ class SUB_PT_swing_io(Panel):
         row.operator('sub.swing_import', icon='IMPORT')  
         row = layout.row(align=True)
         row.operator('sub.swing_export', icon='EXPORT')
+        row = layout.row(align=True)
+        row.operator('sub.swing_bake_preview', icon='PHYSICS')
+        row = layout.row(align=True)
+        row.operator('sub.swing_rename_collisions', icon='SORTALPHA')
+        row = layout.row(align=True)
+        row.prop(ssp, 'swing_shape_segments')
 
 class SUB_PT_active_bone_swing_info(Panel):
     bl_label = 'Ultimate Swing Data'
@@ -114,8 +120,7 @@ class SUB_PT_active_mesh_swing_info(Panel):
     def draw(self, context):
         layout = self.layout
         mesh_obj: bpy.types.Object = bpy.context.active_object
-        mesh_data: bpy.types.Mesh = mesh_obj.data
-        sub_swing_data_linked_mesh: SUB_PG_sub_swing_data_linked_mesh = mesh_data.sub_swing_data_linked_mesh
+        sub_swing_data_linked_mesh: SUB_PG_sub_swing_data_linked_mesh = get_swing_linked_mesh_data(mesh_obj)
 
         if not sub_swing_data_linked_mesh.is_swing_mesh:
             layout.row().label(text="This is not a swing collision mesh.")
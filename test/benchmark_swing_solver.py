@@ -0,0 +1,155 @@
+"""
+Runs the swing preview solver twice on generated swing chains and checks that both runs give the same positions.
+Converting the simulated positions to bone rotations is timed separately, since the preview bakes both.
+The solver doesn't use bpy, so this runs with a regular python that has numpy installed. Example:
+python test/benchmark_swing_solver.py --chains 20 --bones 8 --frames 120
+"""
+
+import argparse
+import importlib.util
+import math
+import sys
+import time
+
+from pathlib import Path
+
+import numpy as np
+
+SOLVER_PATH = Path(__file__).resolve().parent.parent / 'source' / 'swing' / 'swing_solver.py'
+
+def import_swing_solver():
+    # Importing through the addon package would import bpy, so load the module from its file.
+    spec = importlib.util.spec_from_file_location('swing_solver', SOLVER_PATH)
+    swing_solver = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(swing_solver)
+    return swing_solver
+
+def make_segments(swing_solver, chain_count: int, bone_count: int):
+    parent_particles, child_particles, depths = [], [], []
+    for chain_index in range(chain_count):
+        first_particle = chain_index * (bone_count + 1)
+        for depth in range(bone_count):
+            parent_particles.append(first_particle + depth)
+            child_particles.append(first_particle + depth + 1)
+            depths.append(depth)
+
+    segment_count = len(depths)
+    rng = np.random.default_rng(0)
+    def get_values(low: float, high: float) -> np.ndarray:
+        return rng.uniform(low, high, segment_count)
+
+    segments = swing_solver.SwingSegments(
+        np.array(parent_particles, dtype=np.int64),
+        np.array(child_particles, dtype=np.int64),
+        np.array(depths, dtype=np.int64),
+        get_values(0.0, 5.0),
+        get_values(0.0, 1.0),
+        get_values(0.0, 20.0),
+        get_values(0.5, 2.0),
+        get_values(0.5, 1.5),
+        rng.random(segment_count) < 0.5,
+        get_values(math.pi / 8, math.pi / 2),
+        get_values(0.0, 0.2),
+    )
+    return segments
+
+def make_goal_positions(chain_count: int, bone_count: int, frame_count: int) -> np.ndarray:
+    # Chains hang from a circle that sways and bobs, so the free particles lag behind their goals.
+    times = np.arange(frame_count) / 60.0
+    goal_positions = np.zeros((frame_count, chain_count * (bone_count + 1), 3))
+    for chain_index in range(chain_count):
+        angle = 2.0 * math.pi * chain_index / chain_count
+        root = np.stack((
+            np.full(frame_count, math.cos(angle)) + 0.5 * np.sin(times * 3.0),
+            np.full(frame_count, math.sin(angle)),
+            2.0 + 0.25 * np.sin(times * 5.0),
+        ), axis=1)
+        for depth in range(bone_count + 1):
+            goal_positions[:, chain_index * (bone_count + 1) + depth] = root - np.array([0.0, 0.0, 0.2 * depth])
+    return goal_positions
+
+def make_collisions(swing_solver, segment_count: int, frame_count: int):
+    rng = np.random.default_rng(1)
+    def get_mask(shape_count: int) -> np.ndarray:
+        return rng.random((segment_count, shape_count)) < 0.5
+
+    sphere_count, capsule_count, ellipsoid_count, plane_count = 4, 4, 2, 1
+    times = np.arange(frame_count)[:, None, None] / 60.0
+    ellipsoid_matrices = np.tile(np.diag([0.3, 0.2, 0.4, 1.0]), (frame_count, ellipsoid_count, 1, 1))
+    ellipsoid_matrices[:, :, :3, 3] = rng.uniform(-1.0, 1.0, (ellipsoid_count, 3)) + np.array([0.0, 0.0, 1.5])
+    return swing_solver.SwingCollisions(
+        rng.uniform(-1.0, 1.0, (1, sphere_count, 3)) + np.array([0.0, 0.0, 1.5]) + 0.1 * np.sin(times * 4.0),
+        rng.uniform(0.1, 0.3, sphere_count),
+        get_mask(sphere_count),
+        np.tile(rng.uniform(-1.0, 1.0, (1, capsule_count, 3)) + np.array([0.0, 0.0, 1.0]), (frame_count, 1, 1)),
+        np.tile(rng.uniform(-1.0, 1.0, (1, capsule_count, 3)) + np.array([0.0, 0.0, 2.0]), (frame_count, 1, 1)),
+        rng.uniform(0.05, 0.2, capsule_count),
+        rng.uniform(0.05, 0.2, capsule_count),
+        get_mask(capsule_count),
+        ellipsoid_matrices,
+        get_mask(ellipsoid_count),
+        np.tile(np.array([0.0, 1.0, 0.0]), (frame_count, plane_count, 1)),
+        np.full((frame_count, plane_count), -1.5),
+        get_mask(plane_count),
+        np.array([0.0, 0.0, 1.0]),
+        0.5,
+    )
+
+def get_chain_rotations(swing_solver, chain_count: int, bone_count: int, goal_positions: np.ndarray, positions: np.ndarray) -> list[np.ndarray]:
+    # Bones point along their Y axis, so rotate Y to -Z for the hanging chains.
+    bone_rotation = np.array([[1.0, 0.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, -1.0, 0.0, 0.0], [0.0, 0.0, 0.0, 1.0]])
+    frame_count = goal_positions.shape[0]
+    rotations = []
+    for chain_index in range(chain_count):
+        first_particle = chain_index * (bone_count + 1)
+        head_positions = goal_positions[:, first_particle:first_particle + bone_count]
+        animated_matrices = np.tile(bone_rotation, (bone_count, frame_count, 1, 1))
+        animated_matrices[..., :3, 3] = head_positions.swapaxes(0, 1)
+        rest_matrices = animated_matrices[:, 0]
+        child_particles = slice(first_particle + 1, first_particle + bone_count + 1)
+        rotations.append(swing_solver.get_chain_rotations(
+            np.tile(np.identity(4), (frame_count, 1, 1)), np.identity(4), rest_matrices, animated_matrices,
+            goal_positions[:, child_particles].swapaxes(0, 1), positions[:, child_particles].swapaxes(0, 1)))
+    return rotations
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmark_swing_solver.py')
+    parser.add_argument('--chains', type=int, default=20, help='Number of swing chains')
+    parser.add_argument('--bones', type=int, default=8, help='Number of swing bones in each chain')
+    parser.add_argument('--frames', type=int, default=120, help='Number of frames to simulate')
+    parser.add_argument('--substeps', type=int, default=4, help='Simulation steps per frame')
+    args = parser.parse_args()
+
+    swing_solver = import_swing_solver()
+    segments = make_segments(swing_solver, args.chains, args.bones)
+    goal_positions = make_goal_positions(args.chains, args.bones, args.frames)
+    collisions = make_collisions(swing_solver, len(segments.depths), args.frames)
+    gravity = np.array([0.0, 0.0, -9.8])
+
+    results = []
+    for run in range(2):
+        start = time.perf_counter()
+        positions = swing_solver.simulate(segments, goal_positions, collisions, gravity, 1.0 / 60.0, args.substeps)
+        simulation_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rotations = get_chain_rotations(swing_solver, args.chains, args.bones, goal_positions, positions)
+        rotation_time = time.perf_counter() - start
+        print(f'Run {run + 1}: simulated {len(segments.depths)} swing bones over {args.frames} frames with {args.substeps} substeps in {simulation_time:.3f} seconds '
+              f'and computed their rotations in {rotation_time:.3f} seconds')
+        results.append(positions)
+
+        if not all(np.all(np.isfinite(chain_rotations)) for chain_rotations in rotations):
+            print('The rotations contain NaN or infinite values')
+            sys.exit(1)
+
+    if not np.all(np.isfinite(results[0])):
+        print('The simulated positions contain NaN or infinite values')
+        sys.exit(1)
+    if not np.array_equal(results[0], results[1]):
+        difference = np.nanmax(np.abs(results[0] - results[1]))
+        print(f'The two runs gave different positions, the largest difference is {difference}')
+        sys.exit(1)
+    print('Both runs gave identical positions')
+
+if __name__ == '__main__':
+    main()
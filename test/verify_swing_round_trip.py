@@ -0,0 +1,226 @@
+"""
+Re-exports every swing.prc in a folder of fighters and compares the result with the original file.
+Run it with blender in background mode, the arguments after "--" are for this script. Example:
+blender -b -P test/verify_swing_round_trip.py -- "C:/ArcCross/root/fighter" --jobs 8
+
+Each swing.prc is imported with swing_prc_import onto an armature made from the nearest
+model/body/c00/model.nusktb above it, exported again with the same code as swing_prc_export,
+and the two param trees are compared in memory.
+Files are split between worker blender processes, so a full roster can be checked at once.
+"""
+
+import argparse
+import importlib
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+from pathlib import Path
+from typing import NamedTuple
+
+import bpy
+
+ADDON_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SKELETON_PATH = 'model/body/c00/model.nusktb'
+
+class SwingFile(NamedTuple):
+    prc_path: str
+    nusktb_path: str
+
+class ReportCollector:
+    # Stands in for the operator that the import functions report to.
+    def __init__(self):
+        self.messages: list[str] = []
+
+    def report(self, report_type: set[str], message: str):
+        self.messages.append(f'{next(iter(report_type))}: {message}')
+
+def import_addon_module(name: str):
+    if str(ADDON_DIR.parent) not in sys.path:
+        sys.path.append(str(ADDON_DIR.parent))
+    addon = importlib.import_module(ADDON_DIR.name)
+    # The addon isn't loaded with --factory-startup, so register it from this folder.
+    if not hasattr(bpy.types.Armature, 'sub_swing_data'):
+        addon.register()
+    return importlib.import_module(f'{ADDON_DIR.name}.{name}')
+
+def find_swing_files(fighter_folder: Path, skeleton_path: str) -> tuple[list[SwingFile], list[str]]:
+    swing_files: list[SwingFile] = []
+    missing_skeletons: list[str] = []
+    for prc_path in sorted(fighter_folder.rglob('swing.prc')):
+        # The skeleton is in the fighter folder, which may be several folders above the swing.prc.
+        nusktb_path = next(
+            (parent / skeleton_path for parent in prc_path.parents if (parent / skeleton_path).is_file()),
+            None,
+        )
+        if nusktb_path is None:
+            missing_skeletons.append(str(prc_path))
+        else:
+            swing_files.append(SwingFile(str(prc_path), str(nusktb_path)))
+    return swing_files, missing_skeletons
+
+def get_children(param) -> list | None:
+    # Structs iterate as (hash, param) pairs and lists iterate as params. Values aren't iterable.
+    try:
+        return list(param)
+    except TypeError:
+        return None
+
+def are_values_equal(expected, actual) -> bool:
+    # Angles are converted to radians on import, so floats only match approximately.
+    if isinstance(expected, float) and isinstance(actual, float):
+        return math.isclose(expected, actual, rel_tol=1e-4, abs_tol=1e-5)
+    return expected == actual
+
+def diff_params(expected, actual, path: str, mismatches: list[str], max_mismatches: int):
+    if len(mismatches) >= max_mismatches:
+        return
+
+    expected_children = get_children(expected)
+    actual_children = get_children(actual)
+    if expected_children is None or actual_children is None:
+        if expected_children is not None:
+            mismatches.append(f'{path}: expected a struct or list, got the value {actual.value}')
+        elif actual_children is not None:
+            mismatches.append(f'{path}: expected the value {expected.value}, got a struct or list')
+        elif not are_values_equal(expected.value, actual.value):
+            mismatches.append(f'{path}: expected {expected.value}, got {actual.value}')
+        return
+
+    if any(isinstance(child, tuple) for child in expected_children + actual_children):
+        expected_entries = dict(expected_children)
+        actual_entries = dict(actual_children)
+        for key, expected_value in expected_entries.items():
+            if key not in actual_entries:
+                mismatches.append(f'{path}.{key}: missing from the export')
+            else:
+                diff_params(expected_value, actual_entries[key], f'{path}.{key}', mismatches, max_mismatches)
+        for key in actual_entries.keys() - expected_entries.keys():
+            mismatches.append(f'{path}.{key}: not in the original file')
+    else:
+        if len(expected_children) != len(actual_children):
+            mismatches.append(f'{path}: expected {len(expected_children)} entries, got {len(actual_children)}')
+        for index, (expected_child, actual_child) in enumerate(zip(expected_children, actual_children)):
+            diff_params(expected_child, actual_child, f'{path}[{index}]', mismatches, max_mismatches)
+
+def clear_data():
+    for data in (bpy.data.objects, bpy.data.armatures, bpy.data.meshes, bpy.data.collections):
+        for item in list(data):
+            data.remove(item)
+
+def verify_swing_file(swing_file: SwingFile, max_mismatches: int) -> dict:
+    pyprc = import_addon_module('dependencies.pyprc')
+    ssbh_data_py = import_addon_module('dependencies.ssbh_data_py')
+    import_model = import_addon_module('source.model.import_model')
+    swing_operators = import_addon_module('source.swing.operators')
+
+    result = {'prc_path': swing_file.prc_path, 'mismatches': [], 'messages': [], 'error': None, 'timings': {}}
+    collector = ReportCollector()
+    try:
+        clear_data()
+        start = time.perf_counter()
+        ssbh_skel = ssbh_data_py.skel_data.read_skel(swing_file.nusktb_path)
+        arma_obj = import_model.create_armature(collector, ssbh_skel, bpy.context)
+        after_skeleton = time.perf_counter()
+        swing_operators.swing_prc_import(collector, bpy.context, swing_file.prc_path)
+        after_import = time.perf_counter()
+        exported = swing_operators.get_swing_prc_root(arma_obj.data).get_param()
+        after_export = time.perf_counter()
+        diff_params(pyprc.param(swing_file.prc_path), exported, 'swing.prc', result['mismatches'], max_mismatches)
+        after_diff = time.perf_counter()
+        result['timings'] = {
+            'skeleton': after_skeleton - start,
+            'import': after_import - after_skeleton,
+            'export': after_export - after_import,
+            'diff': after_diff - after_export,
+        }
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['messages'] = collector.messages
+    return result
+
+def run_worker(jobs_path: Path, output_path: Path, max_mismatches: int):
+    swing_files = [SwingFile(**job) for job in json.loads(jobs_path.read_text())]
+    results = [verify_swing_file(swing_file, max_mismatches) for swing_file in swing_files]
+    output_path.write_text(json.dumps(results))
+
+def run_workers(swing_files: list[SwingFile], jobs: int, max_mismatches: int) -> list[dict]:
+    chunks = [chunk for chunk in (swing_files[i::jobs] for i in range(jobs)) if len(chunk) > 0]
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workers = []
+        for index, chunk in enumerate(chunks):
+            jobs_path = Path(temp_dir) / f'jobs_{index}.json'
+            output_path = Path(temp_dir) / f'results_{index}.json'
+            jobs_path.write_text(json.dumps([swing_file._asdict() for swing_file in chunk]))
+            command = [
+                bpy.app.binary_path, '-b', '--factory-startup', '-P', str(Path(__file__).resolve()), '--',
+                '--worker', str(jobs_path), '--output', str(output_path), '--max-mismatches', str(max_mismatches),
+            ]
+            workers.append((subprocess.Popen(command, stdout=subprocess.DEVNULL), output_path, chunk))
+
+        for process, output_path, chunk in workers:
+            return_code = process.wait()
+            if output_path.exists():
+                results.extend(json.loads(output_path.read_text()))
+            else:
+                error = f'The worker blender process exited with code {return_code} before writing results'
+                results.extend({'prc_path': f.prc_path, 'mismatches': [], 'messages': [], 'error': error, 'timings': {}} for f in chunk)
+    return results
+
+def print_report(results: list[dict], missing_skeletons: list[str], total_time: float) -> bool:
+    failed_count = 0
+    for result in sorted(results, key=lambda r: r['prc_path']):
+        timings = ', '.join(f'{name} {seconds:.3f}s' for name, seconds in result['timings'].items())
+        if result['error'] is not None:
+            failed_count += 1
+            print(f'ERROR {result["prc_path"]}\n{result["error"]}')
+        elif len(result['mismatches']) > 0:
+            failed_count += 1
+            print(f'MISMATCH {result["prc_path"]} ({timings})')
+            for mismatch in result['mismatches']:
+                print(f'    {mismatch}')
+            for message in result['messages']:
+                print(f'    {message}')
+        else:
+            print(f'OK {result["prc_path"]} ({timings})')
+    for prc_path in missing_skeletons:
+        print(f'SKIPPED {prc_path}, no skeleton was found')
+    print(f'{len(results) - failed_count} of {len(results)} swing files matched after a round trip in {total_time:.2f} seconds')
+    return failed_count == 0
+
+def main():
+    # Blender's own arguments come before "--".
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(prog='blender -b -P verify_swing_round_trip.py --')
+    parser.add_argument('fighter_folder', nargs='?', type=Path, help='Folder searched recursively for swing.prc files')
+    parser.add_argument('--skeleton', default=DEFAULT_SKELETON_PATH, help='Path of the .nusktb relative to a folder above each swing.prc')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker blender processes')
+    parser.add_argument('--max-mismatches', type=int, default=20, help='Mismatches to list for each file')
+    parser.add_argument('--worker', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--output', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        run_worker(args.worker, args.output, args.max_mismatches)
+        return
+
+    if args.fighter_folder is None:
+        parser.error('the fighter folder is required')
+
+    start = time.perf_counter()
+    swing_files, missing_skeletons = find_swing_files(args.fighter_folder, args.skeleton)
+    if args.jobs <= 1:
+        results = [verify_swing_file(swing_file, args.max_mismatches) for swing_file in swing_files]
+    else:
+        results = run_workers(swing_files, args.jobs, args.max_mismatches)
+    all_matched = print_report(results, missing_skeletons, time.perf_counter() - start)
+    sys.exit(0 if all_matched else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Checks that the exported Tangent0 matches the convention of Blender's mikktspace tangents used by previous exports.
+Previous exports wrote Blender's loop tangent with bitangent_sign * -1 in the 4th component.
+The tangents now come from ssbh_data_py, so this compares both for quads with regular and mirrored UVs.
+This doesn't need bpy, run it with a python version matching the bundled ssbh_data_py build. Example:
+python test/verify_tangent_signs.py
+"""
+
+import math
+import sys
+
+from pathlib import Path
+
+import numpy as np
+
+ADDON_DIR = Path(__file__).resolve().parent.parent
+
+# Blender UVs for the quad corners (0, 0), (1, 0), (1, 1), (0, 1).
+UV_CASES = {
+    'regular': [[0, 0], [1, 0], [1, 1], [0, 1]],
+    'mirrored U': [[1, 0], [0, 0], [0, 1], [1, 1]],
+    'mirrored V': [[0, 1], [1, 1], [1, 0], [0, 0]],
+    'mirrored U and V': [[1, 1], [0, 1], [0, 0], [1, 0]],
+    'rotated 90 degrees': [[0, 1], [0, 0], [1, 0], [1, 1]],
+}
+
+def get_rotation(axis: np.ndarray, angle: float) -> np.ndarray:
+    axis = axis / np.linalg.norm(axis)
+    x, y, z = axis
+    c, s = math.cos(angle), math.sin(angle)
+    return np.array([
+        [c + x * x * (1 - c), x * y * (1 - c) - z * s, x * z * (1 - c) + y * s],
+        [y * x * (1 - c) + z * s, c + y * y * (1 - c), y * z * (1 - c) - x * s],
+        [z * x * (1 - c) - y * s, z * y * (1 - c) + x * s, c + z * z * (1 - c)],
+    ], dtype=np.float32)
+
+def get_blender_tangent(positions: np.ndarray, normal: np.ndarray, uvs: np.ndarray) -> tuple[np.ndarray, float]:
+    # The tangent and bitangent_sign that mikktspace gives for a flat triangle.
+    edge1, edge2 = positions[1] - positions[0], positions[2] - positions[0]
+    uv_edge1, uv_edge2 = uvs[1] - uvs[0], uvs[2] - uvs[0]
+    r = 1.0 / (uv_edge1[0] * uv_edge2[1] - uv_edge2[0] * uv_edge1[1])
+    tangent = (edge1 * uv_edge2[1] - edge2 * uv_edge1[1]) * r
+    bitangent = (edge2 * uv_edge1[0] - edge1 * uv_edge2[0]) * r
+    # mikktspace reconstructs the bitangent as bitangent_sign * cross(normal, tangent).
+    bitangent_sign = 1.0 if np.dot(np.cross(normal, tangent), bitangent) > 0.0 else -1.0
+    return tangent / np.linalg.norm(tangent), bitangent_sign
+
+def main():
+    sys.path.insert(0, str(ADDON_DIR / 'dependencies'))
+    import ssbh_data_py
+
+    # The same axis correction as make_mesh_object, applied to row vectors.
+    axis_correction = get_rotation(np.array([1.0, 0.0, 0.0]), math.radians(90)).T
+    quad = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=np.float32)
+    vertex_indices = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)
+
+    rng = np.random.default_rng(0)
+    rotations = [np.eye(3, dtype=np.float32)] + [get_rotation(rng.normal(size=3), rng.uniform(0, 2 * math.pi)) for _ in range(4)]
+
+    mismatch_count = 0
+    for name, blender_uvs in UV_CASES.items():
+        blender_uvs = np.array(blender_uvs, dtype=np.float32)
+        # Exported UVs are flipped vertically like in make_mesh_object.
+        exported_uvs = blender_uvs.copy()
+        exported_uvs[:, 1] = 1.0 - exported_uvs[:, 1]
+        for rotation in rotations:
+            positions = quad @ rotation.T
+            normal = np.array([0.0, 0.0, 1.0], dtype=np.float32) @ rotation.T
+            tangent, bitangent_sign = get_blender_tangent(positions, normal, blender_uvs)
+            expected = np.append(tangent @ axis_correction, bitangent_sign * -1.0)
+
+            normals = np.tile(normal @ axis_correction, (len(positions), 1)).astype(np.float32)
+            tangents = ssbh_data_py.mesh_data.calculate_tangents_vec4(positions @ axis_correction, normals, exported_uvs, vertex_indices)
+            actual = np.array(tangents, dtype=np.float32)[0]
+            if not np.allclose(expected, actual, atol=1e-4):
+                mismatch_count += 1
+                print(f'MISMATCH {name}: expected {np.round(expected, 4)}, got {np.round(actual, 4)}')
+
+    total_count = len(UV_CASES) * len(rotations)
+    print(f'{total_count - mismatch_count} of {total_count} tangents matched the previous Tangent0 convention')
+    sys.exit(0 if mismatch_count == 0 else 1)
+
+if __name__ == '__main__':
+    main()